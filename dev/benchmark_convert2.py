@@ -0,0 +1,43 @@
+#///////////////////////////////////////////////////////////////////////////////
+# FILE: benchmark_convert2.py
+# AUTHOR: David Ruvolo
+# CREATED: 2026-10-17
+# MODIFIED: 2026-10-17
+# PURPOSE: compare the batched and row by row EMX2 conversion
+# STATUS: working
+# PACKAGES: yamlemxconvert
+# COMMENTS: run from the project root: `PYTHONPATH=. python3 dev/benchmark_convert2.py`
+#///////////////////////////////////////////////////////////////////////////////
+
+import time
+
+from generate_model import generateModel
+from yamlemxconvert.convert2 import Convert2
+
+# generate a model with 100k attributes; every fifth attribute is a reference
+model = generateModel(entities = 1000, attributes = 100, rows = 0)
+for index, entity in enumerate(model['entities']):
+  for attr in entity['attributes'][5::5]:
+    attr['dataType'] = 'xref'
+    attr['refEntity'] = f"{model['name']}_lookups_entity{index % 50}"
+n = sum([len(entity['attributes']) for entity in model['entities']])
+
+# reuse an instance and replace the parsed yaml with the generated model
+emx2 = Convert2(file = 'tests/models/model_simple/birddata.yaml')
+emx2._yaml = model
+
+# use the best of 5 runs
+timings = {False: [], True: []}
+models = {}
+for _ in range(5):
+  for batched in [False, True]:
+    start = time.perf_counter()
+    emx2.convert(includeData = False, keepModelPackage = True, batched = batched)
+    timings[batched].append(time.perf_counter() - start)
+    models[batched] = emx2.model
+timings = {batched: min(values) for batched, values in timings.items()}
+
+assert models[True] == models[False], 'Batched output should match the row by row output'
+print(f'{n} attributes')
+print(f'row by row: {n / timings[False]:,.0f} attributes/sec ({timings[False]:.2f}s)')
+print(f'batched: {n / timings[True]:,.0f} attributes/sec ({timings[True]:.2f}s)')
@@ -0,0 +1,68 @@
+#///////////////////////////////////////////////////////////////////////////////
+# FILE: benchmark_extract.py
+# AUTHOR: David Ruvolo
+# CREATED: 2026-10-17
+# MODIFIED: 2026-10-17
+# PURPOSE: benchmark attribute extraction in Convert.__emx__extract__entities__
+# STATUS: working
+# PACKAGES: yamlemxconvert
+# COMMENTS: run from the project root: `PYTHONPATH=. python3 dev/benchmark_extract.py`
+#///////////////////////////////////////////////////////////////////////////////
+
+import time
+
+from generate_model import generateModel
+from yamlemxconvert.convert import Convert
+from yamlemxconvert.mappings import (
+  __emx__keys__enty__,
+  __emx__keys__attr__,
+  __emx__keys__datatype__
+)
+
+def legacyExtractEntities(data, lang_attrs = ('label-', 'description-'), priorityNameKey = None):
+  """Extraction as implemented before the key sets were introduced
+  (linear list lookups, defaults rebuilt for every attribute)
+  """
+  emx = {'entities': [], 'attributes': [], 'data': {}}
+  for entity in data['entities']:
+    entityKeys = list(entity.keys())
+    e = {'package': data['name']}
+    for ekey in entityKeys:
+      if ekey in __emx__keys__enty__ or ekey.startswith(lang_attrs):
+        e[ekey] = entity[ekey]
+    emx['entities'].append(e)
+    if 'attributes' in entity:
+      for attr in entity['attributes']:
+        attrKeys = list(attr.keys())
+        d = {'entity': data['name'] + '_' + entity['name']}
+        for aKey in attrKeys:
+          if aKey in __emx__keys__attr__ or aKey.startswith(lang_attrs) or aKey == priorityNameKey:
+            d[aKey] = attr[aKey]
+        if 'dataType' in d:
+          if d['dataType'] not in __emx__keys__datatype__:
+            raise ValueError('invalid dataType')
+        if data['defaults']:
+          defaultKeys = list(data['defaults'].keys())
+          for dKey in defaultKeys:
+            if dKey not in attrKeys:
+              d[dKey] = data['defaults'][dKey]
+        emx['attributes'].append(d)
+    if 'data' in entity:
+      emx['data'][data['name'] + '_' + entity['name']] = entity['data']
+  return emx
+
+model = generateModel(entities = 1000, attributes = 100, rows = 0)
+n = sum([len(entity['attributes']) for entity in model['entities']])
+
+start = time.perf_counter()
+before = legacyExtractEntities(model)
+legacy = time.perf_counter() - start
+
+start = time.perf_counter()
+after = Convert().__emx__extract__entities__(model)
+current = time.perf_counter() - start
+
+assert before == after, 'Extraction output should not change'
+print(f'{n} attributes')
+print(f'before: {n / legacy:,.0f} attributes/sec ({legacy:.2f}s)')
+print(f'after: {n / current:,.0f} attributes/sec ({current:.2f}s)')
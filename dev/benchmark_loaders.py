@@ -0,0 +1,47 @@
+#///////////////////////////////////////////////////////////////////////////////
+# FILE: benchmark_loaders.py
+# AUTHOR: David Ruvolo
+# CREATED: 2026-10-17
+# MODIFIED: 2026-10-17
+# PURPOSE: compare YAML parse time of the libyaml and pure-Python loaders
+# STATUS: working
+# PACKAGES: yaml, yamlemxconvert
+# COMMENTS: run from the project root: `PYTHONPATH=. python3 dev/benchmark_loaders.py`
+#///////////////////////////////////////////////////////////////////////////////
+
+import os
+import tempfile
+import time
+import yaml
+
+from generate_model import writeModel
+from yamlemxconvert.utils import loadYaml
+
+loaders = {'SafeLoader': yaml.SafeLoader}
+if yaml.__with_libyaml__:
+  loaders['CSafeLoader'] = yaml.CSafeLoader
+else:
+  print('Warning: PyYAML was built without libyaml; CSafeLoader is unavailable')
+
+sizes = [
+  {'entities': 5, 'attributes': 10, 'rows': 500},
+  {'entities': 10, 'attributes': 20, 'rows': 1000},
+  {'entities': 10, 'attributes': 20, 'rows': 2000}
+]
+
+with tempfile.TemporaryDirectory() as tmp:
+  for size in sizes:
+    file = writeModel(path = os.path.join(tmp, 'model.yaml'), **size)
+    mb = os.path.getsize(file) / 1e6
+    results = {}
+    for name, loader in loaders.items():
+      start = time.perf_counter()
+      contents = loadYaml(file, loader = loader)
+      results[name] = (time.perf_counter() - start, contents)
+    
+    # the output of both loaders must be identical
+    if len(results) > 1:
+      assert results['SafeLoader'][1] == results['CSafeLoader'][1]
+
+    timings = ', '.join([f'{name}: {value[0]:.2f}s' for name, value in results.items()])
+    print(f"{size['entities']} entities x {size['rows']} rows ({mb:.1f} MB): {timings}")
@@ -0,0 +1,91 @@
+#///////////////////////////////////////////////////////////////////////////////
+# FILE: generate_model.py
+# AUTHOR: David Ruvolo
+# CREATED: 2026-10-17
+# MODIFIED: 2026-10-17
+# PURPOSE: generate large YAML-EMX models for benchmarking
+# STATUS: working
+# PACKAGES: yaml
+# COMMENTS: used by the dev/benchmark_*.py scripts
+#///////////////////////////////////////////////////////////////////////////////
+
+import datetime
+import yaml
+
+def generateModel(
+  name: str = 'benchmark',
+  entities: int = 10,
+  attributes: int = 20,
+  rows: int = 1000
+):
+  """Generate Model
+  Build a YAML-EMX model with inline data. Each entity has an id attribute,
+  a mix of data types, and `rows` rows of data.
+  
+  @param name (str): package name
+  @param entities (int): number of entities
+  @param attributes (int): number of attributes per entity
+  @param rows (int): number of data rows per entity
+  """
+  model = {
+    'name': name,
+    'label': 'Benchmark model',
+    'description': 'Generated model for benchmarking',
+    'version': '1.0.0',
+    'date': datetime.date(2021, 11, 12),
+    'defaults': {
+      'idAttribute': False,
+      'auto': False,
+      'dataType': 'string',
+      'nillable': True
+    },
+    'entities': []
+  }
+  types = ['string', 'int', 'decimal', 'date', 'bool', 'text']
+  start = datetime.date(2000, 1, 1)
+  for e in range(entities):
+    attrs = [{'name': 'id', 'idAttribute': True, 'nillable': False}]
+    for a in range(1, attributes):
+      attrs.append({
+        'name': f'attr{a}',
+        'label': f'Attribute {a}',
+        'label-nl': f'Attribuut {a}',
+        'description': f'Description of attribute {a}',
+        'dataType': types[a % len(types)],
+        'tags': f'NCIT_C{a} http://purl.obolibrary.org/obo/NCIT_C{a}'
+      })
+    data = []
+    for r in range(rows):
+      row = {'id': f'{e}-{r}'}
+      for a in range(1, attributes):
+        dataType = types[a % len(types)]
+        if dataType == 'int':
+          row[f'attr{a}'] = r
+        elif dataType == 'decimal':
+          row[f'attr{a}'] = r / 3
+        elif dataType == 'date':
+          row[f'attr{a}'] = start + datetime.timedelta(days = r)
+        elif dataType == 'bool':
+          row[f'attr{a}'] = bool(r % 2)
+        else:
+          row[f'attr{a}'] = f'value {r} for attr{a}'
+      data.append(row)
+    model['entities'].append({
+      'name': f'entity{e}',
+      'label': f'Entity {e}',
+      'description': f'Generated entity {e}',
+      'attributes': attrs,
+      'data': data
+    })
+  return model
+
+def writeModel(path: str = None, **kwargs):
+  """Write Model
+  Generate a model and save it as YAML
+  
+  @param path (str): output file
+  @param **kwargs: arguments passed to `generateModel`
+  """
+  with open(path, 'w', encoding = 'utf-8') as stream:
+    yaml.safe_dump(generateModel(**kwargs), stream, sort_keys = False)
+  return path
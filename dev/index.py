@@ -28,16 +28,14 @@ data = [
 # EMX2 Converstion
 from yamlemxconvert.convert2 import Convert2
 
-model = Convert2(file = 'tests/models/model_complex/birddata.yaml')
-model.convert(keepModelPackage=True)
-
-for row in model.model['molgenis']:
-  if row.get('refSchema') == 'birdData_refs':
-    row['refSchema'] = 'birdDataRefs'
-
-refs = Convert2(file = 'tests/models/model_complex/birddata_refs.yaml')
-refs.convert(keepModelPackage=False)
-refs.model['molgenis']
-
-refs.write(name="birdDataRefs",outDir='dev')
-model.write(name="birdData",outDir='dev')
+model = Convert2(
+  files = [
+    'tests/models/model_complex/birddata.yaml',
+    'tests/models/model_complex/birddata_refs.yaml'
+  ],
+  schemas = {'birdData_refs': 'birdDataRefs'}
+)
+model.convert()
+model.models['birdDataRefs']['molgenis']
+
+model.write(outDir='dev')
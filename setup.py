@@ -28,6 +28,9 @@ REQUIRED = [
 # What packages are optional?
 EXTRAS = {
     # 'fancy feature': ['django'],
+    'parquet': ['pyarrow'],
+    'arrow': ['pyarrow'],
+    'zstd': ['zstandard'],
 }
 
 # The rest you shouldn't have to touch too much :)
@@ -107,9 +110,9 @@ setup(
     # If your package is a single module, use this instead of 'packages':
     # py_modules=['mypackage'],
 
-    # entry_points={
-    #     'console_scripts': ['mycli=mymodule:cli'],
-    # },
+    entry_points={
+        'console_scripts': ['yamlemxconvert=yamlemxconvert.cli:main'],
+    },
     install_requires=REQUIRED,
     extras_require=EXTRAS,
     include_package_data=True,
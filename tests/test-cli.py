@@ -0,0 +1,87 @@
+import pytest
+import os
+from os import path
+import yamlemxconvert.cli as cli
+from yamlemxconvert.cli import main, expandFiles, watchFiles
+
+def test_expand_files_keeps_pattern_order():
+  files = expandFiles([
+    'tests/models/model_complex/birddata_refs.yaml',
+    'tests/models/model_complex/*.yaml'
+  ])
+  assert files == [
+    'tests/models/model_complex/birddata_refs.yaml',
+    'tests/models/model_complex/birddata.yaml'
+  ]
+
+def test_expand_files_without_matches():
+  with pytest.raises(ValueError):
+    expandFiles(['tests/models/does_not_exist/*.yaml'])
+
+def test_emx1_csv(tmp_path):
+  schema = tmp_path / 'schema.md'
+  code = main([
+    'emx1', 'tests/models/model_simple/birddata.yaml',
+    '--format', 'csv', '--out-dir', str(tmp_path), '--tags', '--schema', str(schema)
+  ])
+  assert code == 0
+  for file in ['packages.csv', 'entities.csv', 'attributes.csv', 'birdData_species.csv']:
+    assert path.exists(tmp_path / file), f'{file} should be written'
+  assert path.exists(schema)
+
+def test_emx2_schemas(tmp_path):
+  main([
+    'emx2',
+    'tests/models/model_complex/birddata.yaml',
+    'tests/models/model_complex/birddata_refs.yaml',
+    '--out-dir', str(tmp_path), '--schemas', 'birdData_refs=birdDataRefs'
+  ])
+  assert path.exists(tmp_path / 'birdData.xlsx')
+  assert path.exists(tmp_path / 'birdDataRefs.xlsx')
+
+def test_watch_only_runs_on_change(tmp_path, monkeypatch):
+  model = tmp_path / 'model.yaml'
+  model.write_text('name: test\n')
+  runs = []
+  watchFiles([str(model)], runs.append, interval = 0, iterations = 2)
+  assert runs == [], 'unchanged files should not be converted'
+  
+  def edit(seconds):
+    model.write_text('name: test\ndescription: changed\n')
+    os.utime(model, ns = (0, len(runs) + 1))
+  monkeypatch.setattr(cli.time, 'sleep', edit)
+  watchFiles([str(model)], runs.append, interval = 0, iterations = 2)
+  assert runs == [[str(model)], [str(model)]]
+
+def test_watch_includes_dependencies(tmp_path, monkeypatch):
+  model = tmp_path / 'model.yaml'
+  base = tmp_path / 'shared' / 'base.yaml'
+  base.parent.mkdir()
+  base.write_text('name: base\n')
+  model.write_text(f'include: {base}\n')
+  runs = []
+  def edit(seconds):
+    base.write_text('name: base\nlabel: Base\n')
+    os.utime(base, ns = (0, len(runs) + 1))
+  monkeypatch.setattr(cli.time, 'sleep', edit)
+  watchFiles([str(model)], runs.append, interval = 0, iterations = 1, dependencies = lambda: [str(base)])
+  assert runs == [[str(model)]], 'changes to include files should be detected'
+
+def test_emx1_check(tmp_path, capsys):
+  code = main([
+    'emx1',
+    'tests/models/model_complex/birddata.yaml',
+    'tests/models/model_complex/birddata_refs.yaml',
+    '--format', 'csv', '--out-dir', str(tmp_path), '--check'
+  ])
+  assert code == 1
+  assert 'extends birdData_template' in capsys.readouterr().out
+  assert not path.exists(tmp_path / 'entities.csv'), 'Nothing should be written in check mode'
+
+def test_emx1_validate(tmp_path):
+  code = main([
+    'emx1', 'tests/models/model_simple/birddata.yaml',
+    '--format', 'csv', '--out-dir', str(tmp_path), '--validate'
+  ])
+  assert code == 0
+  assert path.exists(tmp_path / 'entities.csv')
@@ -1,6 +1,8 @@
 
 import pytest
+import yamlemxconvert.convert
 from yamlemxconvert.convert import Convert
+from yamlemxconvert.emxCache import emxTagCache
 
 emx = Convert(files=['tests/models/model_simple/birddata.yaml'])
 emx.convert()
@@ -37,4 +39,105 @@ def test_emx_attributes_have_valid_package():
   
   
 def test_semantic_tags_are_built():
-  emx.compileSemanticTags()
\ No newline at end of file
+  emx.compileSemanticTags()
+
+def test_semantic_tags_are_unique():
+  model = Convert(files = [
+    'tests/models/model_complex/birddata.yaml',
+    'tests/models/model_complex/birddata_refs.yaml'
+  ])
+  model.convert()
+  model.compileSemanticTags()
+  identifiers = [tag['identifier'] for tag in model.tags]
+  assert len(identifiers) == len(set(identifiers)), 'Tags should be unique by identifier'
+  catalog = [tag for tag in model.tags if tag['identifier'] == 'dcat:catalog'][0]
+  assert catalog['label'] == 'dcat:Catalog', 'tagDefinitions should not be replaced'
+  
+def test_semantic_tag_identifiers():
+  model = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  model.convert()
+  model.compileSemanticTags()
+  model.compileSemanticTags()
+  tags = {tag['identifier']: tag for tag in model.tags}
+  assert tags['NCIT_C49100']['objectIRI'] == 'http://purl.obolibrary.org/obo/NCIT_C49100'
+  assert tags['NCIT_C49100']['codeSystem'] == 'NCIT'
+  assert len(tags) == len(model.tags), 'Compiling tags again should not add tags'
+  for attr in model.attributes:
+    if attr.get('tags'):
+      assert attr['tags'] in tags
+
+def __model__(emx):
+  return (emx.name, emx.version, emx.date, emx.packages, emx.entities, emx.attributes, emx.tags, emx.data)
+  
+def test_parallel_conversion_matches_sequential(tmp_path):
+  base = tmp_path / 'base.yaml'
+  base.write_text('name: base\nversion: 1.0.0\ndescription: shared package\n')
+  for name in ['a', 'b']:
+    (tmp_path / f'{name}.yaml').write_text(
+      f'name: base\ninclude: {base}\ndefaults:\n  dataType: string\n'
+      f'entities:\n  - name: {name}\n    attributes:\n      - name: id\n'
+      f'    data:\n      - id: {name}1\n'
+    )
+  files = [
+    'tests/models/model_complex/birddata.yaml',
+    'tests/models/model_complex/birddata_refs.yaml',
+    str(tmp_path / 'a.yaml'),
+    str(tmp_path / 'b.yaml')
+  ]
+  sequential = Convert(files = files)
+  sequential.convert()
+  parallel = Convert(files = files)
+  parallel.convert(workers = 2)
+  assert __model__(parallel) == __model__(sequential), 'Parallel conversion should match sequential conversion'
+  assert [pkg['name'] for pkg in parallel.packages] == ['birdData', 'birdData_refs', 'base'], 'Included packages should be added once'
+
+
+def test_schema_only_lists_attributes_of_each_entity(tmp_path):
+  model = tmp_path / 'model.yaml'
+  model.write_text(
+    'name: pkg\ndefaults:\n  dataType: string\nentities:\n'
+    '  - name: a\n    attributes:\n      - name: attrOfA\n'
+    '  - name: ab\n    attributes:\n      - name: attrOfAB\n'
+  )
+  emx = Convert(files = [str(model)])
+  emx.convert()
+  emx.write_schema(str(tmp_path / 'schema.md'))
+  schema = (tmp_path / 'schema.md').read_text()
+  section = schema[schema.index('### Entity: pkg_ab'):]
+  assert 'attrOfA ' not in section, 'Attributes of other entities should not be listed'
+  assert 'attrOfAB' in section
+
+def __writeTaggedModel__(tmp_path):
+  model = tmp_path / 'model.yaml'
+  model.write_text(
+    'name: tagged\ntags: dcat:catalog\ndefaults:\n  dataType: string\n'
+    'entities:\n  - name: things\n    attributes:\n'
+    '      - name: id\n        tags: NCIT_C1 http://purl.obolibrary.org/obo/NCIT_C1, dcat:dataset\n'
+    '      - name: label\n        tags:\n          - NCIT_C2 http://purl.obolibrary.org/obo/NCIT_C2\n          - NCIT_C1 http://purl.obolibrary.org/obo/NCIT_C1\n'
+  )
+  return [str(model)]
+
+def test_multi_valued_semantic_tags(tmp_path):
+  model = Convert(files = __writeTaggedModel__(tmp_path))
+  model.convert()
+  model.compileSemanticTags()
+  assert [attr['tags'] for attr in model.attributes] == ['NCIT_C1,dcat:dataset', 'NCIT_C2,NCIT_C1']
+  assert [tag['identifier'] for tag in model.tags] == ['dcat:catalog', 'NCIT_C1', 'dcat:dataset', 'NCIT_C2']
+  assert model.tags[1]['objectIRI'] == 'http://purl.obolibrary.org/obo/NCIT_C1'
+
+def test_semantic_tag_cache(tmp_path, monkeypatch):
+  file = str(tmp_path / 'tags.json')
+  expected = Convert(files = __writeTaggedModel__(tmp_path))
+  expected.convert()
+  expected.compileSemanticTags(cache = file)
+  
+  cache = emxTagCache(file)
+  assert cache.get('NCIT_C2 http://purl.obolibrary.org/obo/NCIT_C2') == ('NCIT_C2', 'http://purl.obolibrary.org/obo/NCIT_C2', 'NCIT')
+  
+  # cached tags are not parsed again
+  monkeypatch.setattr(yamlemxconvert.convert, '__semantic__tag__pattern__', None)
+  model = Convert(files = __writeTaggedModel__(tmp_path))
+  model.convert()
+  model.compileSemanticTags(cache = cache)
+  assert model.tags == expected.tags
+  assert model.attributes == expected.attributes
@@ -11,3 +11,69 @@ def test_model_properties_exist():
   
 # def test_model_structure_objects():
 #   assert list(emx2.model.keys()) == ['molgenis','states','species'], 'EMX2 model is not properly structured.'
+
+
+@pytest.mark.parametrize('file', [
+  'tests/models/model_complex/birddata.yaml',
+  'tests/models/model_complex/birddata_refs.yaml',
+  'tests/models/model_simple/birddata.yaml'
+])
+@pytest.mark.parametrize('keepModelPackage', [True, False])
+def test_batched_conversion_matches_row_conversion(file, keepModelPackage):
+  rows = Convert2(file = file)
+  rows.convert(keepModelPackage = keepModelPackage, batched = False)
+  batched = Convert2(file = file)
+  batched.convert(keepModelPackage = keepModelPackage)
+  assert list(batched.model.keys()) == list(rows.model.keys())
+  assert batched.model == rows.model, 'Batched conversion should match the row by row conversion'
+
+
+def test_multiple_files_resolve_references():
+  multi = Convert2(
+    files = [
+      'tests/models/model_complex/birddata.yaml',
+      'tests/models/model_complex/birddata_refs.yaml'
+    ],
+    schemas = {'birdData_refs': 'birdDataRefs'}
+  )
+  multi.convert()
+  assert list(multi.models.keys()) == ['birdData', 'birdDataRefs']
+  assert multi.model is None
+  
+  species = multi.models['birdData']['molgenis']
+  territories = [row for row in species if row.get('columnName') == 'primaryReportingTerritories'][0]
+  assert territories['refSchema'] == 'birdDataRefs'
+  assert territories['refTable'] == 'states'
+  
+  refs = multi.models['birdDataRefs']['molgenis']
+  wings = [row for row in refs if row['tableName'] == 'wings' and not row.get('columnName')][0]
+  assert wings['tableExtends'] == 'template'
+  assert 'states' in multi.models['birdDataRefs']
+
+
+def test_multiple_files_into_one_schema():
+  multi = Convert2(
+    files = [
+      'tests/models/model_complex/birddata.yaml',
+      'tests/models/model_complex/birddata_refs.yaml'
+    ],
+    schemas = {'birdData_refs': 'birdData'}
+  )
+  multi.convert()
+  assert list(multi.models.keys()) == ['birdData']
+  assert multi.model is multi.models['birdData']
+  refSchemas = [row.get('refSchema') for row in multi.model['molgenis'] if row.get('refSchema')]
+  assert refSchemas == [], 'references within one schema should not set refSchema'
+
+def test_duplicate_tables_in_one_schema_raise(tmp_path):
+  for name in ['a', 'b']:
+    (tmp_path / f'{name}.yaml').write_text(
+      f'name: {name}\nentities:\n  - name: things\n    attributes:\n'
+      '      - name: id\n        idAttribute: true\n    data:\n      - id: 1\n'
+    )
+  multi = Convert2(
+    files = [str(tmp_path / 'a.yaml'), str(tmp_path / 'b.yaml')],
+    schemas = {'a': 'shared', 'b': 'shared'}
+  )
+  with pytest.raises(ValueError, match = 'a.yaml and .*b.yaml'):
+    multi.convert()
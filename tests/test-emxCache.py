@@ -0,0 +1,90 @@
+import pytest
+import yamlemxconvert.convert
+import yamlemxconvert.emxCache
+from yamlemxconvert.convert import Convert
+from yamlemxconvert.emxCache import emxCache, emxMemoryCache
+
+def __writeModel__(tmp_path, description = 'shared package'):
+  base = tmp_path / 'base.yaml'
+  base.write_text(f'name: base\ndescription: {description}\n')
+  model = tmp_path / 'model.yaml'
+  model.write_text(
+    f'name: base\ninclude: {base}\ndefaults:\n  dataType: string\n'
+    'entities:\n  - name: things\n    attributes:\n      - name: id\n'
+  )
+  return [str(model)]
+
+def test_cached_conversion_matches_uncached(tmp_path):
+  cache = emxCache(dir = str(tmp_path / 'cache'))
+  files = ['tests/models/model_simple/birddata.yaml']
+  expected = Convert(files = files)
+  expected.convert()
+  emx = Convert(files = files)
+  emx.convert(cache = cache)
+  emx.convert(cache = cache)
+  assert emx.packages == expected.packages, 'Cached packages should match'
+  assert emx.attributes == expected.attributes, 'Cached attributes should match'
+  assert emx.data == expected.data, 'Cached data should match'
+
+def test_unchanged_files_are_not_processed(tmp_path, monkeypatch):
+  cache = emxCache(dir = str(tmp_path / 'cache'))
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert(cache = cache)
+  def fail(*args):
+    raise AssertionError('file should be read from the cache')
+  monkeypatch.setattr(yamlemxconvert.convert, '_extractFile', fail)
+  emx.convert(cache = cache)
+  assert len(emx.entities) == 6, 'Model should have 6 entities'
+
+def test_options_and_includes_invalidate_cache(tmp_path):
+  cache = emxCache(dir = str(tmp_path / 'cache'))
+  emx = Convert(files = __writeModel__(tmp_path))
+  emx.convert(cache = cache)
+  assert emx.packages[0]['description'] == 'shared package'
+  __writeModel__(tmp_path, description = 'updated package')
+  emx.convert(cache = cache)
+  assert emx.packages[0]['description'] == 'updated package', 'Changes to include files should invalidate the cache'
+  emx.convert(cache = cache, priorityNameKey = 'name-other')
+  assert len(cache.__entries__()) == 2, 'Each combination of file contents and options should have an entry'
+
+def test_keys_depend_on_path_and_version(tmp_path, monkeypatch):
+  cache = emxCache(dir = str(tmp_path / 'cache'))
+  (tmp_path / 'a').mkdir()
+  (tmp_path / 'b').mkdir()
+  for name in ['a', 'b']:
+    (tmp_path / name / 'model.yaml').write_text('name: model\n')
+  first = cache.key(str(tmp_path / 'a' / 'model.yaml'))
+  assert first != cache.key(str(tmp_path / 'b' / 'model.yaml')), 'Identical files at different paths should have different keys'
+  monkeypatch.setattr(yamlemxconvert.emxCache, '__version__', '0.0.0')
+  assert first != cache.key(str(tmp_path / 'a' / 'model.yaml')), 'Entries should not be reused after an upgrade'
+
+def test_cache_is_size_bounded_and_can_be_cleared(tmp_path):
+  cache = emxCache(dir = str(tmp_path / 'cache'), maxSize = 1)
+  cache.set('a', list(range(100)))
+  assert cache.size() == 0, 'Entries larger than maxSize should be evicted'
+  cache.maxSize = 1024 * 1024
+  cache.set('a', 'a')
+  cache.set('b', 'b')
+  assert cache.get('a') == 'a'
+  cache.clear()
+  assert cache.get('a') is None and cache.size() == 0, 'Cache should be empty after clear'
+
+def test_memory_cache_returns_copies(tmp_path):
+  cache = emxMemoryCache()
+  files = ['tests/models/model_simple/birddata.yaml']
+  emx = Convert(files = files)
+  emx.convert(cache = cache)
+  emx.compileSemanticTags()
+  expected = Convert(files = files)
+  expected.convert()
+  emx.convert(cache = cache)
+  assert emx.attributes == expected.attributes, 'Cached entries should not be modified by the model'
+
+def test_memory_cache_include_changes(tmp_path):
+  cache = emxMemoryCache()
+  emx = Convert(files = __writeModel__(tmp_path))
+  emx.convert(cache = cache)
+  __writeModel__(tmp_path, description = 'updated package')
+  emx.convert(cache = cache)
+  assert emx.packages[0]['description'] == 'updated package'
+  assert len(cache.entries) == 1
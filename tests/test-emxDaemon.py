@@ -0,0 +1,93 @@
+import json
+import pytest
+import threading
+import urllib.error
+import urllib.request
+from os import path, stat
+from yamlemxconvert.cli import main
+from yamlemxconvert.emxDaemon import emxDaemon, sendRequest
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+  monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+  daemon = emxDaemon(port = 0, workers = 2)
+  thread = threading.Thread(target = daemon.serve)
+  thread.start()
+  yield daemon
+  daemon.shutdown()
+  thread.join()
+
+def test_daemon_status(daemon):
+  status = sendRequest(daemon.address, '/status')
+  assert status['status'] == 'ok'
+  assert status['requests'] == 0
+
+def test_daemon_convert(daemon, tmp_path):
+  args = [
+    'emx1', 'tests/models/model_simple/birddata.yaml',
+    '--format', 'csv', '--out-dir', str(tmp_path), '--daemon', daemon.address
+  ]
+  assert main(args) == 0
+  assert path.exists(tmp_path / 'attributes.csv')
+  assert main(args) == 0
+  status = sendRequest(daemon.address, '/status')
+  assert status['requests'] == 2
+  assert status['cachedFiles'] == 1, 'extracted files should be cached between requests'
+
+def test_daemon_token_file(daemon):
+  assert path.exists(daemon.tokenFile)
+  assert stat(daemon.tokenFile).st_mode & 0o777 == 0o600
+
+def __post__(daemon, headers: dict = None):
+  request = urllib.request.Request(
+    f'http://{daemon.address}/shutdown',
+    data = json.dumps({}).encode('utf-8'),
+    method = 'POST',
+    headers = headers
+  )
+  try:
+    with urllib.request.urlopen(request) as response:
+      return response.status
+  except urllib.error.HTTPError as error:
+    return error.code
+
+def test_daemon_rejects_requests_without_token(daemon):
+  assert __post__(daemon, {'Content-Type': 'application/json'}) == 401
+  assert __post__(daemon, {'Content-Type': 'application/json', 'Authorization': 'Bearer invalid'}) == 401
+  assert sendRequest(daemon.address, '/status')['status'] == 'ok'
+
+def test_daemon_rejects_non_json_requests(daemon):
+  headers = {'Content-Type': 'text/plain', 'Authorization': f'Bearer {daemon.token}'}
+  assert __post__(daemon, headers) == 415
+  assert sendRequest(daemon.address, '/status')['status'] == 'ok'
+
+def test_daemon_caches_emx2_files(daemon, tmp_path):
+  args = [
+    'emx2', 'tests/models/model_complex/birddata.yaml',
+    '--out-dir', str(tmp_path), '--daemon', daemon.address
+  ]
+  assert main(args) == 0
+  assert main(args) == 0
+  assert sendRequest(daemon.address, '/status')['cachedFiles'] == 1
+
+def test_daemon_concurrent_requests(daemon, tmp_path):
+  results = []
+  def convert(index):
+    results.append(main([
+      'emx2', 'tests/models/model_complex/birddata.yaml',
+      '--out-dir', str(tmp_path / str(index)), '--daemon', daemon.address
+    ]))
+  threads = [threading.Thread(target = convert, args = (index,)) for index in range(4)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert results == [0, 0, 0, 0]
+  for index in range(4):
+    assert path.exists(tmp_path / str(index) / 'birdData.xlsx')
+
+def test_daemon_errors(daemon, tmp_path):
+  result = main([
+    'emx1', str(tmp_path / 'missing.yaml'), '--out-dir', str(tmp_path), '--daemon', daemon.address
+  ])
+  assert result == 1
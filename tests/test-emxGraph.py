@@ -0,0 +1,139 @@
+import pytest
+from yamlemxconvert.convert import Convert
+from yamlemxconvert.convert2 import Convert2
+from yamlemxconvert.emxCache import emxCache
+from yamlemxconvert.emxGraph import emxDependencyGraph
+
+@pytest.fixture
+def catalogue(tmp_path):
+  """Write a model in four files: `people` refers to `groups`, `members`
+  includes `base`, and `other` is independent
+  """
+  files = {
+    'base.yaml': 'name: base\nlabel: Base\n',
+    'groups.yaml': (
+      'name: groups\nentities:\n  - name: groups\n    attributes:\n'
+      '      - name: id\n        idAttribute: true\n        nillable: false\n'
+    ),
+    'people.yaml': (
+      'name: people\nentities:\n  - name: people\n    attributes:\n'
+      '      - name: id\n        idAttribute: true\n        nillable: false\n'
+      '      - name: group\n        dataType: xref\n        refEntity: groups_groups\n'
+    ),
+    'members.yaml': (
+      f'include: {tmp_path / "base.yaml"}\nentities:\n  - name: members\n    attributes:\n'
+      '      - name: id\n        idAttribute: true\n        nillable: false\n'
+    ),
+    'other.yaml': (
+      'name: other\nentities:\n  - name: other\n    attributes:\n'
+      '      - name: id\n        idAttribute: true\n        nillable: false\n'
+    )
+  }
+  for name, contents in files.items():
+    (tmp_path / name).write_text(contents)
+  return [str(tmp_path / name) for name in ['groups.yaml', 'people.yaml', 'members.yaml', 'other.yaml']]
+
+def test_dependents(catalogue, tmp_path):
+  emx = Convert(files = catalogue)
+  emx.convert()
+  groups, people, members, other = catalogue
+  assert emx.graph.dependents([groups]) == {people}
+  assert emx.graph.dependents([str(tmp_path / 'base.yaml')]) == {members}
+  assert emx.graph.dependents([other]) == set()
+  
+  emx.graph.save(str(tmp_path / 'graph.json'))
+  graph = emxDependencyGraph(file = str(tmp_path / 'graph.json'))
+  assert graph.toDict() == emx.graph.toDict()
+  assert graph.changed() == []
+  (tmp_path / 'other.yaml').write_text('name: other\n')
+  assert graph.changed() == [other]
+
+def test_update_only_converts_affected_files(catalogue, tmp_path):
+  emx = Convert(files = catalogue)
+  emx.convert()
+  assert emx.update() == []
+  
+  (tmp_path / 'base.yaml').write_text('name: base\nlabel: Base package\n')
+  assert emx.update() == [catalogue[2]], 'files that include a changed file should be converted again'
+  
+  with open(catalogue[1], 'a') as stream:
+    stream.write('      - name: age\n        dataType: int\n')
+  assert emx.update() == [catalogue[1]]
+  
+  fresh = Convert(files = catalogue)
+  fresh.convert()
+  assert emx.packages == fresh.packages
+  assert emx.entities == fresh.entities
+  assert emx.attributes == fresh.attributes
+
+def test_update_removes_deleted_files(catalogue, tmp_path):
+  emx = Convert(files = catalogue)
+  emx.convert()
+  (tmp_path / 'other.yaml').unlink()
+  assert emx.update() == []
+  assert emx.files == catalogue[:3]
+  assert catalogue[3] not in emx.graph.files
+  assert 'other_other' not in [f"{entity['package']}_{entity['name']}" for entity in emx.entities]
+
+def test_update_stores_files_in_the_cache(catalogue, tmp_path):
+  cache = emxCache(dir = str(tmp_path / 'cache'))
+  emx = Convert(files = catalogue)
+  emx.convert(cache = cache)
+  (tmp_path / 'other.yaml').write_text(
+    'name: other\nentities:\n  - name: other\n    attributes:\n'
+    '      - name: id\n        idAttribute: true\n'
+  )
+  assert emx.update() == [catalogue[3]]
+  assert cache.get(cache.key(catalogue[3], (True, None, False, False))) is not None
+
+def test_update_requires_a_converted_model(catalogue, tmp_path):
+  emx = Convert(files = catalogue)
+  emx.convert()
+  emx.graph.save(str(tmp_path / 'graph.json'))
+  fresh = Convert(files = catalogue)
+  fresh.graph = emxDependencyGraph(file = str(tmp_path / 'graph.json'))
+  with pytest.raises(ValueError, match = 'converted first'):
+    fresh.update()
+
+def test_update_recompiles_semantic_tags(tmp_path):
+  model = tmp_path / 'model.yaml'
+  model.write_text(
+    'name: model\ntags: NCIT_C142487 http://purl.obolibrary.org/obo/NCIT_C142487\n'
+    'entities:\n  - name: things\n    attributes:\n'
+    '      - name: id\n        idAttribute: true\n        tags: dcat:dataset\n'
+  )
+  emx = Convert(files = [str(model)])
+  emx.convert()
+  emx.compileSemanticTags()
+  model.write_text(model.read_text() + '      - name: label\n        tags: dcat:title\n')
+  emx.update()
+  
+  fresh = Convert(files = [str(model)])
+  fresh.convert()
+  fresh.compileSemanticTags()
+  assert emx.tags == fresh.tags
+  assert emx.packages == fresh.packages
+  assert emx.attributes == fresh.attributes
+
+def test_convert2_update_resolves_moved_entities(catalogue, tmp_path):
+  # include files are not supported by Convert2
+  files = [file for file in catalogue if not file.endswith('members.yaml')]
+  emx2 = Convert2(files = files, schemas = {'groups': 'groupsSchema'})
+  emx2.convert()
+  refs = [row for row in emx2.models['people']['molgenis'] if row.get('refTable')]
+  assert refs[0]['refSchema'] == 'groupsSchema'
+  (tmp_path / 'other.yaml').write_text('label: Other\n' + (tmp_path / 'other.yaml').read_text())
+  assert emx2.update() == [files[2]]
+  
+  # move `groups` into the `other` package
+  (tmp_path / 'groups.yaml').write_text('name: groups\nentities: []\n')
+  (tmp_path / 'other.yaml').write_text(
+    (tmp_path / 'other.yaml').read_text()
+    + '  - name: groups\n    attributes:\n      - name: id\n        idAttribute: true\n'
+  )
+  updated = emx2.update()
+  assert updated == files, 'files that referred to a moved entity should be converted again'
+  
+  fresh = Convert2(files = files, schemas = {'groups': 'groupsSchema'})
+  fresh.convert()
+  assert emx2.models == fresh.models
@@ -0,0 +1,49 @@
+import os
+import pytest
+from yamlemxconvert.convert import Convert
+
+@pytest.fixture
+def emx():
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert()
+  return emx
+
+@pytest.mark.parametrize('engine', ['pandas', 'stream'])
+def test_unchanged_files_are_not_rewritten(tmp_path, emx, engine):
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = engine, incremental = True)
+  files = [file for file in os.listdir(tmp_path) if file.endswith('.csv')]
+  for file in files:
+    os.utime(tmp_path / file, ns = (0, 0))
+  
+  emx.entities[0]['description'] = 'updated description'
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = engine, incremental = True)
+  changed = [file for file in files if os.stat(tmp_path / file).st_mtime_ns != 0]
+  assert changed == ['entities.csv'], 'Only files with new contents should be rewritten'
+
+def test_modified_files_are_rewritten(tmp_path, emx):
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = 'stream', incremental = True)
+  expected = (tmp_path / 'entities.csv').read_bytes()
+  (tmp_path / 'entities.csv').write_bytes(expected[:10])
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = 'stream', incremental = True)
+  assert (tmp_path / 'entities.csv').read_bytes() == expected, 'Output files that were edited should be restored'
+
+def test_stale_datasets_are_removed(tmp_path, emx):
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = 'stream', incremental = True)
+  assert os.path.exists(tmp_path / 'birdData_states.csv')
+  del emx.data['birdData_states']
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = 'stream', incremental = True)
+  assert not os.path.exists(tmp_path / 'birdData_states.csv'), 'Stale dataset files should be removed'
+  assert os.path.exists(tmp_path / 'birdData_species.csv'), 'Current dataset files should be kept'
+
+def test_datasets_are_kept_without_data(tmp_path, emx):
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = 'stream', incremental = True)
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = 'stream', incremental = True, includeData = False)
+  assert os.path.exists(tmp_path / 'birdData_states.csv'), 'Datasets should not be removed if they are not written'
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = 'stream', incremental = True)
+  del emx.data['birdData_states']
+  emx.write(format = 'csv', outDir = str(tmp_path), engine = 'stream', incremental = True)
+  assert not os.path.exists(tmp_path / 'birdData_states.csv'), 'The manifest should still list the datasets'
+
+def test_incremental_requires_csv(tmp_path, emx):
+  with pytest.raises(ValueError):
+    emx.write(name = 'birddata', format = 'xlsx', outDir = str(tmp_path), incremental = True)
@@ -0,0 +1,76 @@
+import json
+import os
+import logging
+from yamlemxconvert.convert import Convert
+from yamlemxconvert.convert2 import Convert2
+from yamlemxconvert.emxProfiler import emxProfiler
+from yamlemxconvert.cli import main
+
+def test_convert_profile(tmp_path):
+  events = []
+  profiler = emxProfiler(callback = events.append)
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'], profiler = profiler)
+  emx.convert()
+  emx.compileSemanticTags()
+  emx.write(name = 'birddata', format = 'csv', outDir = str(tmp_path), engine = 'stream')
+  emx.write_schema(path = str(tmp_path / 'schema.md'))
+  
+  profile = profiler.toDict()
+  assert list(profile['stages']) == ['convert', 'compileSemanticTags', 'write', 'write_schema']
+  assert profile['counters']['files'] == 1
+  assert profile['counters']['entities'] == len(emx.entities)
+  assert profile['counters']['attributes'] == len(emx.attributes)
+  assert profile['counters']['rows'] == sum([len(rows) for rows in emx.data.values()]) + len(emx.packages) + len(emx.entities) + len(emx.attributes) + len(emx.tags)
+  assert profile['counters']['bytes'] == sum([file.stat().st_size for file in tmp_path.glob('*.csv')])
+  assert 'extract' in profile['files']['tests/models/model_simple/birddata.yaml']
+  assert profile['files']['attributes.csv']['write'] > 0
+  assert [event['stage'] for event in events if event['event'] == 'stage'] == list(profile['stages'])
+  
+  profiler.save(str(tmp_path / 'profile.json'))
+  with open(tmp_path / 'profile.json') as stream:
+    assert json.load(stream)['counters'] == profile['counters']
+
+def test_profile_with_copied_data_file(tmp_path):
+  data = tmp_path / 'observations.csv'
+  data.write_text('id,count\n1,10\n2,20\n')
+  model = tmp_path / 'model.yaml'
+  model.write_text(
+    'name: model\nentities:\n  - name: observations\n'
+    f'    dataFile: {data}\n    attributes:\n'
+    '      - name: id\n        idAttribute: true\n      - name: count\n        dataType: int\n'
+  )
+  profiler = emxProfiler()
+  emx = Convert(files = [str(model)], profiler = profiler)
+  emx.convert()
+  os.makedirs(tmp_path / 'out')
+  emx.write(name = 'model', format = 'csv', outDir = str(tmp_path / 'out'), engine = 'stream')
+  profile = profiler.toDict()
+  assert (tmp_path / 'out' / 'model_observations.csv').read_text() == data.read_text()
+  assert profile['counters']['filesWritten'] == 4
+  assert profile['counters']['rows'] == len(emx.packages) + len(emx.entities) + len(emx.attributes)
+
+def test_convert2_profile(tmp_path):
+  profiler = emxProfiler()
+  emx2 = Convert2(file = 'tests/models/model_simple/birddata.yaml', profiler = profiler)
+  emx2.convert()
+  emx2.write(name = 'birddata', format = 'xlsx', outDir = str(tmp_path), engine = 'stream')
+  profile = profiler.toDict()
+  assert list(profile['stages']) == ['load', 'convert', 'write']
+  assert profile['counters']['bytes'] == (tmp_path / 'birddata.xlsx').stat().st_size
+
+def test_messages_are_logged(capsys, caplog):
+  with caplog.at_level(logging.INFO, logger = 'yamlemxconvert'):
+    Convert(files = ['tests/models/model_simple/birddata.yaml']).convert()
+  assert 'Processing: tests/models/model_simple/birddata.yaml' in caplog.messages
+  assert capsys.readouterr().out == '', 'Messages should not be printed'
+
+def test_cli_profile(tmp_path):
+  code = main([
+    'emx1', 'tests/models/model_simple/birddata.yaml', '--quiet',
+    '--format', 'csv', '--out-dir', str(tmp_path), '--profile', str(tmp_path / 'profile.json')
+  ])
+  assert code == 0
+  with open(tmp_path / 'profile.json') as stream:
+    profile = json.load(stream)
+  assert set(profile['stages']) == {'convert', 'write'}
+  assert profile['counters']['filesWritten'] > 0
@@ -0,0 +1,57 @@
+import filecmp
+import os
+import pickle
+import pytest
+from yamlemxconvert.convert import Convert
+from yamlemxconvert.emxRecord import emxRecord, toDicts
+
+def test_record_behaves_like_dict():
+  defaults = {'nillable': True, 'idAttribute': False}
+  record = emxRecord({'name': 'id', 'idAttribute': True}, defaults)
+  assert record == {'name': 'id', 'idAttribute': True, 'nillable': True}
+  assert list(record) == ['name', 'idAttribute', 'nillable']
+  assert record.get('dataType', 'string') == 'string'
+  
+  record['dataType'] = 'string'
+  del record['nillable']
+  assert record.toDict() == {'name': 'id', 'idAttribute': True, 'dataType': 'string'}
+  assert defaults == {'nillable': True, 'idAttribute': False}, 'defaults should not be modified'
+  assert pickle.loads(pickle.dumps(record)) == record
+  with pytest.raises(KeyError):
+    record['label']
+
+def test_compact_defaults_match_dicts(tmp_path):
+  model = tmp_path / 'model.yaml'
+  model.write_text(
+    'name: pkg\ndefaults:\n  nillable: true\n  note: default note\n'
+    'entities:\n  - name: things\n    attributes:\n'
+    '      - name: id\n        idAttribute: true\n        nillable: false\n        note: not an EMX key\n'
+    '      - name: label\n'
+  )
+  expected = Convert(files = [str(model)])
+  expected.convert()
+  emx = Convert(files = [str(model)])
+  emx.convert(compact = True)
+  assert toDicts(emx.attributes) == expected.attributes
+  assert 'note' not in emx.attributes[0], 'keys that are set in the attribute should not get a default'
+
+def test_records_share_keys_and_defaults():
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert(compact = True)
+  first, second = emx.attributes[0], emx.attributes[1]
+  assert isinstance(first, emxRecord)
+  assert first.__defaults__ is second.__defaults__
+  assert toDicts(emx.attributes) == [dict(attr) for attr in emx.attributes]
+
+@pytest.mark.parametrize('engine', ['pandas', 'stream'])
+def test_compact_model_output_is_identical(tmp_path, engine):
+  for compact in [False, True]:
+    emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+    emx.convert(compact = compact)
+    emx.compileSemanticTags()
+    os.makedirs(tmp_path / str(compact))
+    emx.write(name = 'birddata', format = 'csv', outDir = str(tmp_path / str(compact)), engine = engine)
+  files = sorted(os.listdir(tmp_path / 'False'))
+  assert files == sorted(os.listdir(tmp_path / 'True'))
+  _, mismatch, errors = filecmp.cmpfiles(tmp_path / 'False', tmp_path / 'True', files, shallow = False)
+  assert mismatch == [] and errors == []
@@ -0,0 +1,225 @@
+import os
+import re
+import zipfile
+import pytest
+from yamlemxconvert.convert import Convert
+from yamlemxconvert.convert2 import Convert2
+from yamlemxconvert.emxStreamWriter import xlsxSheetNames, xlsxSheetWriter, atomicWrite, writeArrowRows
+from yamlemxconvert.fileDataset import fileDataset
+from yamlemxconvert.utils import openFile
+
+def readFiles(dir):
+  files = {}
+  for file in sorted(os.listdir(dir)):
+    with open(os.path.join(dir, file), 'rb') as stream:
+      files[file] = stream.read()
+  return files
+
+@pytest.mark.parametrize('files', [
+  ['tests/models/model_simple/birddata.yaml'],
+  ['tests/models/model_complex/birddata.yaml', 'tests/models/model_complex/birddata_refs.yaml']
+])
+def test_stream_csv_matches_pandas_csv(tmp_path, files):
+  emx = Convert(files = files)
+  emx.convert()
+  emx.compileSemanticTags()
+  (tmp_path / 'pandas').mkdir()
+  (tmp_path / 'stream').mkdir()
+  emx.write(format = 'csv', outDir = str(tmp_path / 'pandas'))
+  emx.write(format = 'csv', outDir = str(tmp_path / 'stream'), engine = 'stream')
+  assert readFiles(tmp_path / 'pandas') == readFiles(tmp_path / 'stream'), 'Stream writer output should match pandas output'
+
+def test_stream_csv_keeps_integer_keys_emx2(tmp_path):
+  emx2 = Convert2(file = 'tests/models/model_complex/birddata.yaml')
+  emx2.convert()
+  emx2.write(name = 'birddata', format = 'csv', outDir = str(tmp_path), engine = 'stream')
+  with open(tmp_path / 'molgenis.csv', 'r') as stream:
+    contents = stream.read()
+  assert '"birdID","string","1","True"' in contents, 'Integer keys should not be upcast to floats'
+
+def test_stream_xlsx_is_written(tmp_path):
+  pytest.importorskip('xlsxwriter')
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert()
+  emx.write(name = 'birddata', format = 'xlsx', outDir = str(tmp_path), engine = 'stream')
+  assert os.path.exists(tmp_path / 'birddata.xlsx'), 'Workbook should be written'
+
+def test_stream_xlsx_joins_lists(tmp_path):
+  pytest.importorskip('xlsxwriter')
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert()
+  emx.data['birdData_lists'] = [{'id': 'a', 'refs': ['x', 'y'], 'codes': (1, 2)}]
+  emx.write(name = 'birddata', format = 'xlsx', outDir = str(tmp_path), engine = 'stream')
+  with zipfile.ZipFile(tmp_path / 'birddata.xlsx') as workbook:
+    contents = ''.join(workbook.read(name).decode() for name in workbook.namelist() if name.endswith('.xml'))
+  assert '>x,y<' in contents and '>1,2<' in contents, 'Lists should be joined with commas'
+
+def test_unknown_engine_raises():
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert()
+  with pytest.raises(ValueError):
+    emx.write(format = 'csv', engine = 'unknown')
+
+def readSheetNames(file):
+  with zipfile.ZipFile(file) as workbook:
+    return re.findall(r'<sheet name="([^"]+)"', workbook.read('xl/workbook.xml').decode())
+
+def test_xlsx_sheet_names_are_checked():
+  with pytest.raises(ValueError, match = 'longer than 31 characters'):
+    xlsxSheetNames({'birdData_' + 'x' * 30: []})
+  with pytest.raises(ValueError, match = 'more than once'):
+    xlsxSheetNames({'species': [], 'Species': []})
+  with pytest.raises(ValueError, match = 'rows'):
+    xlsxSheetNames({'species': [{}] * 3}, maxRows = 3)
+  assert xlsxSheetNames({'species': [{}] * 5}, splitSheets = True, maxRows = 3) == {
+    'species': ['species', 'species_2', 'species_3']
+  }
+
+def test_xlsx_large_datasets_are_split(tmp_path):
+  xlsxwriter = pytest.importorskip('xlsxwriter')
+  file = str(tmp_path / 'split.xlsx')
+  wb = xlsxwriter.Workbook(file, {'constant_memory': True})
+  writer = xlsxSheetWriter(wb, splitSheets = True, maxRows = 3)
+  writer.write('species', [{'id': index} for index in range(5)])
+  wb.close()
+  assert readSheetNames(file) == ['species', 'species_2', 'species_3']
+
+def test_xlsx_lazy_datasets_are_not_counted(tmp_path, monkeypatch):
+  xlsxwriter = pytest.importorskip('xlsxwriter')
+  data = tmp_path / 'species.csv'
+  data.write_text('id\n' + ''.join(f'{index}\n' for index in range(5)))
+  def count(self):
+    raise AssertionError('datasets should not be read to count their rows')
+  monkeypatch.setattr(fileDataset, '__len__', count)
+  file = str(tmp_path / 'split.xlsx')
+  wb = xlsxwriter.Workbook(file, {'constant_memory': True})
+  writer = xlsxSheetWriter(wb, splitSheets = True, maxRows = 3)
+  writer.names = xlsxSheetNames({'species': fileDataset(str(data))}, True, 3)
+  writer.write('species', fileDataset(str(data)))
+  wb.close()
+  assert readSheetNames(file) == ['species', 'species_2', 'species_3']
+  
+  wb = xlsxwriter.Workbook(str(tmp_path / 'single.xlsx'), {'constant_memory': True})
+  writer = xlsxSheetWriter(wb, maxRows = 3)
+  with pytest.raises(ValueError, match = 'more than 2 rows'):
+    writer.write('species', fileDataset(str(data)))
+  wb.close()
+
+def test_xlsx_limits_fail_before_writing(tmp_path):
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert()
+  emx.data['birdData_' + 'x' * 30] = [{'id': 1}]
+  for engine in ['pandas', 'stream']:
+    with pytest.raises(ValueError):
+      emx.write(name = engine, format = 'xlsx', outDir = str(tmp_path), engine = engine)
+    assert not os.path.exists(tmp_path / f'{engine}.xlsx')
+
+@pytest.mark.parametrize('engine', ['pandas', 'stream'])
+def test_threaded_csv_matches_sequential(tmp_path, engine):
+  emx = Convert(files = ['tests/models/model_complex/birddata.yaml', 'tests/models/model_complex/birddata_refs.yaml'])
+  emx.convert()
+  (tmp_path / 'sequential').mkdir()
+  (tmp_path / 'threaded').mkdir()
+  emx.write(format = 'csv', outDir = str(tmp_path / 'sequential'), engine = engine)
+  summary = emx.write(format = 'csv', outDir = str(tmp_path / 'threaded'), engine = engine, workers = 4)
+  assert readFiles(tmp_path / 'sequential') == readFiles(tmp_path / 'threaded')
+  assert [file['file'] for file in summary][:3] == ['packages.csv', 'entities.csv', 'attributes.csv']
+  attributes = summary[2]
+  assert attributes['rows'] == len(emx.attributes)
+  assert attributes['bytes'] == os.path.getsize(tmp_path / 'threaded' / 'attributes.csv')
+  assert attributes['elapsed'] >= 0
+
+def test_atomic_write_keeps_existing_file(tmp_path):
+  file = tmp_path / 'species.csv'
+  file.write_text('id\n1\n')
+  def fail(path):
+    with open(path, 'w') as stream:
+      stream.write('id\n')
+    raise RuntimeError('interrupted')
+  with pytest.raises(RuntimeError):
+    atomicWrite(str(file), fail)
+  assert file.read_text() == 'id\n1\n', 'Interrupted writes should not replace the file'
+  assert os.listdir(tmp_path) == ['species.csv'], 'Temporary files should be removed'
+
+@pytest.mark.parametrize('engine', ['pandas', 'stream'])
+@pytest.mark.parametrize('format,compression', [('csv.gz', 'gzip'), ('csv.zst', 'zstd')])
+def test_compressed_csv_matches_csv(tmp_path, engine, format, compression):
+  if compression == 'zstd':
+    pytest.importorskip('zstandard')
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert()
+  (tmp_path / 'csv').mkdir()
+  (tmp_path / format).mkdir()
+  emx.write(format = 'csv', outDir = str(tmp_path / 'csv'), engine = engine)
+  emx.write(format = format, outDir = str(tmp_path / format), engine = engine)
+  expected = readFiles(tmp_path / 'csv')
+  files = readFiles(tmp_path / format)
+  assert 'attributes.csv' in files, 'Metadata should be written as csv'
+  for dataset in emx.data:
+    with openFile(str(tmp_path / format / f'{dataset}.{format}'), 'r', compression) as stream:
+      assert stream.read().encode() == expected[f'{dataset}.csv']
+  
+  # compressed files are reproducible
+  emx.write(format = format, outDir = str(tmp_path / format), engine = engine)
+  assert readFiles(tmp_path / format) == files
+
+@pytest.mark.parametrize('engine', ['pandas', 'stream'])
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+def test_columnar_datasets(tmp_path, engine, format):
+  pytest.importorskip('pyarrow')
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert()
+  emx.write(format = format, outDir = str(tmp_path), engine = engine)
+  assert os.path.exists(tmp_path / 'attributes.csv')
+  for dataset in emx.data:
+    rows = list(fileDataset(str(tmp_path / f'{dataset}.{format}')))
+    columns = list(rows[0].keys())
+    assert rows == [{column: row.get(column) for column in columns} for row in emx.data[dataset]]
+
+class chunkedRows:
+  def __init__(self, chunks):
+    self.__chunks__ = chunks
+  def columns(self):
+    return ['id', 'empty', 'mixed', 'number']
+  def __iter__(self):
+    return (row for chunk in self.__chunks__ for row in chunk)
+  def chunks(self):
+    return iter(self.__chunks__)
+
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+@pytest.mark.parametrize('lazy', [True, False])
+def test_columnar_types_are_merged(tmp_path, format, lazy):
+  pytest.importorskip('pyarrow')
+  chunks = [
+    [{'id': 1, 'empty': None, 'mixed': 1, 'number': 1}, {'id': 2, 'mixed': 2, 'number': 2}],
+    [{'id': 3, 'empty': 'a', 'mixed': 'b', 'number': 2.5}]
+  ]
+  rows = chunkedRows(chunks) if lazy else [row for chunk in chunks for row in chunk]
+  file = str(tmp_path / f'data.{format}')
+  assert writeArrowRows(file, rows, format) == 3
+  assert list(fileDataset(file)) == [
+    {'id': 1, 'empty': None, 'mixed': '1', 'number': 1.0},
+    {'id': 2, 'empty': None, 'mixed': '2', 'number': 2.0},
+    {'id': 3, 'empty': 'a', 'mixed': 'b', 'number': 2.5}
+  ]
+
+def readZip(file):
+  with zipfile.ZipFile(file) as archive:
+    return {name: archive.read(name) for name in sorted(archive.namelist())}
+
+def test_zip_matches_csv(tmp_path):
+  emx = Convert(files = ['tests/models/model_complex/birddata.yaml', 'tests/models/model_complex/birddata_refs.yaml'])
+  emx.convert()
+  emx.compileSemanticTags()
+  (tmp_path / 'csv').mkdir()
+  emx.write(format = 'csv', outDir = str(tmp_path / 'csv'), engine = 'stream')
+  emx.write(name = 'birddata', format = 'zip', outDir = str(tmp_path))
+  assert readZip(tmp_path / 'birddata.zip') == readFiles(tmp_path / 'csv')
+
+def test_zip_matches_csv_emx2(tmp_path):
+  emx2 = Convert2(file = 'tests/models/model_complex/birddata.yaml')
+  emx2.convert()
+  (tmp_path / 'csv').mkdir()
+  emx2.write(name = 'birddata', format = 'csv', outDir = str(tmp_path / 'csv'), engine = 'stream')
+  emx2.write(name = 'birddata', format = 'zip', outDir = str(tmp_path))
+  assert readZip(tmp_path / 'birddata.zip') == readFiles(tmp_path / 'csv')
@@ -0,0 +1,144 @@
+import time
+from yamlemxconvert.convert import Convert
+from yamlemxconvert.emxValidator import emxValidator
+from yamlemxconvert.fileDataset import fileDataset
+
+def test_simple_model_is_valid():
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert()
+  report = emx.validate()
+  assert report.valid, str(report)
+
+def test_missing_extends_are_reported():
+  emx = Convert(files = [
+    'tests/models/model_complex/birddata.yaml',
+    'tests/models/model_complex/birddata_refs.yaml'
+  ])
+  emx.convert()
+  report = emx.validate()
+  assert not report.valid
+  assert sorted([error['entity'] for error in report.errors if error['check'] == 'extends']) == [
+    'birdData_refs_colors',
+    'birdData_refs_conservationStatus',
+    'birdData_refs_wings'
+  ]
+
+def test_all_errors_are_collected():
+  packages = [{'name': 'pkg', 'parent': 'missing'}]
+  entities = [
+    {'name': 'a', 'package': 'pkg'},
+    {'name': 'b', 'package': 'pkg'},
+    {'name': 'c', 'package': 'pkg', 'abstract': True},
+    {'name': 'c', 'package': 'pkg'}
+  ]
+  attributes = [
+    {'entity': 'pkg_a', 'name': 'id', 'idAttribute': True, 'nillable': False},
+    {'entity': 'pkg_a', 'name': 'ref', 'dataType': 'xref', 'refEntity': 'pkg_missing'},
+    {'entity': 'pkg_a', 'name': 'refs', 'dataType': 'mref'},
+    {'entity': 'pkg_a', 'name': 'part', 'partOfAttribute': 'id'},
+    {'entity': 'pkg_b', 'name': 'name', 'labelAttribute': True},
+    {'entity': 'pkg_b', 'name': 'label', 'labelAttribute': True},
+    {'entity': 'pkg_missing', 'name': 'id', 'idAttribute': True}
+  ]
+  report = emxValidator(packages, entities, attributes).validate()
+  checks = sorted([error['check'] for error in report.errors])
+  assert checks == [
+    'entity', 'entity', 'idAttribute', 'labelAttribute', 'parent',
+    'partOfAttribute', 'refEntity', 'refEntity'
+  ]
+  ref = next(error for error in report.errors if error.get('value') == 'pkg_missing' and error['check'] == 'refEntity')
+  assert ref['entity'] == 'pkg_a' and ref['attribute'] == 'ref'
+
+def test_invalid_datatypes_are_reported(tmp_path):
+  model = tmp_path / 'model.yaml'
+  model.write_text(
+    'name: pkg\nentities:\n  - name: things\n    attributes:\n'
+    '      - name: id\n        idAttribute: true\n        nillable: false\n'
+    '      - name: size\n        dataType: number\n'
+    '      - name: color\n        dataType: colour\n'
+  )
+  emx = Convert(files = [str(model)])
+  emx.convert()
+  report = emx.validate()
+  assert not report.valid
+  assert sorted(error['value'] for error in report.errors if error['check'] == 'dataType') == ['colour', 'number']
+
+def test_known_entities_and_inherited_ids():
+  packages = [{'name': 'pkg'}]
+  entities = [
+    {'name': 'base', 'package': 'pkg', 'abstract': True},
+    {'name': 'child', 'package': 'pkg', 'extends': 'pkg_base'}
+  ]
+  attributes = [
+    {'entity': 'pkg_base', 'name': 'id', 'idAttribute': 'AUTO', 'nillable': False},
+    {'entity': 'pkg_child', 'name': 'file', 'dataType': 'xref', 'refEntity': 'sys_FileMeta'}
+  ]
+  report = emxValidator(packages, entities, attributes).validate()
+  assert [error['value'] for error in report.errors] == ['sys_FileMeta']
+  report = emxValidator(packages, entities, attributes, known = ['sys_FileMeta']).validate()
+  assert report.valid, str(report)
+
+def test_large_model():
+  packages = [{'name': 'pkg'}]
+  entities = [{'name': f'e{index}', 'package': 'pkg'} for index in range(400)]
+  attributes = []
+  for index in range(400):
+    attributes.append({'entity': f'pkg_e{index}', 'name': 'id', 'idAttribute': True, 'nillable': False})
+    for column in range(99):
+      attributes.append({
+        'entity': f'pkg_e{index}',
+        'name': f'ref{column}',
+        'dataType': 'xref',
+        'refEntity': f'pkg_e{(index + column) % 400}'
+      })
+  start = time.perf_counter()
+  report = emxValidator(packages, entities, attributes).validate()
+  assert report.valid
+  assert time.perf_counter() - start < 2, 'Validating 40000 attributes should take less than a few seconds'
+
+def test_data_values_are_checked():
+  packages = [{'name': 'pkg'}]
+  entities = [{'name': 'groups', 'package': 'pkg'}, {'name': 'people', 'package': 'pkg'}]
+  attributes = [
+    {'entity': 'pkg_groups', 'name': 'id', 'idAttribute': True, 'nillable': False},
+    {'entity': 'pkg_people', 'name': 'id', 'idAttribute': True, 'nillable': False},
+    {'entity': 'pkg_people', 'name': 'age', 'dataType': 'int'},
+    {'entity': 'pkg_people', 'name': 'height', 'dataType': 'decimal'},
+    {'entity': 'pkg_people', 'name': 'born', 'dataType': 'date'},
+    {'entity': 'pkg_people', 'name': 'active', 'dataType': 'bool'},
+    {'entity': 'pkg_people', 'name': 'group', 'dataType': 'xref', 'refEntity': 'pkg_groups'},
+    {'entity': 'pkg_people', 'name': 'groups', 'dataType': 'mref', 'refEntity': 'pkg_groups'}
+  ]
+  data = {
+    'pkg_groups': [{'id': 'a'}, {'id': 'b'}],
+    'pkg_people': [
+      {'id': 'p1', 'age': 31, 'height': '1.8', 'born': '1990-01-31', 'active': True, 'group': 'a', 'groups': 'a,b'},
+      {'id': 'p2', 'age': 'old', 'height': 'tall', 'born': '1990-02-31', 'active': 'yes', 'group': 'c', 'groups': ['a', 'd']},
+      {'id': 'p2', 'age': '3.5'},
+      {'age': 40}
+    ]
+  }
+  report = emxValidator(packages, entities, attributes, data = data).validate(includeData = True)
+  errors = sorted([(error['row'], error['attribute'], error['check']) for error in report.errors])
+  assert errors == [
+    (2, 'active', 'bool'),
+    (2, 'age', 'int'),
+    (2, 'born', 'date'),
+    (2, 'group', 'xref'),
+    (2, 'groups', 'mref'),
+    (2, 'height', 'decimal'),
+    (3, 'age', 'int'),
+    (3, 'id', 'idAttribute'),
+    (4, 'id', 'nillable')
+  ]
+
+def test_references_to_datasets_in_other_files(tmp_path):
+  states = tmp_path / 'states.csv'
+  states.write_text('code,category,name\nAU-NSW,state,New South Wales\n')
+  emx = Convert(files = ['tests/models/model_simple/birddata.yaml'])
+  emx.convert()
+  emx.data['birdData_states'] = fileDataset(str(states))
+  report = emx.validate(includeData = True)
+  rows = len(emx.data['birdData_species'])
+  assert [error['row'] for error in report.errors] == list(range(1, rows + 1))
+  assert report.errors[0]['message'] == 'birdData_species row 1, column primaryReportingTerritories: AU-VIC not an id of birdData_states'
@@ -0,0 +1,73 @@
+import json
+import pytest
+from yamlemxconvert.convert import Convert
+from yamlemxconvert.fileDataset import fileDataset
+
+rows = [{'id': str(i), 'value': f'value {i}'} for i in range(25)]
+
+@pytest.fixture
+def files(tmp_path):
+  (tmp_path / 'data.csv').write_text('id,value\n' + ''.join([f"{row['id']},{row['value']}\n" for row in rows]))
+  (tmp_path / 'data.tsv').write_text('id\tvalue\n' + ''.join([f"{row['id']}\t{row['value']}\n" for row in rows]))
+  (tmp_path / 'data.jsonl').write_text(''.join([json.dumps(row) + '\n' for row in rows]))
+  return tmp_path
+
+@pytest.mark.parametrize('name', ['data.csv', 'data.tsv', 'data.jsonl'])
+def test_datasets_are_read_in_chunks(files, name):
+  dataset = fileDataset(str(files / name), chunksize = 10)
+  assert [len(chunk) for chunk in dataset.chunks()] == [10, 10, 5], 'Rows should be read in chunks'
+  assert list(dataset) == rows
+  assert dataset.columns() == ['id', 'value']
+  assert len(dataset) == 25
+
+def test_parquet_datasets_are_read(files):
+  pa = pytest.importorskip('pyarrow')
+  pq = pytest.importorskip('pyarrow.parquet')
+  pq.write_table(pa.Table.from_pylist(rows), str(files / 'data.parquet'))
+  dataset = fileDataset(str(files / 'data.parquet'), chunksize = 10)
+  assert list(dataset) == rows and dataset.columns() == ['id', 'value']
+
+def test_compressed_csv_datasets_are_read(files):
+  import gzip
+  with gzip.open(str(files / 'data.csv.gz'), 'wb') as stream:
+    stream.write((files / 'data.csv').read_bytes())
+  dataset = fileDataset(str(files / 'data.csv.gz'), chunksize = 10)
+  assert dataset.format == 'csv.gz'
+  assert list(dataset) == rows and dataset.columns() == ['id', 'value']
+
+def test_arrow_datasets_are_read(files):
+  pa = pytest.importorskip('pyarrow')
+  table = pa.Table.from_pylist(rows)
+  with pa.ipc.new_file(str(files / 'data.arrow'), table.schema) as writer:
+    writer.write_table(table)
+  dataset = fileDataset(str(files / 'data.arrow'), chunksize = 10)
+  assert [len(chunk) for chunk in dataset.chunks()] == [10, 10, 5]
+  assert list(dataset) == rows and dataset.columns() == ['id', 'value']
+
+def test_unknown_format_raises(files):
+  with pytest.raises(ValueError):
+    fileDataset(str(files / 'data.txt'))
+
+@pytest.mark.parametrize('engine', ['pandas', 'stream'])
+def test_data_files_are_written_with_package_prefix(files, engine):
+  model = files / 'model.yaml'
+  model.write_text(
+    'name: pkg\ndefaults:\n  dataType: string\nentities:\n'
+    f'  - name: things\n    dataFile: {files / "data.jsonl"}\n'
+    '    attributes:\n      - name: id\n        idAttribute: true\n      - name: value\n'
+  )
+  emx = Convert(files = [str(model)])
+  emx.convert()
+  assert isinstance(emx.data['pkg_things'], fileDataset), 'Data files should not be read during conversion'
+  (files / 'out').mkdir()
+  emx.write(format = 'csv', outDir = str(files / 'out'), engine = engine)
+  assert (files / 'out' / 'pkg_things.csv').read_text() == (files / 'data.csv').read_text()
+
+def test_data_and_data_file_cannot_be_combined(files):
+  model = files / 'model.yaml'
+  model.write_text(
+    'name: pkg\nentities:\n'
+    '  - name: things\n    dataFile: data.csv\n    data:\n      - id: 1\n'
+  )
+  with pytest.raises(ValueError):
+    Convert(files = [str(model)]).convert()
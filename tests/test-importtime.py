@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import pytest
+
+# maximum cumulative import time (microseconds) of a yamlemxconvert module.
+# Importing pandas alone takes several times longer than this.
+IMPORT_BUDGET = 300000
+
+def importTimes(module: str = None):
+  """Import Times
+  Run `python -X importtime` in a fresh interpreter and return the
+  cumulative import time of every imported module
+  
+  @param module (str): name of the module to import
+  """
+  result = subprocess.run(
+    [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+    capture_output = True,
+    text = True,
+    check = True
+  )
+  times = {}
+  for line in result.stderr.splitlines():
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+    _, cumulative, name = line[len('import time:'):].split('|')
+    times[name.strip()] = int(cumulative)
+  return times
+
+@pytest.mark.parametrize('module', ['yamlemxconvert.convert', 'yamlemxconvert.convert2'])
+def test_import_does_not_load_pandas(module):
+  times = importTimes(module)
+  assert 'pandas' not in times, f'Importing {module} should not import pandas'
+  assert 'numpy' not in times, f'Importing {module} should not import numpy'
+
+@pytest.mark.parametrize('module', ['yamlemxconvert.convert', 'yamlemxconvert.convert2'])
+def test_import_time_is_within_budget(module):
+  times = importTimes(module)
+  assert times[module] < IMPORT_BUDGET, f'Importing {module} took {times[module]}us (budget: {IMPORT_BUDGET}us)'
@@ -0,0 +1,22 @@
+import datetime
+import yaml
+import pytest
+from yamlemxconvert.utils import loadYaml, SafeLoader
+
+files = [
+  'tests/models/model_simple/birddata.yaml',
+  'tests/models/model_complex/birddata.yaml',
+  'tests/models/model_complex/birddata_refs.yaml'
+]
+
+def test_default_loader_uses_libyaml_if_available():
+  expected = yaml.CSafeLoader if yaml.__with_libyaml__ else yaml.SafeLoader
+  assert SafeLoader is expected, 'loadYaml should prefer the libyaml loader'
+
+@pytest.mark.parametrize('file', files)
+def test_loaders_produce_identical_output(file):
+  assert loadYaml(file) == loadYaml(file, loader = yaml.SafeLoader), 'Loaders should produce identical output'
+
+def test_date_scalars_are_parsed():
+  contents = loadYaml(files[0])
+  assert contents['date'] == datetime.date(2021, 11, 12), 'Date scalars should be parsed as dates'
@@ -0,0 +1,75 @@
+import os
+import pytest
+from yamlemxconvert.convert import Convert
+from yamlemxconvert.utils import loadYaml
+from yamlemxconvert.yamlStream import loadYamlStream, yamlDataset
+
+files = [
+  'tests/models/model_simple/birddata.yaml',
+  'tests/models/model_complex/birddata.yaml',
+  'tests/models/model_complex/birddata_refs.yaml'
+]
+
+@pytest.mark.parametrize('file', files)
+def test_stream_matches_full_load(file):
+  expected = loadYaml(file)
+  contents = loadYamlStream(file)
+  for entity in contents['entities']:
+    if 'data' in entity:
+      assert isinstance(entity['data'], yamlDataset), 'Datasets should be loaded lazily'
+      assert len(entity['data']) == len(list(entity['data']))
+      entity['data'] = list(entity['data'])
+  assert contents == expected, 'Streaming load should produce the same contents'
+
+def test_anchors_in_datasets_are_resolved(tmp_path):
+  model = tmp_path / 'model.yaml'
+  model.write_text(
+    'name: pkg\nentities:\n  - name: things\n    data:\n'
+    '      - &base {id: a, group: x}\n      - {<<: *base, id: b}\n'
+    '    label: Things\n'
+  )
+  contents = loadYamlStream(str(model))
+  assert contents['entities'][0]['label'] == 'Things'
+  assert list(contents['entities'][0]['data']) == loadYaml(str(model))['entities'][0]['data']
+
+layouts = {
+  'block': 'name: pkg\nentities:\n  - name: a\n    data:\n      - id: 1\n        value: x\n      - id: 2\n        extra: y\n    label: A\n  - name: b\n    data:\n      - id: 3\n',
+  'indentless': 'name: pkg\nentities:\n- name: a\n  data:\n  - id: 1\n    value: x\n  - id: 2\n    extra: y\n  label: A\n- name: b\n  data:\n  - id: 3\n',
+  'flow': 'name: pkg\nentities:\n  - name: a\n    data: [{id: 1, value: x},\n      {id: 2, extra: y}]\n    label: A\n  - {name: b, data: [{id: 3}]}\n',
+  'crlf': 'name: pkg\r\nentities:\r\n  - name: a\r\n    data:\r\n      - id: 1\r\n        value: x\r\n      - id: 2\r\n        extra: y\r\n    label: A\r\n  - name: b\r\n    data:\r\n      - id: 3\r\n'
+}
+
+@pytest.mark.parametrize('contents', [
+  'name: pkg\ngroup: &group x\nentities:\n  - name: things\n    data:\n      - {id: a, group: *group}\n',
+  'name: pkg\nentities:\n  - name: things\n    data:\n      - {id: a, group: &group x}\n    label: *group\n'
+])
+def test_anchors_outside_datasets_fall_back_to_full_load(tmp_path, contents):
+  model = tmp_path / 'model.yaml'
+  model.write_text(contents)
+  assert loadYamlStream(str(model)) == loadYaml(str(model)), 'Files with anchors across data blocks should be loaded in full'
+
+@pytest.mark.parametrize('layout', layouts)
+def test_datasets_are_read_from_their_position(tmp_path, monkeypatch, layout):
+  model = tmp_path / 'model.yaml'
+  model.write_bytes(layouts[layout].encode('utf-8'))
+  contents = loadYamlStream(str(model))
+  def scan(self):
+    raise AssertionError('the file should not be parsed from the start')
+  monkeypatch.setattr(yamlDataset, '__scan__', scan)
+  expected = loadYaml(str(model))
+  for entity, expectedEntity in zip(contents['entities'], expected['entities']):
+    assert entity['data'].position is not None
+    assert list(entity['data']) == expectedEntity['data']
+  assert contents['entities'][0]['data'].columns() == ['id', 'value', 'extra'], 'columns should be collected while loading'
+
+def test_stream_conversion_writes_same_output(tmp_path):
+  expected = Convert(files = files[:1])
+  expected.convert()
+  emx = Convert(files = files[:1])
+  emx.convert(stream = True)
+  (tmp_path / 'expected').mkdir()
+  (tmp_path / 'stream').mkdir()
+  expected.write(format = 'csv', outDir = str(tmp_path / 'expected'), engine = 'stream')
+  emx.write(format = 'csv', outDir = str(tmp_path / 'stream'), engine = 'stream')
+  for file in os.listdir(tmp_path / 'expected'):
+    assert (tmp_path / 'stream' / file).read_bytes() == (tmp_path / 'expected' / file).read_bytes(), f'{file} should be identical'
@@ -0,0 +1,378 @@
+from os import path, makedirs, stat
+import argparse
+import glob
+import logging
+import sys
+import time
+
+log = logging.getLogger('yamlemxconvert')
+
+def expandFiles(patterns: list = None):
+  """Expand file patterns
+  Find all files that match one or more glob patterns. Files are returned
+  in the order of the patterns (and sorted within each pattern); duplicates
+  are removed.
+  
+  @param patterns (list): file paths or glob patterns (e.g., 'model/*.yaml')
+  
+  @return list of file paths
+  """
+  files = {}
+  for pattern in patterns:
+    matches = sorted(glob.glob(pattern, recursive = True))
+    if not matches:
+      raise ValueError(f'Error in expandFiles: no files match {pattern}')
+    for file in matches:
+      files[file] = None
+  return list(files)
+
+def __parser__():
+  """Build argument parser
+  @return argparse.ArgumentParser
+  """
+  parser = argparse.ArgumentParser(
+    prog = 'yamlemxconvert',
+    description = 'Convert YAML-EMX models into EMX (Molgenis) or EMX2 (Molgenis EMX2) format'
+  )
+  commands = parser.add_subparsers(dest = 'command', metavar = '{emx1,emx2,serve}')
+  commands.required = True
+  
+  shared = argparse.ArgumentParser(add_help = False)
+  shared.add_argument('files', nargs = '+', help = 'yaml files or glob patterns (quote patterns to avoid shell expansion)')
+  shared.add_argument('-n', '--name', help = 'name of the output file (default: name of the model)')
+  shared.add_argument('-f', '--format', choices = ['xlsx', 'zip', 'csv', 'csv.gz', 'csv.zst', 'parquet', 'arrow'], default = 'xlsx', help = 'output format (default: xlsx)')
+  shared.add_argument('-o', '--out-dir', dest = 'outDir', default = '.', help = 'output directory (default: current directory)')
+  shared.add_argument('--engine', choices = ['pandas', 'stream'], default = 'pandas', help = 'writer engine (default: pandas)')
+  shared.add_argument('--split-sheets', dest = 'splitSheets', action = 'store_true', help = 'split datasets that are too large for one xlsx sheet (requires --engine stream)')
+  shared.add_argument('--no-data', dest = 'includeData', action = 'store_false', help = 'do not write datasets')
+  shared.add_argument('-j', '--jobs', type = int, default = None, help = 'number of worker processes (conversion) and threads (csv output)')
+  shared.add_argument('-w', '--watch', action = 'store_true', help = 'convert again when files change')
+  shared.add_argument('--interval', type = float, default = 0.5, help = 'seconds between checks in watch mode (default: 0.5)')
+  shared.add_argument('-q', '--quiet', action = 'store_true', help = 'only show warnings and errors')
+  shared.add_argument('-v', '--verbose', action = 'store_true', help = 'show all messages, including profiler events')
+  shared.add_argument('--profile', nargs = '?', const = '', metavar = 'PATH', help = 'show timings, counters, and peak memory, and save them as JSON to PATH (optional)')
+  shared.add_argument('--graph', metavar = 'PATH', help = 'save the dependency graph of the files (JSON) to this path')
+  shared.add_argument('--cache', help = 'directory of an on-disk cache of extracted files')
+  shared.add_argument('--daemon', nargs = '?', const = '127.0.0.1:8765', metavar = 'HOST:PORT', help = 'send the request to a running daemon (default: 127.0.0.1:8765)')
+  shared.add_argument('--token-file', dest = 'tokenFile', metavar = 'PATH', help = 'token file of the daemon (default: ~/.yamlemxconvert/daemon-<host>-<port>.token)')
+  
+  emx1 = commands.add_parser('emx1', parents = [shared], help = 'convert to EMX1')
+  emx1.add_argument('--priority-name-key', dest = 'priorityNameKey', help = 'name attribute that gets priority (see Convert.convert)')
+  emx1.add_argument('--no-pkg-meta', dest = 'includePkgMeta', action = 'store_false', help = 'do not add version and date to package descriptions')
+  emx1.add_argument('--stream', action = 'store_true', help = 'read inline datasets lazily (use with --engine stream)')
+  emx1.add_argument('--compact', action = 'store_true', help = 'store the model in compact records (for very large models)')
+  emx1.add_argument('--tags', action = 'store_true', help = 'compile semantic tags')
+  emx1.add_argument('--tag-cache', dest = 'tagCache', help = 'JSON file to store parsed semantic tags across runs')
+  emx1.add_argument('--schema', help = 'write a markdown schema of the model to this path')
+  emx1.add_argument('--validate', action = 'store_true', help = 'validate the model and only write it if there are no errors')
+  emx1.add_argument('--check', action = 'store_true', help = 'validate the model without writing it')
+  emx1.add_argument('--known', nargs = '+', default = [], metavar = 'NAME', help = 'packages and entities that exist in the database, but not in the model')
+  
+  emx2 = commands.add_parser('emx2', parents = [shared], help = 'convert to EMX2')
+  emx2.add_argument('--keep-model-package', dest = 'keepModelPackage', action = 'store_true', help = 'keep EMX1 package names in references')
+  emx2.add_argument('-s', '--schemas', nargs = '+', default = [], metavar = 'PACKAGE=SCHEMA', help = 'rename EMX1 packages to EMX2 schemas')
+  
+  serve = commands.add_parser('serve', help = 'start a conversion daemon')
+  serve.add_argument('--host', default = '127.0.0.1', help = 'address to listen on (default: 127.0.0.1)')
+  serve.add_argument('--port', type = int, default = 8765, help = 'port to listen on (default: 8765)')
+  serve.add_argument('--workers', type = int, default = 4, help = 'maximum number of concurrent requests (default: 4)')
+  serve.add_argument('--verbose', action = 'store_true', help = 'log all requests')
+  serve.add_argument('--token-file', dest = 'tokenFile', metavar = 'PATH', help = 'write the token of the daemon to this path (default: ~/.yamlemxconvert/daemon-<host>-<port>.token)')
+  return parser
+
+def resolveOptions(args):
+  """Resolve options
+  Convert parsed arguments into a dictionary that can be sent to a daemon.
+  Paths are made absolute, because the daemon may run in another directory.
+  
+  @param args (argparse.Namespace): parsed arguments
+  
+  @return dictionary of options
+  """
+  options = dict(vars(args))
+  options.pop('tokenFile', None)
+  options['files'] = [path.abspath(file) for file in args.files]
+  options['outDir'] = path.abspath(args.outDir)
+  for key in ['schema', 'cache', 'tagCache', 'graph', 'profile']:
+    if options.get(key):
+      options[key] = path.abspath(options[key])
+  return options
+
+class stderrHandler(logging.StreamHandler):
+  """Log handler that writes to the current `sys.stderr` (which may be
+  replaced after the handler is created)
+  """
+  def __init__(self):
+    logging.Handler.__init__(self)
+
+  @property
+  def stream(self):
+    return sys.stderr
+
+def configureLogging(level: int = logging.INFO):
+  """Configure logging
+  Show messages of the 'yamlemxconvert' logger on stderr
+
+  @param level (int): minimum level of messages
+  """
+  log.setLevel(level)
+  if not any([isinstance(handler, stderrHandler) for handler in log.handlers]):
+    handler = stderrHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    log.addHandler(handler)
+
+def __profiler__(args):
+  """Create profiler
+  @param args (argparse.Namespace): parsed arguments
+  @return emxProfiler if `--profile` is used, otherwise None
+  """
+  if getattr(args, 'profile', None) is None:
+    return None
+  from yamlemxconvert.emxProfiler import emxProfiler
+  return emxProfiler()
+
+def __save__profile__(args, profiler = None):
+  """Show and save profile
+  @param args (argparse.Namespace): parsed arguments
+  @param profiler (emxProfiler): profiler or None
+  """
+  if profiler is None:
+    return
+  log.info(str(profiler))
+  if args.profile:
+    profiler.save(args.profile)
+
+def runEmx1(args, files: list = None, cache = None, incremental: bool = False, session: dict = None):
+  """Run EMX1 conversion
+  @param args (argparse.Namespace): parsed arguments
+  @param files (list): yaml files
+  @param cache: an `emxCache` or `emxMemoryCache` (optional)
+  @param incremental (bool): see `Convert.write`
+  @param session (dict): if defined, the converted model is kept here and
+    updated in the next run (see `Convert.update`)
+  
+  @return validationReport if the model was validated, otherwise None
+  """
+  from yamlemxconvert.convert import Convert
+  profiler = __profiler__(args)
+  emx = session.get('emx') if session else None
+  
+  # files that were deleted are removed by `update`
+  if emx is not None and [file for file in emx.files if file in files or path.exists(file)] == files:
+    emx.profiler = profiler
+    emx.update()
+  else:
+    emx = Convert(files = files, profiler = profiler)
+    emx.convert(
+      includePkgMeta = args.includePkgMeta,
+      priorityNameKey = args.priorityNameKey,
+      workers = args.jobs,
+      cache = cache,
+      stream = args.stream,
+      compact = args.compact
+    )
+    if args.tags:
+      emx.compileSemanticTags(cache = args.tagCache)
+    if session is not None:
+      session['emx'] = emx
+  if args.graph:
+    emx.graph.save(args.graph)
+  report = None
+  if args.validate or args.check:
+    report = emx.validate(known = args.known, includeData = args.includeData)
+    print(report)
+  if report is None or (report.valid and not args.check):
+    emx.write(
+      name = args.name or emx.name,
+      format = args.format,
+      outDir = args.outDir,
+      includeData = args.includeData,
+      engine = args.engine,
+      incremental = incremental and args.format not in ['xlsx', 'zip'],
+      splitSheets = args.splitSheets,
+      workers = args.jobs
+    )
+    if args.schema:
+      emx.write_schema(path = args.schema)
+  __save__profile__(args, profiler)
+  return report
+
+def runEmx2(args, files: list = None, session: dict = None, cache = None):
+  """Run EMX2 conversion
+  @param args (argparse.Namespace): parsed arguments
+  @param files (list): yaml files
+  @param cache: an `emxCache` or `emxMemoryCache` (optional)
+  @param session (dict): if defined, the converted model is kept here and
+    updated in the next run (see `Convert2.update`)
+  """
+  from yamlemxconvert.convert2 import Convert2
+  profiler = __profiler__(args)
+  emx2 = session.get('emx2') if session else None
+  if emx2 is not None and emx2.files == files:
+    emx2.profiler = profiler
+    emx2.update()
+  else:
+    schemas = {}
+    for value in args.schemas:
+      if '=' not in value:
+        raise ValueError(f'Error in runEmx2: invalid schema {value}. Use <package>=<schema>')
+      package, schema = value.split('=', 1)
+      schemas[package] = schema
+    emx2 = Convert2(
+      files = files,
+      schemas = schemas,
+      workers = args.jobs,
+      profiler = profiler,
+      cache = cache
+    )
+    emx2.convert(includeData = args.includeData, keepModelPackage = args.keepModelPackage)
+    if session is not None:
+      session['emx2'] = emx2
+  if args.graph:
+    emx2.graph.save(args.graph)
+  emx2.write(
+    name = args.name or list(emx2.models)[0],
+    format = args.format,
+    outDir = args.outDir,
+    engine = args.engine,
+    splitSheets = args.splitSheets,
+    workers = args.jobs
+  )
+  __save__profile__(args, profiler)
+
+def __modified__(files: list = None):
+  """Get modification times
+  @param files (list): file paths
+  @return dictionary of modification times by file
+  """
+  times = {}
+  for file in files:
+    try:
+      times[file] = stat(file).st_mtime_ns
+    except OSError:
+      times[file] = None
+  return times
+
+def __watched__files__(session: dict = None):
+  """Watched files
+  @param session (dict): see `runEmx1` and `runEmx2`
+  @return all files in the dependency graph of the model in the session
+    (model and `include` files)
+  """
+  model = (session or {}).get('emx') or (session or {}).get('emx2')
+  if model is None or model.graph is None:
+    return []
+  return list(model.graph.hashes)
+
+def watchFiles(
+  patterns: list = None,
+  run = None,
+  interval: float = 0.5,
+  iterations: int = None,
+  dependencies = None
+):
+  """Watch files
+  Check the files that match `patterns` every `interval` seconds and call
+  `run` with the list of files when any of them is added, removed, or
+  modified. Errors are printed and do not stop the watcher.
+  
+  @param patterns (list): file paths or glob patterns
+  @param run: function that takes a list of files
+  @param interval (float): seconds between checks
+  @param iterations (int): number of checks (default: until interrupted)
+  @param dependencies: function that returns other files to watch (e.g.,
+    `include` files that do not match `patterns`). Changes to these files
+    also call `run`.
+  """
+  def watched(files):
+    return list(dict.fromkeys(files + (dependencies() if dependencies else [])))
+  
+  files = expandFiles(patterns)
+  times = __modified__(watched(files))
+  count = 0
+  while iterations is None or count < iterations:
+    count += 1
+    time.sleep(interval)
+    try:
+      files = expandFiles(patterns)
+    except ValueError as error:
+      print(error)
+      continue
+    current = __modified__(watched(files))
+    changed = [file for file in current if current[file] != times.get(file)]
+    changed.extend([file for file in times if file not in current])
+    times = current
+    if not changed:
+      continue
+    print('Changed: ' + ', '.join(changed))
+    start = time.perf_counter()
+    try:
+      run(files)
+      print(f'Done in {time.perf_counter() - start:.3f}s')
+    except Exception as error:
+      print(f'Error: {error}')
+
+def main(argv: list = None):
+  """Command line interface
+  
+  @examples
+  ```
+  yamlemxconvert emx1 'model/*.yaml' --format csv --out-dir emx --tags --jobs 4
+  yamlemxconvert emx1 model/birddata.yaml --schema model/schema.md --watch
+  yamlemxconvert emx1 'model/*.yaml' --check
+  yamlemxconvert emx1 'model/*.yaml' --format csv --profile profile.json
+  yamlemxconvert emx2 model/birddata.yaml model/birddata_refs.yaml -s birdData_refs=birdDataRefs
+  yamlemxconvert serve --port 8765 --workers 4
+  yamlemxconvert emx1 model/birddata.yaml --daemon 127.0.0.1:8765
+  ```
+  
+  @return exit code
+  """
+  args = __parser__().parse_args(argv)
+  if args.command == 'serve':
+    configureLogging(logging.INFO)
+    from yamlemxconvert.emxDaemon import emxDaemon
+    emxDaemon(args.host, args.port, args.workers, args.verbose, args.tokenFile).serve()
+    return 0
+  
+  configureLogging(logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO)
+  if args.daemon:
+    if args.watch:
+      raise ValueError('Error in main: --watch cannot be used with --daemon')
+    from yamlemxconvert.emxDaemon import sendRequest
+    result = sendRequest(args.daemon, '/convert', resolveOptions(args), args.tokenFile)
+    if result.get('status') != 'ok':
+      print(f"Error: {result.get('error')}")
+      return 1
+    print(f"Converted {len(result['files'])} file(s) in {result['elapsed']}s")
+    return 0
+  
+  files = expandFiles(args.files)
+  makedirs(args.outDir, exist_ok = True)
+  
+  # in watch mode, models are updated instead of converted again
+  session = {} if args.watch else None
+  cache = None
+  if args.cache:
+    from yamlemxconvert.emxCache import emxCache
+    cache = emxCache(dir = args.cache)
+  elif args.watch:
+    from yamlemxconvert.emxCache import emxMemoryCache
+    cache = emxMemoryCache()
+  if args.command == 'emx1':
+    run = lambda files: runEmx1(args, files, cache, incremental = args.watch, session = session)
+  else:
+    run = lambda files: runEmx2(args, files, session, cache)
+  
+  report = run(files)
+  if args.watch:
+    watched = set(files) | set(__watched__files__(session))
+    print(f'Watching {len(watched)} file(s) for changes (press Ctrl+C to stop)')
+    try:
+      watchFiles(args.files, run, args.interval, dependencies = lambda: __watched__files__(session))
+    except KeyboardInterrupt:
+      pass
+  return 1 if report is not None and not report.valid else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
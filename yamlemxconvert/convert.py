@@ -1,28 +1,76 @@
 from os import path, getcwd, remove
 from yamlemxconvert.utils import loadYaml
+from yamlemxconvert.yamlStream import loadYamlStream
+from yamlemxconvert.fileDataset import fileDataset
 from yamlemxconvert.markdownWriter import markdownWriter
-from yamlemxconvert.emxWriter import emxWriter
+from yamlemxconvert.emxManifest import emxManifest
+from yamlemxconvert.emxValidator import emxValidator
+from yamlemxconvert.emxRecord import emxRecord, toDicts
+from yamlemxconvert.emxGraph import emxDependencyGraph
+from yamlemxconvert.emxProfiler import profiled
 from yamlemxconvert.mappings import (
-  __emx__keys__pkgs__,
-  __emx__keys__enty__,
-  __emx__keys__attr__,
-  __emx__keys__datatype__,
-  __emx__keys__tags__
+  __emx__keys__pkgs__set__,
+  __emx__keys__enty__set__,
+  __emx__keys__attr__set__,
+  __emx__keys__datatype__set__,
+  __emx__keys__tags__set__
 )
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import logging
 import re
+import time
+
+log = logging.getLogger(__name__)
+
+# <ontology_code> <iri>, e.g., 'NCIT_C142487 http://purl.obolibrary.org/obo/NCIT_C142487'
+__semantic__tag__pattern__ = re.compile(r'^(([0-9a-zA-Z]+)[:_][0-9a-zA-Z]+)\s+([a-zA-Z0-9.]+\S*)')
+__semantic__tag__separator__ = re.compile(r'\s*,\s*')
+
+def _extractFile(
+  file: str = None,
+  includePkgMeta: bool = True,
+  priorityNameKey: str = None,
+  includes: dict = None,
+  stream: bool = False,
+  compact: bool = False
+):
+  """Extract File
+  Extract the EMX components of a single file using a new `Convert` instance.
+  This function is used by `Convert.convert` so that files can be
+  processed in worker processes.
+  
+  @param file (str): path to a yaml-emx file
+  @param includePkgMeta (bool): see `Convert.convert`
+  @param priorityNameKey (str): see `Convert.convert`
+  @param includes (dict): parsed `include` files by path (shared between calls)
+  @param stream (bool): see `Convert.convert`
+  @param compact (bool): see `Convert.convert`
+  """
+  start = time.perf_counter()
+  emx = Convert()
+  emx.priorityNameKey = priorityNameKey
+  emx.compact = compact
+  result = emx.__emx__extract__file__(file, includePkgMeta, includes, stream)
+  result['elapsed'] = time.perf_counter() - start
+  return result
 
 class Convert:
-  def __init__(self, files: list = []):
+  def __init__(self, files: list = [], profiler = None):
     """Convert
     Read and transform a YAML-EMX markup into excel (CSV, xlsx) EMX format
 
     @param files (list): a list of files to convert
+    @param profiler (emxProfiler): if defined, the time spent in each stage
+      and file, and counts of files, entities, attributes, rows, and bytes
+      are recorded (see `emxProfiler`)
     @examples
     ```
     c = Convert(files = ['path/to/my_model.yml', 'path/to/my_model_1.yml'])
     ```
     """
     self.files = files
+    self.profiler = profiler
     self.name = None
     self.__init__fields__()
   
@@ -32,10 +80,43 @@ class Convert:
     self.attributes = []
     self.tags = []
     self.data = {}
-    self.date = None,
+    self.date = None
     self.version = None
     self.priorityNameKey = None
+    self.compact = False
     self.lang_attrs = ('label-', 'description-')
+    self.__keys__cache__ = {'package': {}, 'entity': {}, 'attribute': {}}
+    self.__results__ = []
+    self.__options__ = None
+    self.__file__cache__ = None
+    self.__tag__records__ = None
+    self.__tag__cache__ = None
+    self.graph = None
+  
+  def __emx__is__known__key__(self, kind: str = None, key: str = None):
+    """Is known EMX key
+    Determine if a YAML key should be extracted for a package, entity, or
+    attribute. The result is cached per key, so each distinct key is only
+    classified once per conversion.
+    
+    @param kind (str): 'package', 'entity', or 'attribute'
+    @param key (str): a key in the yaml file
+    
+    @return bool
+    """
+    cache = self.__keys__cache__[kind]
+    if key not in cache:
+      known = {
+        'package': __emx__keys__pkgs__set__,
+        'entity': __emx__keys__enty__set__,
+        'attribute': __emx__keys__attr__set__
+      }[kind]
+      cache[key] = (
+        key in known
+        or key.startswith(self.lang_attrs)
+        or (kind == 'attribute' and key == self.priorityNameKey)
+      )
+    return cache[key]
   
   def __emx__extract__package__(self, data, includePkgMeta: bool = True):
     """Extract EMX Package Metadata
@@ -48,7 +129,7 @@ class Convert:
     pkg = {}
     keys = list(data.keys())
     for k in keys:
-      if k in __emx__keys__pkgs__ or k.startswith(self.lang_attrs):
+      if self.__emx__is__known__key__('package', k):
         pkg[k] = data[k]
     
     if includePkgMeta:
@@ -64,7 +145,7 @@ class Convert:
           pkg['description'] = pkg['description'] + ' (' + ', '.join(pkgMeta.values()) + ')'
         else:
           pkg['description'] = '; '.join(pkgMeta.values())
-    return pkg
+    return emxRecord(pkg) if self.compact else pkg
 
   def __emx__extract__tags__(self, tags):
     """Extract known EMX tags
@@ -75,9 +156,9 @@ class Convert:
     for tag in tags:
       keys = list(tag.keys())
       for k in keys:
-        if not (k in __emx__keys__tags__):
+        if k not in __emx__keys__tags__set__:
           del tag[k]
-    return tags                    
+    return [emxRecord(tag) for tag in tags] if self.compact else tags                    
 
   def __emx__extract__entities__(self, data):
     """Extract known EMX entity attributes
@@ -85,26 +166,40 @@ class Convert:
     @param data (list): contents of a yaml file
     """
     emx = {'entities': [], 'attributes': [], 'data': {}}
+    
+    # classification of keys is cached; see `__emx__is__known__key__`
+    isKnownKey = self.__emx__is__known__key__
+    entityKeyCache = self.__keys__cache__['entity']
+    attrKeyCache = self.__keys__cache__['attribute']
+    defaults = list(data['defaults'].items()) if data.get('defaults') else []
+    # compact records share the defaults instead of copying them
+    sharedDefaults = dict(defaults) if defaults else None
+    
     for entity in data['entities']:
-      entityKeys = list(entity.keys())
-      if 'name' not in entityKeys:
+      if 'name' not in entity:
         raise ValueError('Error in entity: missing required attribute "name"')
 
       # pull entity info
       e = {'package': data['name']}
-      for ekey in entityKeys:
-        if ekey in __emx__keys__enty__ or ekey.startswith(self.lang_attrs):
+      for ekey in entity:
+        known = entityKeyCache.get(ekey)
+        if known is None:
+          known = isKnownKey('entity', ekey)
+        if known:
           e[ekey] = entity[ekey]
-      emx['entities'].append(e)
+      emx['entities'].append(emxRecord(e) if self.compact else e)
 
       # pull attribute definitions
       if 'attributes' in entity:
         attributes = entity['attributes']
+        entityName = data['name'] + '_' + entity['name']
         for attr in attributes:
-          attrKeys = list(attr.keys())
-          d = {'entity': data['name'] + '_' + entity['name']}
-          for aKey in attrKeys:
-            if aKey in __emx__keys__attr__ or aKey.startswith(self.lang_attrs) or aKey == self.priorityNameKey:
+          d = {'entity': entityName}
+          for aKey in attr:
+            known = attrKeyCache.get(aKey)
+            if known is None:
+              known = isKnownKey('attribute', aKey)
+            if known:
               d[aKey] = attr[aKey]
                   
           # adjust priorityKey if mulitple `name` attributes are used
@@ -114,31 +209,151 @@ class Convert:
               d['name'] = d.get(self.priorityNameKey)
               d.pop(self.priorityNameKey)
 
-          # provide dataType validation
+          # invalid dataTypes are kept, so `validate` can report all of them
           if 'dataType' in d:
-            if d['dataType'] not in __emx__keys__datatype__:
-              raise ValueError(
-                'Error in Convert: for the attribute',
-                d['name'],'in entity,',d['entity'],'dataType "', d['dataType'],'"',
-                'is invalid.'
+            if d['dataType'] not in __emx__keys__datatype__set__:
+              log.warning(
+                'dataType "%s" of attribute %s in entity %s is invalid',
+                d['dataType'], d.get('name'), d['entity']
               )
 
           # apply defaults
-          if data['defaults']:
-            defaultKeys = list(data['defaults'].keys())
-            for dKey in defaultKeys:
-              if dKey not in attrKeys:
-                d[dKey] = data['defaults'][dKey]
+          if self.compact:
+            # keys that are set in the attribute (even if they were not
+            # kept) do not get a default, so the defaults cannot be shared
+            if any(dKey in attr and dKey not in d for dKey, dValue in defaults):
+              d = emxRecord(d, {dKey: dValue for dKey, dValue in defaults if dKey not in attr})
+            else:
+              d = emxRecord(d, sharedDefaults)
+          else:
+            for dKey, dValue in defaults:
+              if dKey not in attr:
+                d[dKey] = dValue
 
           emx['attributes'].append(d)
 
       if 'data' in entity:
         name = data['name'] + '_' + entity['name']
         emx['data'][name] = entity['data']
+      
+      # datasets stored in external files are read when they are written
+      if 'dataFile' in entity:
+        name = data['name'] + '_' + entity['name']
+        if 'data' in entity:
+          raise ValueError(f'Error in entity {name}: use either "data" or "dataFile"')
+        emx['data'][name] = fileDataset(entity['dataFile'], entity.get('dataFormat'))
 
     return emx
   
-  def convert(self, includePkgMeta: bool = True, priorityNameKey: str = None):
+  def __emx__extract__file__(
+    self,
+    file: str = None,
+    includePkgMeta: bool = True,
+    includes: dict = None,
+    stream: bool = False
+  ):
+    """Extract EMX File
+    Read a yaml file and extract all EMX components. The result is merged
+    into the model using `__emx__merge__file__`.
+    
+    @param file (str): path to a yaml-emx file
+    @param includePkgMeta (bool): if TRUE (default), version and date will
+      be added to description if defined in the yaml
+    @param includes (dict): if defined, parsed `include` files are stored
+      here by path so that each file is only read once
+    @param stream (bool): if True, datasets are not loaded into memory
+      (see `loadYamlStream`)
+    
+    @return dictionary with the package, tags, entities, attributes, and data
+      defined in the file
+    """
+    log.info('Processing: %s', file)
+    yaml = loadYamlStream(file) if stream else loadYaml(file)
+
+    keys = list(yaml.keys())
+    if ('name' not in keys) and ('include' not in keys):
+      raise ValueError('Error in convert: missing required attribute "name"')
+    
+    result = {
+      'file': file,
+      'name': yaml.get('name'),
+      'include': yaml.get('include'),
+      'package': None,
+      'version': None,
+      'date': None,
+      'tags': [],
+      'entities': [],
+      'attributes': [],
+      'data': {}
+    }
+    
+    # Is the package defined by an another file?
+    # Build the package based on the presence of 'include'. This option
+    # is useful for situations where a package may have multiple subpackages or
+    # if there are entities that are defined in multiple files.
+    if 'include' in keys:
+      if includes is None:
+        include_yaml = loadYaml(yaml['include'])
+      else:
+        if yaml['include'] not in includes:
+          includes[yaml['include']] = loadYaml(yaml['include'])
+        include_yaml = includes[yaml['include']]
+      pkg = self.__emx__extract__package__(include_yaml, includePkgMeta)
+      yaml.update(pkg)
+      result['name'] = yaml['name']
+    else:
+      pkg = self.__emx__extract__package__(yaml, includePkgMeta)
+    result['package'] = pkg
+    result['version'] = self.version
+    result['date'] = self.date
+    
+    # Are there tags?
+    # If the object 'tagDefinitions' is present, append to self.tags
+    if 'tagDefinitions' in keys:
+      result['tags'] = self.__emx__extract__tags__(yaml['tagDefinitions'])
+    
+    # process all entities and attributes
+    if 'entities' in keys:
+      result.update(self.__emx__extract__entities__(yaml))
+    return result
+  
+  def __emx__merge__file__(self, result: dict = None):
+    """Merge EMX File
+    Append the EMX components extracted from a file to the model. Results
+    must be merged in the same order as `self.files`.
+    
+    @param result (dict): output of `__emx__extract__file__`
+    """
+    self.name = result['name']
+    if result['version'] is not None:
+      self.version = result['version']
+    if result['date'] is not None:
+      self.date = result['date']
+    
+    # packages defined by another file are only added once
+    pkg = result['package']
+    if result['include']:
+      if pkg['name'] not in [d['name'] for d in self.packages]:
+        self.packages.append(pkg)
+    else:
+      self.packages.append(pkg)
+    
+    # append EMX components to model where applicable
+    self.tags.extend(result['tags'])
+    self.entities.extend(result['entities'])
+    self.attributes.extend(result['attributes'])
+    self.data.update(result['data'])
+  
+  @profiled('convert')
+  def convert(
+    self,
+    includePkgMeta: bool = True,
+    priorityNameKey: str = None,
+    workers: int = None,
+    cache = None,
+    stream: bool = False,
+    compact: bool = False
+  ):
     """Convert Model
     Convert one or more yaml files into EMX structure. The contents of the
     yaml-emx markup will produce several data objects: packages, entities,
@@ -150,50 +365,199 @@ class Convert:
       projects (i.e., multiple `name` attributes), you can set
       which name attribute gets priority. This means that you can
       compile the EMX for different projects.
+    @param workers (int): if greater than 1, files are read and extracted
+      in a pool of worker processes. Results are merged in the order of
+      `files`, so the output is identical to the sequential conversion.
+    @param cache (emxCache): if defined, extracted files are read from and
+      stored in this cache. Only files that changed since the last run (or
+      whose `include` file changed) are processed again.
+    @param stream (bool): if True, yaml files are read with the event API
+      and inline datasets are not loaded into memory. Each dataset in
+      `self.data` is a `yamlDataset` that reads its rows from the yaml file
+      when it is written. Use this with `write(engine = 'stream')` to
+      convert models with very large datasets in bounded memory.
+    @param compact (bool): if True, packages, entities, attributes, and
+      tags are stored as `emxRecord`s instead of dictionaries. Records use
+      less memory (keys are shared, short strings are interned, and
+      `defaults` are not copied into each attribute), which helps with
+      very large models. Records can be used like dictionaries; use
+      `toDict` to convert them.
     """
     self.__init__fields__()
+    self.compact = compact
     if priorityNameKey:
       self.priorityNameKey = priorityNameKey
     
-    for file in self.files:
-      print('Processing: {}'.format(file))
-      yaml = loadYaml(file)
-  
-      keys = list(yaml.keys())
-      if ('name' not in keys) and ('include' not in keys):
-        raise ValueError('Error in convert: missing required attribute "name"')
-      self.name = yaml['name']
-      
-      # Is the package defined by an another file?
-      # Build self.emx['package'] based on the presence of 'include'. This option
-      # is useful for situations where a package may have multiple subpackages or
-      # if there are entities that are defined in multiple files.
-      if 'include' in keys:
-        include_yaml = loadYaml(yaml['include'])
-        pkg = self.__emx__extract__package__(include_yaml, includePkgMeta)
-        if pkg['name'] not in [d['name'] for d in self.packages]:
-          self.packages.append(pkg)
-        yaml.update(pkg)
-      else:
-        self.packages.append(self.__emx__extract__package__(yaml, includePkgMeta))
-          
-      # Are there tags?
-      # If the object 'tagDefinitions' is present, append to self.tags
-      if 'tagDefinitions' in keys:
-        tags = self.__emx__extract__tags__(yaml['tagDefinitions'])
-        self.tags.extend(tags)
-      
-      # process all entities and attributes
-      emx = {}        
-      if 'entities' in keys:
-        emx = {**self.__emx__extract__entities__(yaml)}
+    # look up files in the cache
+    options = (includePkgMeta, self.priorityNameKey, stream, compact)
+    results = [None] * len(self.files)
+    keys = [None] * len(self.files)
+    if cache:
+      for index, file in enumerate(self.files):
+        keys[index] = cache.key(file, options)
+        results[index] = cache.get(keys[index])
+    
+    # extract files that are not cached
+    missing = [index for index, result in enumerate(results) if result is None]
+    files = [self.files[index] for index in missing]
+    args = (files, repeat(includePkgMeta), repeat(self.priorityNameKey))
+    if workers and workers > 1 and len(files) > 1:
+      with ProcessPoolExecutor(max_workers = workers) as pool:
+        extracted = list(pool.map(_extractFile, *args, repeat(None), repeat(stream), repeat(compact)))
+    else:
+      extracted = map(_extractFile, *args, repeat({}), repeat(stream), repeat(compact))
+    
+    for index, result in zip(missing, extracted):
+      results[index] = result
+      if cache:
+        dependencies = [result['include']] if result['include'] else []
+        cache.set(keys[index], result, dependencies)
 
-      # append EMX components to model where applicable
-      if 'entities' in emx: self.entities.extend(emx['entities'])
-      if 'attributes' in emx: self.attributes.extend(emx['attributes'])
-      if 'data' in emx: self.data.update(emx['data'])
+    self.__results__ = results
+    self.__options__ = (includePkgMeta, stream, compact)
+    self.__file__cache__ = cache
+    self.__merge__results__()
+    self.graph = emxDependencyGraph()
+    for file, result in zip(self.files, results):
+      self.graph.addFile(file, **self.__graph__node__(result))
+    if self.profiler:
+      for index in missing:
+        self.profiler.file(self.files[index], 'extract', results[index].get('elapsed', 0.0))
+      self.profiler.count('files', len(self.files))
+      self.profiler.count('cachedFiles', len(self.files) - len(missing))
+      self.profiler.count('entities', len(self.entities))
+      self.profiler.count('attributes', len(self.attributes))
 
-  def compileSemanticTags(self):
+  def __graph__node__(self, result: dict = None):
+    """Dependency graph node
+    Find the package and entities a file defines, and the files, packages,
+    and entities it refers to
+
+    @param result (dict): output of `__emx__extract__file__`
+
+    @return dictionary of arguments of `emxDependencyGraph.addFile`
+    """
+    return {
+      'package': result['package'].get('name'),
+      'entities': [f"{entity['package']}_{entity['name']}" for entity in result['entities']],
+      'include': result['include'],
+      'parent': result['package'].get('parent'),
+      'extends': [entity['extends'] for entity in result['entities'] if entity.get('extends')],
+      'refEntity': [attr['refEntity'] for attr in result['attributes'] if attr.get('refEntity')]
+    }
+
+  def __merge__results__(self):
+    """Merge results
+    Build the model from the extracted files (see `__emx__merge__file__`)
+    """
+    self.packages = []
+    self.entities = []
+    self.attributes = []
+    self.tags = []
+    self.data = {}
+    self.date = None
+    self.version = None
+    for result in self.__results__:
+      self.__emx__merge__file__(result)
+
+  @profiled('update')
+  def update(self, files: list = None):
+    """Update model
+    Convert the files that changed since the last `convert` (or `update`)
+    and patch them into the model. Files that changed are found using the
+    content hashes in `self.graph`. Files that `include` a changed file are
+    converted as well; all other files are not read again. Files that were
+    deleted are removed from `self.files`, the graph, and the model. If a
+    `cache` was used in `convert`, the converted files are stored in it. If
+    semantic tags were compiled, they are compiled again (using the same
+    cache).
+
+    `update` uses the extracted files that are kept in memory, so it only
+    works on a model that was converted in the same process. A graph that
+    was saved to disk cannot be used to update a model; use `convert` with
+    a `cache` to convert only the changed files in a new process.
+
+    @param files (list): files that changed (default: all model and
+      `include` files whose contents differ from the last conversion)
+
+    @return list of files that were converted again
+
+    @examples
+    ```
+    emx = Convert(files = ['model/catalogue.yaml', 'model/catalogue_refs.yaml'])
+    emx.convert()
+    # edit model/catalogue_refs.yaml
+    emx.update()
+    ```
+    """
+    if self.graph is None or len(self.__results__) != len(self.files):
+      raise ValueError('Error in update: the model must be converted first (in the same process)')
+    changed = self.graph.changed() if files is None else list(files)
+    affected = set(changed) | self.graph.dependents(changed, ['include'])
+    includePkgMeta, stream, compact = self.__options__
+    cache = self.__file__cache__
+    
+    # remove deleted files from the model
+    removed = [file for file in self.files if file in affected and not path.exists(file)]
+    if removed:
+      kept = [index for index, file in enumerate(self.files) if file not in removed]
+      self.files = [self.files[index] for index in kept]
+      self.__results__ = [self.__results__[index] for index in kept]
+      for file in removed:
+        self.graph.removeFile(file)
+        log.info('Removed: %s', file)
+    
+    includes = {}
+    updated = []
+    for index, file in enumerate(self.files):
+      if file not in affected:
+        continue
+      result = _extractFile(file, includePkgMeta, self.priorityNameKey, includes, stream, compact)
+      self.__results__[index] = result
+      self.graph.addFile(file, **self.__graph__node__(result))
+      if cache:
+        dependencies = [result['include']] if result['include'] else []
+        cache.set(cache.key(file, (includePkgMeta, self.priorityNameKey, stream, compact)), result, dependencies)
+      updated.append(file)
+      if self.profiler:
+        self.profiler.file(file, 'extract', result['elapsed'])
+        self.profiler.count('updatedFiles')
+    if not updated and not removed:
+      return updated
+    self.__merge__results__()
+    if self.__tag__records__ is not None:
+      self.compileSemanticTags(cache = self.__tag__cache__)
+    return updated
+
+  @profiled('validate')
+  def validate(self, known: list = None, includeData: bool = False):
+    """Validate model
+    Check the references between packages, entities, and attributes (e.g.,
+    `refEntity`, `extends`, `parent`) and the id and label attributes of
+    each entity. All issues are collected, so a single run reports every
+    error in the model.
+
+    @param known (list): names of packages and entities that exist in the
+      target database, but are not part of the model
+    @param includeData (bool): if True, check the values of all datasets
+      (dataTypes, required values, unique ids, and xref/mref ids)
+    
+    @return validationReport
+    
+    @examples
+    ```
+    emx = Convert(files = ['path/to/my_model.yml'])
+    emx.convert()
+    report = emx.validate(includeData = True)
+    if not report.valid:
+      print(report)
+    ```
+    """
+    validator = emxValidator(self.packages, self.entities, self.attributes, known, self.data)
+    return validator.validate(includeData)
+
+  @profiled('compileSemanticTags')
+  def compileSemanticTags(self, cache = None):
     """Comple Semantic Tags
     For models that use ontology codes and IRIs, this method helps prepare
     the dataset for import into Molgenis. Codes should be formatted in the
@@ -212,32 +576,96 @@ class Convert:
     the name of the ontology and the second part should be the code for the
     term: <ontology_code> <iri>.
     
+    Multiple tags can be separated by commas or written as a list.
+    
+    ```
+    - name: datamodel
+      tags:
+        - NCIT_C142487 http://purl.obolibrary.org/obo/NCIT_C142487
+        - dcat:dataset
+    ```
+    
     Running this function automatically processes the EMX model objects.
+    Packages, entities, and attributes are processed in a single pass: each
+    distinct tag is parsed once, a tag record is added to `self.tags` unless
+    a tag with the same identifier already exists (e.g., in
+    `tagDefinitions`), and the `tags` field is replaced by the identifiers
+    (separated by commas). Tags are unique by identifier; the first
+    definition is kept.
+    
+    @param cache (str or emxTagCache): a JSON file (or `emxTagCache`) that
+      stores parsed tags across runs. Use the same cache for all models
+      that share ontology codes.
     """
-    self.tags.extend(self._prepareSemanticTags(self.packages))
-    self.tags.extend(self._prepareSemanticTags(self.entities))
-    self.tags.extend(self._prepareSemanticTags(self.attributes))
-    self._prepareSemanticIdentifiers(self.packages)
-    self._prepareSemanticIdentifiers(self.entities)
-    self._prepareSemanticIdentifiers(self.attributes)
-    
-  def _prepareSemanticTags(self, data):
-    """Prepare Semantic Tags
-    @param data an emx model object
+    if isinstance(cache, str):
+      from yamlemxconvert.emxCache import emxTagCache
+      cache = emxTagCache(file = cache)
+    registry = {}
+    for tag in self.tags:
+      registry.setdefault(tag.get('identifier'), tag)
+    self.tags[:] = registry.values()
+    # tags that were compiled before (e.g., before `update`) are not parsed again
+    compiled = self.__tag__records__ or {}
+    parsed = {}
+    for data in (self.packages, self.entities, self.attributes):
+      for row in data:
+        tag = row.get('tags')
+        if not tag:
+          continue
+        key = tag if isinstance(tag, str) else tuple(tag)
+        if key not in parsed:
+          identifiers = []
+          for value in self.__split__semantic__tags__(tag):
+            tagRecord = registry.get(value) or compiled.get(value) or self.__parse__semantic__tag__(value, cache)
+            identifiers.append(tagRecord['identifier'])
+            if tagRecord['identifier'] not in registry:
+              registry[tagRecord['identifier']] = tagRecord
+              self.tags.append(tagRecord)
+          parsed[key] = ','.join(identifiers)
+        row['tags'] = parsed[key]
+    if self.profiler:
+      self.profiler.count('tags', len(parsed))
+    self.__tag__records__ = registry
+    self.__tag__cache__ = cache
+    if cache:
+      cache.save()
+  
+  def __split__semantic__tags__(self, tag = None):
+    """Split Semantic Tags
+    @param tag (str or list): comma separated tags or a list of tags
+    
+    @return list of tags
     """
-    rawTags=list(set([row['tags'] for row in data if 'tags' in row]))
+    values = tag if isinstance(tag, (list, tuple)) else [tag]
     tags = []
-    for tag in rawTags:
-      tagRecord = self.__newTagRecord__(tag)
-      if re.search(r'^([0-9a-zA-Z]{1,}([:_])[0-9a-zA-Z]{1,}\s+([a-zA-Z0-9.]{1,}))', tag):
-        newlabel = re.split(r'\s+', tag)[0]
-        tagRecord['identifier'] = newlabel
-        tagRecord['label'] = newlabel
-        tagRecord['codeSystem'] = re.split(r'[:_]', newlabel)[0]
-        tagRecord['objectIRI'] = re.split(r'\s+',tag)[1]
-      tags.append(tagRecord)
+    for value in values:
+      tags.extend([item for item in __semantic__tag__separator__.split(str(value).strip()) if item])
     return tags
     
+  def __parse__semantic__tag__(self, tag: str = None, cache = None):
+    """Parse Semantic Tag
+    Create a tag record from a tag string. If the tag is formatted as
+    `<ontology_code> <iri>`, the code, code system, and IRI are extracted.
+    
+    @param tag (str): a tag string
+    @param cache (emxTagCache): parsed tags (optional)
+    
+    @return tag record (dict)
+    """
+    parsed = cache.get(tag) if cache else None
+    if parsed is None:
+      match = __semantic__tag__pattern__.match(tag)
+      if match:
+        parsed = (match.group(1), match.group(3), match.group(2))
+      else:
+        parsed = (tag, None, None)
+      if cache:
+        cache.set(tag, parsed)
+    tagRecord = self.__newTagRecord__(parsed[0])
+    tagRecord['objectIRI'] = parsed[1]
+    tagRecord['codeSystem'] = parsed[2]
+    return tagRecord
+    
   def __newTagRecord__(self, tag):
     return {
       'identifier': tag,
@@ -247,16 +675,19 @@ class Convert:
       'relationLabel': 'isAssociatedWith',
       'relationIRI': 'http://molgenis.org#isAssociatedWith'
     }
-    
-  def _prepareSemanticIdentifiers(self, data: list=[]):
-    """Extract Tag Identifier
-    @param data input dataset from yamlemxconvert.convert (packages, entities, etc.)
-    """
-    for row in data:
-      if row.get('tags'):
-        row['tags']=row['tags'].split(' ')[0]
 
-  def write(self, name=None, format='xlsx', outDir='.', includeData=True):
+  @profiled('write')
+  def write(
+    self,
+    name=None,
+    format='xlsx',
+    outDir='.',
+    includeData=True,
+    engine='pandas',
+    incremental=False,
+    splitSheets=False,
+    workers=None
+  ):
     """Write EMX to csv or xlsx
     Write the EMX model to file as csv or xlsx. If excel workbook format is
     selected, all data will be written in the standard EMX excel format (
@@ -264,31 +695,112 @@ class Convert:
     added to a new sheet using the <package_entity> name. The workbook can
     then be imported into molgenis. If the user prefers the csv format,
     all components will be writen to csv (e.g., packages.csv, entities.csv,
-    attributes.csv, etc.).
+    attributes.csv, etc.). The formats 'csv.gz' and 'csv.zst' (gzip or
+    zstd compressed csv, zstd requires `zstandard`), 'parquet', and 'arrow'
+    (Arrow IPC, both require `pyarrow`) are like 'csv', but datasets are
+    written in that format. Packages, entities, attributes, and tags are
+    always written as plain csv. The format 'zip' writes all csv files
+    into a zip archive (`<outDir>/<name>.zip`) that can be imported into
+    Molgenis. Rows are streamed into the archive (using the 'stream'
+    engine), so no intermediate files are written.
     
-    @param format (str): write as csv or xlsx (default)
+    @param format (str): write as xlsx (default), csv, csv.gz, csv.zst,
+      parquet, arrow, or zip
     @param outDir (str): path to save files (default = "." or current dir)
     @param includeData (bool): If True (default), any datasets defined in the yaml
       will be written to file.
+    @param engine (str): 'pandas' (default) builds a DataFrame per sheet,
+      'stream' writes rows directly without pandas
+    @param incremental (bool): not for xlsx or zip. If True, a manifest of content
+      hashes is kept in `outDir`. Files are only rewritten if their
+      contents change, and csv files written by a previous run that are no
+      longer part of the model (e.g., removed datasets) are deleted.
+    @param splitSheets (bool): xlsx with engine 'stream' only. If True,
+      datasets with more rows than an Excel sheet can hold (1,048,576) are
+      split into several sheets. Otherwise, an error is raised before the
+      file is written.
+    @param workers (int): not for xlsx or zip. If greater than 1, files are written
+      concurrently in a pool of threads. Each file is written to a
+      temporary file first and moved into place when it is complete.
+    
+    @return not for xlsx or zip: list with the name, number of rows, size in bytes,
+      and elapsed time of each file (see `emxStreamWriter.writeFiles`)
     
     """
-    if format not in ['csv', 'xlsx']:
+    if format not in ['xlsx', 'zip', 'csv', 'csv.gz', 'csv.zst', 'parquet', 'arrow']:
       raise ValueError('Error in write: unexpected format ', str(format))
-        
-    writer = emxWriter(self.packages, self.entities, self.attributes, self.data, self.tags)
+    
+    if engine not in ['pandas', 'stream']:
+      raise ValueError('Error in write: unexpected engine ', str(engine))
+    
+    if incremental and format in ['xlsx', 'zip']:
+      raise ValueError('Error in write: incremental writing is not supported for ' + format)
+    
+    if splitSheets and engine != 'stream':
+      raise ValueError('Error in write: splitSheets requires engine stream')
+    
+    # writers are imported here so that importing this module does not load pandas
+    if format == 'zip':
+      from yamlemxconvert.emxStreamWriter import emxStreamWriter, atomicWrite
+      writer = emxStreamWriter(self.packages, self.entities, self.attributes, self.data, self.tags)
+      file = outDir + '/' + name + '.zip'
+      atomicWrite(file, lambda file: writer.writeZip(file, includeData))
+      if self.profiler:
+        self.profiler.written(file = file)
+      return
+    
+    model = (self.packages, self.entities, self.attributes, self.data, self.tags)
+    if engine == 'stream':
+      from yamlemxconvert.emxStreamWriter import emxStreamWriter as emxWriterClass
+    else:
+      from yamlemxconvert.emxWriter import emxWriter as emxWriterClass
+      # DataFrames are built from dictionaries
+      if self.compact:
+        model = (toDicts(self.packages), toDicts(self.entities), toDicts(self.attributes), self.data, toDicts(self.tags))
+    writer = emxWriterClass(*model)
     if format == 'xlsx':
       file = outDir + '/' + name + '.' + str(format)
       if path.exists(file):
         remove(file)
-      writer.writeXlsx(file, includeData)
+      if splitSheets:
+        writer.writeXlsx(file, includeData, splitSheets)
+      else:
+        writer.writeXlsx(file, includeData)
+      if self.profiler:
+        self.profiler.written(file = file)
     
-    if format == 'csv':
+    if format != 'xlsx':
       dir = getcwd() if outDir == '.' else path.abspath(outDir)
       if not path.exists(dir):
         raise ValueError('Path ' + dir + 'does not exist')  
-      writer.writeCsv(dir, includeData)
+      if incremental:
+        manifest = emxManifest(dir)
+        summary = writer.writeCsv(dir, includeData, manifest = manifest, workers = workers, dataFormat = format)
+        
+        # datasets are only stale if they were written in this run
+        metadata = ['packages.csv', 'entities.csv', 'attributes.csv', 'tags.csv']
+        manifest.prune(keep = None if includeData else lambda name: name not in metadata)
+        manifest.save()
+      else:
+        summary = writer.writeCsv(dir, includeData, workers = workers, dataFormat = format)
+      if self.profiler:
+        self.profiler.written(summary = summary)
+      return summary
  
  
+  def __emx__index__attributes__(self):
+    """Index attributes by entity
+    Group all attributes by the entity they belong to in a single pass.
+    Attributes keep the order in which they are defined.
+    
+    @return dictionary of attributes by `<package>_<entity>` name
+    """
+    index = {}
+    for attr in self.attributes:
+      index.setdefault(attr['entity'], []).append(attr)
+    return index
+
+  @profiled('write_schema')
   def write_schema(self, path: str = None):
     """Write Model Schema
     Generate an overview of the model (markdown file).
@@ -327,11 +839,12 @@ class Convert:
     # write attributes
     md.linebreaks(n = 1)
     md.heading(level = 2, title = 'Attributes')
+    attributes = self.__emx__index__attributes__()
     for entity in self.entities:
   
       # If attributes do not exist, then don't render schema
       entityPkgName = entity['package'] + '_' + entity['name']
-      entityData = list(filter(lambda d: d['entity'] in entityPkgName, self.attributes))
+      entityData = attributes.get(entityPkgName)
       if entityData:
         md.linebreaks(n = 1)
         md.heading(level = 3, title = f'Entity: {entityPkgName}')
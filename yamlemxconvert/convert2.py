@@ -1,27 +1,99 @@
-from os import path, getcwd, remove
+from os import path, getcwd, remove, makedirs
+from concurrent.futures import ProcessPoolExecutor
 from yamlemxconvert.utils import loadYaml
-from yamlemxconvert.emxWriter import emxWriter2
+from yamlemxconvert.fileDataset import fileDataset
+from yamlemxconvert.emxGraph import emxDependencyGraph
+from yamlemxconvert.emxProfiler import profiled, profileStage
 from yamlemxconvert.mappings import __emx__datatypes__to__emx2__
+import logging
+import time
+
+log = logging.getLogger(__name__)
+    
+class recodeTable(dict):
+  def __init__(self, recode = None):
+    """Recode Table
+    A dictionary that computes (and stores) the recoded value of a key the
+    first time the key is used. Lookups of known keys run at dictionary
+    speed.
     
+    @param recode: function that returns the recoded value of a key
+    """
+    self.recode = recode
+  
+  def __missing__(self, key):
+    value = self[key] = self.recode(key)
+    return value
+
 class Convert2():
-  def __init__(self, file: str = None):
+  def __init__(
+    self,
+    file: str = None,
+    files: list = None,
+    schemas: dict = None,
+    workers: int = None,
+    profiler = None,
+    cache = None
+  ):
     """Convert2
     Convert molgenis/molgenis YAML model to EMX2 format
     
     @param file a location to the yaml-emx model
+    @param files a list of yaml-emx models (instead of `file`). All models
+      are converted in one call and references between them are resolved
+      (see `convert`).
+    @param schemas a dictionary that maps EMX1 package names to EMX2 schema
+      names. Packages that are not listed keep their name. Map several
+      packages to the same schema to combine them.
+    @param workers if greater than 1, files are parsed in a pool of worker
+      processes
+    @param profiler if defined, an `emxProfiler` that records the time
+      spent in each stage and file (see `Convert`)
+    @param cache if defined, an `emxCache` or `emxMemoryCache`. Parsed
+      files are read from and stored in the cache, so only files that
+      changed since the last run are parsed again.
     
     Examples:
         ```
-        from yamlemxconvert.convert import Convert2
+        from yamlemxconvert.convert2 import Convert2
         c = Convert2(file = 'path/to/my/model.yaml')
+        c = Convert2(
+          files = ['path/to/my/model.yaml', 'path/to/my/model_refs.yaml'],
+          schemas = {'model_refs': 'modelRefs'}
+        )
         ```
     """
-    self.file = file
+    if not file and not files:
+      raise ValueError('Error in Convert2: `file` or `files` must be defined')
+    self.files = list(files) if files else [file]
+    self.file = self.files[0]
     self.filename = self.file.split('/')[-1]
-    self._yaml = loadYaml(file = self.file)
+    self.schemas = schemas or {}
+    self.profiler = profiler
+    self.cache = cache
+    with profileStage(profiler, 'load'):
+      self._yamls = [self.__cached__yaml__(file) for file in self.files]
+      missing = [index for index, yaml in enumerate(self._yamls) if yaml is None]
+      files = [self.files[index] for index in missing]
+      if workers and workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+          loaded = list(pool.map(loadYaml, files))
+      else:
+        loaded = [loadYaml(file = file) for file in files]
+      for index, yaml in zip(missing, loaded):
+        self._yamls[index] = yaml
+        self.__cache__yaml__(self.files[index], yaml)
+    if profiler:
+      profiler.count('files', len(self.files))
+    self._yaml = self._yamls[0]
     self.name = None
     self.date = None
     self.version = None
+    self.model = None
+    self.models = {}
+    self.graph = None
+    self.__converted__ = []
+    self.__options__ = None
   
   def __data__to__emx2__(self, data: dict = {}, tablename: str = None):
     """Map molgenis/molgenis to EMX2
@@ -69,31 +141,66 @@ class Convert2():
     """
     return value.split('_')[-1]
   
-  def convert(self, includeData: bool = True, keepModelPackage: bool = False):
-    """Convert Model
-    Convert molgenis/molgenis EMX-YAMl model format into EMX2
-    
-    @param includeData (bool): If True (default), any datasets defined in the yaml
-      will be written to file
-    @param keepModelPackage If True, the EMX1 package name will be
-      returned as is. This is useful when the models are stored separately or
-      you would like to restructure the EMX1 instance. Remember to modify the
-      schema names afterwards if required.
+  def __cached__yaml__(self, file: str = None):
+    """Get a parsed file from the cache
+    @param file (str): path to a yaml file
+    @return contents of the file or None
     """
-    print(f'Processing model: {self.filename}')
-    self.model = {}
+    if not self.cache:
+      return None
+    return self.cache.get(self.cache.key(file, ('Convert2',)))
 
-    if 'entities' not in self._yaml:
-      raise KeyError('EMX entities are not defined in YAML')
-      
-    if keepModelPackage:
-      print('Warning: All ref attributes will keep the EMX1 format. Make sure these are changed before importing into EMX2.')
+  def __cache__yaml__(self, file: str = None, yaml: dict = None):
+    """Store a parsed file in the cache
+    @param file (str): path to a yaml file
+    @param yaml (dict): contents of the file
+    """
+    if self.cache:
+      self.cache.set(self.cache.key(file, ('Convert2',)), yaml)
 
-    defaults = self._yaml.get('defaults')
-    self.name = self._yaml.get('name')
+  def __resolve__ref__(
+    self,
+    value: str = None,
+    schema: str = None,
+    index: dict = None,
+    keepModelPackage: bool = False
+  ):
+    """Resolve refEntity
+    Find the EMX2 schema and table of a refEntity value. If the entity is
+    defined in one of the models that are converted (i.e., it is in
+    `index`), the schema is only set if it differs from the schema of the
+    referring table. Otherwise, the value is split as described in
+    `__refEntity__to__refSchema__` and `__refEntity__to__refTable__`.
+    
+    @param value refEntity value
+    @param schema name of the schema of the referring table
+    @param index dictionary of `<package>_<entity>` names to (schema, table)
+    @param keepModelPackage see `__refEntity__to__refSchema__`
+    
+    @return tuple of refSchema and refTable
+    """
+    if not value:
+      return (value, value)
+    if index and value in index:
+      refSchema, refTable = index[value]
+      return (None if refSchema == schema else refSchema, refTable)
+    return (
+      self.__refEntity__to__refSchema__(value, keepModelPackage),
+      self.__refEntity__to__refTable__(value)
+    )
+  
+  def __molgenis__rows__(self, entities: list = None, defaults: dict = None, keepModelPackage: bool = False):
+    """Build `molgenis` table (row by row)
+    Map each entity and attribute to EMX2 one at a time
+    
+    @param entities (list): entities defined in the yaml
+    @param defaults (dict): attribute defaults defined in the yaml
+    @param keepModelPackage (bool): see `convert`
+    
+    @return list of dictionaries
+    """
     molgenis = []
-
-    for entity in self._yaml['entities']:            
+    for entity in entities:            
       entityName = entity.get('name')
       entityMeta = self.__data__to__emx2__(data = entity, tablename = entityName)
       entityMeta['columnName'] = None
@@ -138,33 +245,381 @@ class Convert2():
             )
           
           molgenis.append(attrData)
-        self.model['molgenis'] = molgenis
+    return molgenis
+  
+  def __molgenis__batched__(
+    self,
+    entities: list = None,
+    defaults: dict = None,
+    keepModelPackage: bool = False,
+    schema: str = None,
+    index: dict = None
+  ):
+    """Build `molgenis` table (batched)
+    Build the rows of each entity in one batch. Values that need to be
+    recoded (`dataType`, `idAttribute`, `nillable`, `refEntity`) are looked
+    up in tables that are filled the first time a distinct value is seen,
+    so each `refEntity` is only split once. The output is identical to
+    `__molgenis__rows__`.
+    
+    @param entities (list): entities defined in the yaml
+    @param defaults (dict): attribute defaults defined in the yaml
+    @param keepModelPackage (bool): see `convert`
+    @param schema (str): EMX2 schema of the entities
+    @param index (dict): if defined, references are resolved using this
+      index (see `__resolve__ref__`)
+    
+    @return list of dictionaries
+    """
+    defaultType = (defaults or {}).get('dataType') or 'string'
+    columnTypes = recodeTable(lambda value: __emx__datatypes__to__emx2__[value or defaultType])
+    keys = recodeTable(lambda value: int(value == True) if value else value)
+    required = recodeTable(lambda value: not value if value is not None else None)
+    refs = recodeTable(lambda value: self.__resolve__ref__(value, schema, index, keepModelPackage))
+    
+    molgenis = []
+    for entity in entities:
+      entityName = entity.get('name')
+      entityMeta = self.__data__to__emx2__(data = entity, tablename = entityName)
+      entityMeta['columnName'] = None
+      if entityMeta.get('tableExtends'):
+        entityMeta['tableExtends'] = refs[entityMeta.get('tableExtends')][1]
+      molgenis.append(entityMeta)
+      
+      molgenis.extend([
+        {
+          'tableName': entityName,
+          'tableExtends': attr.get('extends'),
+          'columnName': attr.get('name'),
+          'columnType': columnTypes[attr.get('dataType')],
+          'key': keys[attr.get('idAttribute')],
+          'required': required[attr.get('nillable')],
+          'refSchema': refs[attr.get('refEntity')][0],
+          'refTable': refs[attr.get('refEntity')][1],
+          'validation': attr.get('validationExpression'),
+          'semantics': attr.get('tags'),
+          'description': attr.get('description')
+        }
+        for attr in (entity.get('attributes') or [])
+      ])
+    return molgenis
+  
+  def __convert__yaml__(
+    self,
+    yaml: dict = None,
+    file: str = None,
+    includeData: bool = True,
+    keepModelPackage: bool = False,
+    batched: bool = True,
+    schema: str = None,
+    index: dict = None
+  ):
+    """Convert a yaml file
+    Convert the contents of a single yaml file into an EMX2 model
+    
+    @param yaml (dict): contents of a yaml-emx file
+    @param file (str): path to the file
+    @param includeData (bool): see `convert`
+    @param keepModelPackage (bool): see `convert`
+    @param batched (bool): see `convert`
+    @param schema (str): EMX2 schema of the model
+    @param index (dict): see `__resolve__ref__`
+    
+    @return dictionary with the `molgenis` table and datasets
+    """
+    log.info('Processing model: %s', file.split('/')[-1])
+    start = time.perf_counter()
+    model = {}
+
+    if 'entities' not in yaml:
+      raise KeyError('EMX entities are not defined in YAML')
+
+    defaults = yaml.get('defaults')
+    molgenis = []
+
+    for entity in yaml['entities']:
+      entityName = entity.get('name')
+      
+      # the `molgenis` table is added once an entity with attributes is found
+      if entity.get('attributes'):
+        model['molgenis'] = molgenis
 
       # extract data if defined in the YAML file                  
       if (includeData) and (entity.get('data')):
-        self.model[entityName] = entity.get('data')
+        model[entityName] = entity.get('data')
+      
+      # datasets stored in external files are read when they are written
+      if (includeData) and (entity.get('dataFile')):
+        model[entityName] = fileDataset(entity['dataFile'], entity.get('dataFormat'))
+    
+    # build data for `molgenis` worksheet
+    if batched:
+      molgenis.extend(self.__molgenis__batched__(yaml['entities'], defaults, keepModelPackage, schema, index))
+    else:
+      molgenis.extend(self.__molgenis__rows__(yaml['entities'], defaults, keepModelPackage))
+    if self.profiler:
+      self.profiler.file(file, 'convert', time.perf_counter() - start)
+      self.profiler.count('entities', len(yaml['entities']))
+      self.profiler.count('attributes', sum([len(entity.get('attributes') or []) for entity in yaml['entities']]))
+    return model
+  
+  @profiled('convert')
+  def convert(
+    self,
+    includeData: bool = True,
+    keepModelPackage: bool = False,
+    batched: bool = True
+  ):
+    """Convert Model
+    Convert molgenis/molgenis EMX-YAMl model format into EMX2
+    
+    If more than one file is converted (or `schemas` are defined), an index
+    of all entities in all files is built first. References (`refEntity`,
+    `extends`) to entities in this index are resolved to the correct EMX2
+    `refSchema` and `refTable`. The converted models are stored by schema
+    name in `self.models`. If all files are converted into one schema, the
+    model is also available as `self.model`.
+    
+    @param includeData (bool): If True (default), any datasets defined in the yaml
+      will be written to file
+    @param keepModelPackage If True, the EMX1 package name will be
+      returned as is. This is useful when the models are stored separately or
+      you would like to restructure the EMX1 instance. Remember to modify the
+      schema names afterwards if required. When converting multiple files,
+      this only applies to references to entities outside these files.
+    @param batched (bool): If True (default), the rows of the `molgenis`
+      table are built per entity with one comprehension, and recoded values
+      are looked up in tables that are filled once per distinct value (see
+      `__molgenis__batched__`). If False, each attribute is converted
+      separately. Both methods give the same output.
+      Multiple files are always converted in batches.
+    """
+    if keepModelPackage:
+      log.warning('All ref attributes will keep the EMX1 format. Make sure these are changed before importing into EMX2.')
+
+    self.__options__ = (includeData, keepModelPackage, batched)
+    self.graph = emxDependencyGraph()
+    for file, yaml in zip(self.files, self._yamls):
+      self.graph.addFile(file, **self.__graph__node__(yaml))
+    self.name = self._yaml.get('name')
+    
+    # single model: references are recoded from the refEntity value
+    if len(self.files) == 1 and not self.schemas:
+      self.model = self.__convert__yaml__(
+        self._yaml, self.file, includeData, keepModelPackage, batched
+      )
+      self.models = {self.name: self.model}
+      self.__converted__ = [self.model]
+      return
+    
+    index = self.__index__entities__()
+    self.__converted__ = [
+      self.__convert__yaml__(
+        yaml, file, includeData, keepModelPackage, True, self.__schema__(yaml), index
+      )
+      for file, yaml in zip(self.files, self._yamls)
+    ]
+    self.__merge__models__()
+
+  def __schema__(self, yaml: dict = None):
+    """Schema of a yaml file
+    @param yaml (dict): contents of a yaml-emx file
+    @return name of the EMX2 schema
+    """
+    return self.schemas.get(yaml.get('name'), yaml.get('name'))
+
+  def __index__entities__(self):
+    """Index entities
+    Index the entities in all files by their EMX1 name
+
+    @return dictionary of `<package>_<entity>` names to (schema, table)
+    """
+    index = {}
+    for yaml in self._yamls:
+      package = yaml.get('name')
+      schema = self.__schema__(yaml)
+      for entity in yaml.get('entities') or []:
+        index[f"{package}_{entity.get('name')}"] = (schema, entity.get('name'))
+    return index
+
+  def __merge__models__(self):
+    """Merge models
+    Combine the converted files into one model per schema. Tables with the
+    same name in the same schema are not allowed.
+    """
+    self.models = {}
+    sources = {}
+    for file, yaml, model in zip(self.files, self._yamls, self.__converted__):
+      schema = self.__schema__(yaml)
+      schemaModel = self.models.setdefault(schema, {})
+      for table in model:
+        if table == 'molgenis':
+          schemaModel.setdefault('molgenis', []).extend(model[table])
+          continue
+        if (schema, table) in sources:
+          raise ValueError(
+            f'Error in Convert2: table {table} of schema {schema} is defined '
+            f'in {sources[(schema, table)]} and {file}'
+          )
+        sources[(schema, table)] = file
+        schemaModel[table] = model[table]
+    self.model = list(self.models.values())[0] if len(self.models) == 1 else None
+
+  def __graph__node__(self, yaml: dict = None):
+    """Dependency graph node
+    @param yaml (dict): contents of a yaml-emx file
+    @return dictionary of arguments of `emxDependencyGraph.addFile`
+    """
+    package = yaml.get('name')
+    entities = yaml.get('entities') or []
+    return {
+      'package': package,
+      'entities': [f"{package}_{entity.get('name')}" for entity in entities],
+      'include': yaml.get('include'),
+      'parent': yaml.get('parent'),
+      'extends': [entity['extends'] for entity in entities if entity.get('extends')],
+      'refEntity': [
+        attr['refEntity']
+        for entity in entities
+        for attr in entity.get('attributes') or []
+        if attr.get('refEntity')
+      ]
+    }
+
+  @profiled('update')
+  def update(self, files: list = None):
+    """Update model
+    Convert the files that changed since the last `convert` (or `update`)
+    and patch them into `self.models`. Files that changed are found using
+    the content hashes in `self.graph`. Files that refer to an entity in a
+    changed file (before or after the change) are converted again as well,
+    so that `refSchema` and `refTable` stay correct. Other files are not
+    read again.
+
+    @param files (list): files that changed (default: all files whose
+      contents differ from the last conversion)
+
+    @return list of files that were converted again
+    """
+    if self.graph is None:
+      raise ValueError('Error in update: the model must be converted first')
+    changed = [file for file in (self.graph.changed() if files is None else files) if file in self.files]
+    if not changed:
+      return []
+    affected = set(changed) | self.graph.dependents(changed)
+    for index, file in enumerate(self.files):
+      if file in changed:
+        self._yamls[index] = loadYaml(file = file)
+        self.__cache__yaml__(file, self._yamls[index])
+        self.graph.addFile(file, **self.__graph__node__(self._yamls[index]))
+    affected |= self.graph.dependents(changed)
+    self._yaml = self._yamls[0]
+    self.name = self._yaml.get('name')
+    includeData, keepModelPackage, batched = self.__options__
+
+    if len(self.files) == 1 and not self.schemas:
+      self.model = self.__convert__yaml__(
+        self._yaml, self.file, includeData, keepModelPackage, batched
+      )
+      self.models = {self.name: self.model}
+      self.__converted__ = [self.model]
+      return changed
+
+    index = self.__index__entities__()
+    updated = []
+    for position, (file, yaml) in enumerate(zip(self.files, self._yamls)):
+      if file in affected:
+        self.__converted__[position] = self.__convert__yaml__(
+          yaml, file, includeData, keepModelPackage, True, self.__schema__(yaml), index
+        )
+        updated.append(file)
+    self.__merge__models__()
+    return updated
           
-  def write(self,name: str = None,format: str = 'xlsx',outDir: str = '.'):
+  @profiled('write')
+  def write(
+    self,
+    name: str = None,
+    format: str = 'xlsx',
+    outDir: str = '.',
+    engine: str = 'pandas',
+    splitSheets: bool = False,
+    workers: int = None
+  ):
     """Write EMX to XLSX
-    Write EMX2 model to file
+    Write EMX2 model to file. If the files were converted into more than
+    one schema, each schema is written separately using the schema name:
+    `<outDir>/<schema>.xlsx` or `<outDir>/<schema>/*.csv`. The formats
+    'csv.gz', 'csv.zst', 'parquet', and 'arrow' are like 'csv', but all
+    tables except `molgenis` are written in that format (see
+    `Convert.write`). The format 'zip' streams all tables into
+    `<outDir>/<name>.zip` as csv files, always using the 'stream' engine.
     
-    @param name name of the model
+    @param name name of the model (not used if there is more than one schema)
     @param outDir directory to save the file(s). The default is the current directory i.e. '.'
+    @param engine 'pandas' (default) builds a DataFrame per sheet, 'stream'
+      writes rows directly without pandas
+    @param splitSheets xlsx with engine 'stream' only. If True, tables
+      with more rows than an Excel sheet can hold are split into several
+      sheets. Otherwise, an error is raised before the file is written.
+    @param workers not for xlsx or zip. If greater than 1, files are written
+      concurrently in a pool of threads (see `Convert.write`)
+    
+    @return not for xlsx or zip: summary of the written files. If there is more than
+      one schema, file names include the schema folder.
     """
-    if not name:
+    if not name and self.model is not None:
       raise ValueError('value for name cannot be `None`')
     
-    if format not in ['csv','xlsx']:
-      raise ValueError(f'Invalid format {str(format)}. Use csv or xlsx')
+    if format not in ['xlsx', 'zip', 'csv', 'csv.gz', 'csv.zst', 'parquet', 'arrow']:
+      raise ValueError(f'Invalid format {str(format)}. Use xlsx, zip, csv, csv.gz, csv.zst, parquet, or arrow')
     
-    writer = emxWriter2()
-    if format == 'xlsx':
-      file = f'{outDir}/{name}.{str(format)}'
-      if path.exists(file):
-        remove(file)
-      writer.writeXlsx(model = self.model, path = file)
-      
-    # not yet implemented!!  
-    if format == 'csv':
-      dir = getcwd() if outDir == '.' else str(outDir)
-      writer.writeCsv(model = self.model, dir = dir)
+    if engine not in ['pandas','stream']:
+      raise ValueError(f'Invalid engine {str(engine)}. Use pandas or stream')
+    
+    if splitSheets and engine != 'stream':
+      raise ValueError('splitSheets requires engine stream')
+    
+    # writers are imported here so that importing this module does not load pandas
+    from yamlemxconvert.emxStreamWriter import atomicWrite
+    if engine == 'stream' or format == 'zip':
+      from yamlemxconvert.emxStreamWriter import emxStreamWriter2 as emxWriterClass
+    else:
+      from yamlemxconvert.emxWriter import emxWriter2 as emxWriterClass
+    writer = emxWriterClass()
+    
+    models = {name: self.model} if self.model is not None else self.models
+    summary = []
+    for modelName, model in models.items():
+      if format == 'xlsx':
+        file = f'{outDir}/{modelName}.{str(format)}'
+        if path.exists(file):
+          remove(file)
+        if splitSheets:
+          writer.writeXlsx(model = model, path = file, splitSheets = splitSheets)
+        else:
+          writer.writeXlsx(model = model, path = file)
+        if self.profiler:
+          self.profiler.written(file = file)
+        
+      if format == 'zip':
+        file = f'{outDir}/{modelName}.zip'
+        atomicWrite(file, lambda file: writer.writeZip(model = model, path = file))
+        if self.profiler:
+          self.profiler.written(file = file)
+        
+      if format not in ['xlsx', 'zip']:
+        dir = getcwd() if outDir == '.' else str(outDir)
+        if self.model is None:
+          dir = f'{dir}/{modelName}'
+          makedirs(dir, exist_ok = True)
+        files = writer.writeCsv(model = model, dir = dir, workers = workers, dataFormat = format)
+        for file in files:
+          if self.model is None:
+            file['file'] = f"{modelName}/{file['file']}"
+          summary.append(file)
+    
+    if format not in ['xlsx', 'zip']:
+      if self.profiler:
+        self.profiler.written(summary = summary)
+      return summary
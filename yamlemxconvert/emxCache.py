@@ -0,0 +1,258 @@
+from os import path, makedirs, listdir, remove, replace, utime, stat
+import hashlib
+import json
+import pickle
+import tempfile
+from yamlemxconvert.__version__ import __version__
+
+# increase when the format of cached entries changes
+__cache__format__ = 1
+
+def hashFile(file: str = None):
+  """Hash File
+  Compute the SHA-256 hash of the contents of a file
+
+  @param file (str): path to a file
+
+  @return hex digest
+  """
+  digest = hashlib.sha256()
+  with open(file, 'rb') as stream:
+    for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+class emxCache:
+  def __init__(self, dir: str = '.emxcache', maxSize: int = 256 * 1024 * 1024):
+    """EMX Cache
+    On-disk cache of extracted yaml-emx files. Entries are keyed by the hash
+    of the file contents, the path of the file, the conversion options, and
+    the version of yamlemxconvert, so an entry is reused until the file (or
+    any of the files it depends on) changes or the package is upgraded. When the
+    cache grows larger than `maxSize`, the least recently used entries are
+    removed.
+
+    @param dir (str): directory to store cache entries (default: '.emxcache')
+    @param maxSize (int): maximum size of the cache in bytes (default: 256MB)
+
+    @example
+    ```
+    from yamlemxconvert.convert import Convert
+    from yamlemxconvert.emxCache import emxCache
+
+    cache = emxCache(dir = '.emxcache')
+    emx = Convert(files = ['path/to/my_model.yml'])
+    emx.convert(cache = cache)
+    ```
+    """
+    self.dir = dir
+    self.maxSize = maxSize
+    makedirs(self.dir, exist_ok = True)
+
+  def __entry__path__(self, key: str = None):
+    """Path to a cache entry
+    @param key (str): cache key
+    """
+    return path.join(self.dir, key + '.pickle')
+
+  def key(self, file: str = None, options: tuple = ()):
+    """Cache key
+    Build a cache key from the contents and absolute path of a file, the
+    conversion options, and the package version (and cache format).
+    Identical files at different paths have different keys, because paths
+    in the output (e.g., `dataFile`) depend on the location of the file.
+
+    @param file (str): path to a yaml file
+    @param options (tuple): conversion options that change the output
+
+    @return cache key (str)
+    """
+    digest = hashlib.sha256()
+    digest.update(f'{__version__}:{__cache__format__}\0'.encode())
+    digest.update((path.abspath(file) + '\0').encode())
+    digest.update(hashFile(file).encode())
+    digest.update(repr(options).encode())
+    return digest.hexdigest()
+
+  def get(self, key: str = None):
+    """Get cache entry
+    Return the cached value if it exists and all of its dependencies are
+    unchanged.
+
+    @param key (str): cache key
+
+    @return cached value or None
+    """
+    file = self.__entry__path__(key)
+    try:
+      with open(file, 'rb') as stream:
+        entry = pickle.load(stream)
+    except (OSError, EOFError, pickle.UnpicklingError):
+      return None
+
+    for dependency, digest in entry['dependencies'].items():
+      if not path.exists(dependency) or hashFile(dependency) != digest:
+        return None
+
+    # mark entry as recently used
+    utime(file)
+    return entry['value']
+
+  def set(self, key: str = None, value = None, dependencies: list = []):
+    """Set cache entry
+    Store a value in the cache. The entry is invalidated if any of the
+    dependencies change.
+
+    @param key (str): cache key
+    @param value: value to store (must be picklable)
+    @param dependencies (list): paths of files that the value depends on
+    """
+    entry = {
+      'dependencies': {file: hashFile(file) for file in dependencies},
+      'value': value
+    }
+
+    # write to a temporary file first so that readers never see partial entries
+    with tempfile.NamedTemporaryFile(dir = self.dir, suffix = '.tmp', delete = False) as stream:
+      pickle.dump(entry, stream, protocol = pickle.HIGHEST_PROTOCOL)
+    replace(stream.name, self.__entry__path__(key))
+    self.evict()
+
+  def size(self):
+    """Cache size
+    @return total size of all entries in bytes
+    """
+    return sum([entry[2] for entry in self.__entries__()])
+
+  def __entries__(self):
+    """List cache entries
+    @return list of (file, last used, size)
+    """
+    entries = []
+    for name in listdir(self.dir):
+      if name.endswith('.pickle'):
+        file = path.join(self.dir, name)
+        info = stat(file)
+        entries.append((file, info.st_mtime, info.st_size))
+    return entries
+
+  def evict(self):
+    """Evict entries
+    Remove the least recently used entries until the cache is smaller than
+    `maxSize`
+    """
+    entries = sorted(self.__entries__(), key = lambda entry: entry[1])
+    total = sum([entry[2] for entry in entries])
+    for file, _, size in entries:
+      if total <= self.maxSize:
+        break
+      remove(file)
+      total -= size
+
+  def clear(self):
+    """Clear cache
+    Remove all cache entries
+    """
+    for name in listdir(self.dir):
+      if name.endswith(('.pickle', '.tmp')):
+        remove(path.join(self.dir, name))
+
+
+class emxMemoryCache:
+  def __init__(self):
+    """EMX Memory Cache
+    In-memory version of `emxCache` for long running processes (e.g., the
+    command line `--watch` mode). Entries are keyed in the same way, but
+    are kept in a dictionary instead of being written to disk. Only the
+    most recent entry of each file and set of options is kept. Values are
+    stored pickled, so changes to a converted model (e.g.,
+    `compileSemanticTags`) do not modify the cached entries.
+    """
+    self.entries = {}
+
+  def key(self, file: str = None, options: tuple = ()):
+    """Cache key
+    @param file (str): path to a yaml file
+    @param options (tuple): conversion options that change the output
+
+    @return cache key (tuple)
+    """
+    return (file, hashFile(file), options)
+
+  def get(self, key: tuple = None):
+    """Get cache entry
+    @param key (tuple): cache key
+
+    @return cached value or None
+    """
+    entry = self.entries.get((key[0], key[2]))
+    if entry is None or entry['key'] != key:
+      return None
+    for dependency, digest in entry['dependencies'].items():
+      if not path.exists(dependency) or hashFile(dependency) != digest:
+        return None
+    return pickle.loads(entry['value'])
+
+  def set(self, key: tuple = None, value = None, dependencies: list = []):
+    """Set cache entry
+    @param key (tuple): cache key
+    @param value: value to store
+    @param dependencies (list): paths of files that the value depends on
+    """
+    self.entries[(key[0], key[2])] = {
+      'key': key,
+      'dependencies': {file: hashFile(file) for file in dependencies},
+      'value': pickle.dumps(value, protocol = pickle.HIGHEST_PROTOCOL)
+    }
+
+  def clear(self):
+    """Clear cache"""
+    self.entries = {}
+
+
+class emxTagCache:
+  def __init__(self, file: str = '.emxtags.json'):
+    """EMX Tag Cache
+    Persistent cache of parsed semantic tags (see
+    `Convert.compileSemanticTags`). Each tag string is stored with its
+    identifier, IRI, and code system, so tags that are used in many
+    models (e.g., NCIT or dcat codes) are only parsed once.
+
+    @param file (str): path to a JSON file (default: '.emxtags.json')
+    """
+    self.file = file
+    self.tags = {}
+    self.changed = False
+    if path.exists(file):
+      with open(file, 'r', encoding = 'utf-8') as stream:
+        self.tags = json.load(stream)
+
+  def get(self, tag: str = None):
+    """Get parsed tag
+    @param tag (str): a tag string
+
+    @return tuple of identifier, IRI, and code system or None
+    """
+    parsed = self.tags.get(tag)
+    return tuple(parsed) if parsed is not None else None
+
+  def set(self, tag: str = None, parsed: tuple = None):
+    """Set parsed tag
+    @param tag (str): a tag string
+    @param parsed (tuple): identifier, IRI, and code system
+    """
+    self.tags[tag] = list(parsed)
+    self.changed = True
+
+  def save(self):
+    """Save cache
+    Write the cache to file if any tags were added
+    """
+    if not self.changed:
+      return
+    directory = path.dirname(path.abspath(self.file))
+    with tempfile.NamedTemporaryFile('w', dir = directory, suffix = '.tmp', delete = False, encoding = 'utf-8') as stream:
+      json.dump(self.tags, stream, indent = 2, sort_keys = True)
+    replace(stream.name, self.file)
+    self.changed = False
@@ -0,0 +1,288 @@
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from os import makedirs, path, remove
+from yamlemxconvert.emxCache import emxCache, emxMemoryCache
+import argparse
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+
+log = logging.getLogger(__name__)
+
+def tokenPath(address: str = '127.0.0.1:8765'):
+  """Token Path
+  Default location of the token file of a daemon
+
+  @param address (str): host and port of the daemon
+  @return path to `~/.yamlemxconvert/daemon-<host>-<port>.token`
+  """
+  name = 'daemon-' + address.replace(':', '-') + '.token'
+  return path.join(path.expanduser('~'), '.yamlemxconvert', name)
+
+def readToken(file: str = None):
+  """Read Token
+  @param file (str): path to a token file
+  @return token (str)
+  """
+  try:
+    with open(file, 'r', encoding = 'utf-8') as stream:
+      return stream.read().strip()
+  except OSError as error:
+    raise ValueError(f'Error in readToken: cannot read the daemon token ({error})')
+
+def writeToken(file: str = None, token: str = None):
+  """Write Token
+  Write the token to a file that only the current user can read
+
+  @param file (str): path to the token file
+  @param token (str): token
+  """
+  directory = path.dirname(file)
+  if directory:
+    makedirs(directory, mode = 0o700, exist_ok = True)
+  descriptor = os.open(file, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+  os.chmod(file, 0o600)
+  with os.fdopen(descriptor, 'w', encoding = 'utf-8') as stream:
+    stream.write(token)
+
+class pooledHTTPServer(HTTPServer):
+  def __init__(self, address: tuple = None, handler = None, workers: int = 4):
+    """Pooled HTTP Server
+    An HTTP server that handles requests in a thread pool of a fixed size.
+    Requests that arrive while all workers are busy wait in the queue.
+
+    @param address (tuple): host and port
+    @param handler: request handler class
+    @param workers (int): number of worker threads
+    """
+    super().__init__(address, handler)
+    self.pool = ThreadPoolExecutor(max_workers = workers)
+
+  def process_request(self, request, client_address):
+    self.pool.submit(self.__process__request__, request, client_address)
+
+  def __process__request__(self, request, client_address):
+    try:
+      self.finish_request(request, client_address)
+    except Exception:
+      self.handle_error(request, client_address)
+    finally:
+      self.shutdown_request(request)
+
+  def server_close(self):
+    super().server_close()
+    self.pool.shutdown(wait = True)
+
+
+class emxRequestHandler(BaseHTTPRequestHandler):
+  """Request handler for `emxDaemon`
+
+  - `GET /status`: status of the daemon
+  - `POST /convert`: convert a model. The body is a JSON object with the
+    options of the command line interface (see `yamlemxconvert.cli`).
+  - `POST /shutdown`: stop the daemon
+
+  All requests must send the token of the daemon (`Authorization: Bearer
+  <token>`), and POST requests must be `Content-Type: application/json`.
+  Other requests are rejected, so web pages cannot send requests to the
+  daemon (e.g., a cross-origin `text/plain` form post).
+  """
+
+  def __respond__(self, status: int = 200, body: dict = None):
+    content = json.dumps(body).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(content)))
+    self.end_headers()
+    self.wfile.write(content)
+
+  def log_message(self, format, *args):
+    if self.server.daemon.verbose:
+      super().log_message(format, *args)
+
+  def __authorized__(self):
+    """Check the token of a request (and respond with 401 if invalid)
+    @return True if the request may be handled
+    """
+    header = self.headers.get('Authorization', '')
+    token = header[len('Bearer '):] if header.startswith('Bearer ') else ''
+    if not hmac.compare_digest(token.encode('utf-8'), self.server.daemon.token.encode('utf-8')):
+      self.__respond__(401, {'status': 'error', 'error': 'invalid or missing token'})
+      return False
+    return True
+
+  def do_GET(self):
+    if not self.__authorized__():
+      return
+    if self.path != '/status':
+      return self.__respond__(404, {'status': 'error', 'error': f'unknown path {self.path}'})
+    self.__respond__(200, self.server.daemon.status())
+
+  def do_POST(self):
+    if not self.__authorized__():
+      return
+    contentType = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if contentType != 'application/json':
+      return self.__respond__(415, {'status': 'error', 'error': 'requests must be application/json'})
+    if self.path == '/shutdown':
+      self.__respond__(200, {'status': 'ok'})
+      threading.Thread(target = self.server.shutdown).start()
+      return
+    if self.path != '/convert':
+      return self.__respond__(404, {'status': 'error', 'error': f'unknown path {self.path}'})
+    try:
+      length = int(self.headers.get('Content-Length', 0))
+      options = json.loads(self.rfile.read(length) or b'{}')
+      result = self.server.daemon.convert(options)
+    except Exception as error:
+      return self.__respond__(400, {'status': 'error', 'error': str(error)})
+    self.__respond__(200, result)
+
+
+class emxDaemon:
+  def __init__(
+    self,
+    host: str = '127.0.0.1',
+    port: int = 8765,
+    workers: int = 4,
+    verbose: bool = False,
+    tokenFile: str = None
+  ):
+    """EMX Daemon
+    A long running conversion service. The daemon keeps the conversion
+    modules imported and the extracted files in memory (`emxMemoryCache`),
+    so only files that changed since the last request are processed
+    again. Requests are sent over HTTP (use `sendRequest` or the command
+    line option `--daemon`) and are handled by a bounded pool of workers.
+
+    Each daemon creates a random token and writes it to `tokenFile`, which
+    only the current user can read. Requests without the token are
+    rejected (see `emxRequestHandler`). The file is removed when the
+    daemon stops.
+
+    @param host (str): address to listen on (default: '127.0.0.1')
+    @param port (int): port to listen on (default: 8765, use 0 to pick a
+      free port)
+    @param workers (int): maximum number of requests that are processed at
+      the same time (default: 4)
+    @param verbose (bool): if True, log all HTTP requests
+    @param tokenFile (str): path to write the token to (default:
+      `~/.yamlemxconvert/daemon-<host>-<port>.token`, see `tokenPath`)
+
+    @examples
+    ```
+    from yamlemxconvert.emxDaemon import emxDaemon
+    emxDaemon(port = 8765).serve()
+    ```
+    """
+    self.cache = emxMemoryCache()
+    self.requests = 0
+    self.verbose = verbose
+    self.server = pooledHTTPServer((host, port), emxRequestHandler, workers)
+    self.server.daemon = self
+    self.address = '%s:%d' % self.server.server_address[:2]
+    self.token = secrets.token_urlsafe(32)
+    self.tokenFile = tokenFile or tokenPath(self.address)
+    writeToken(self.tokenFile, self.token)
+    self.__lock__ = threading.Lock()
+
+  def status(self):
+    """Status
+    @return dictionary with the address and number of processed requests
+    """
+    return {
+      'status': 'ok',
+      'address': self.address,
+      'requests': self.requests,
+      'cachedFiles': len(self.cache.entries)
+    }
+
+  def convert(self, options: dict = None):
+    """Convert a model
+    @param options (dict): parsed command line options (paths must be
+      absolute, see `resolveOptions`)
+
+    @return dictionary with the converted files and elapsed time
+    """
+    # imported here to avoid a circular import
+    from yamlemxconvert.cli import expandFiles, runEmx1, runEmx2
+
+    args = argparse.Namespace(**options)
+    if args.command not in ['emx1', 'emx2']:
+      raise ValueError(f'Error in convert: unknown command {args.command}')
+    start = time.perf_counter()
+    files = expandFiles(args.files)
+    makedirs(args.outDir, exist_ok = True)
+    cache = emxCache(dir = args.cache) if getattr(args, 'cache', None) else self.cache
+    if args.command == 'emx1':
+      report = runEmx1(args, files, cache)
+      if report is not None and not report.valid:
+        raise ValueError(f'Error in convert: model is not valid\n{report}')
+    else:
+      runEmx2(args, files, cache = cache)
+    with self.__lock__:
+      self.requests += 1
+    return {
+      'status': 'ok',
+      'files': files,
+      'outDir': args.outDir,
+      'elapsed': round(time.perf_counter() - start, 4)
+    }
+
+  def serve(self):
+    """Start the daemon
+    Handle requests until `shutdown` is called (or a `/shutdown` request
+    is received)
+    """
+    log.info('Listening on http://%s', self.address)
+    try:
+      self.server.serve_forever()
+    finally:
+      self.server.server_close()
+      if path.exists(self.tokenFile):
+        remove(self.tokenFile)
+
+  def shutdown(self):
+    """Stop the daemon"""
+    self.server.shutdown()
+
+
+def sendRequest(
+  address: str = '127.0.0.1:8765',
+  path: str = '/convert',
+  options: dict = None,
+  tokenFile: str = None
+):
+  """Send Request
+  Send a request to a running `emxDaemon`
+
+  @param address (str): host and port of the daemon
+  @param path (str): '/convert', '/status', or '/shutdown'
+  @param options (dict): conversion options (for '/convert')
+  @param tokenFile (str): token file of the daemon (default: see
+    `tokenPath`)
+
+  @return response (dict)
+  """
+  token = readToken(tokenFile or tokenPath(address))
+  data = json.dumps(options or {}).encode('utf-8')
+  request = urllib.request.Request(
+    f'http://{address}{path}',
+    data = None if path == '/status' else data,
+    method = 'GET' if path == '/status' else 'POST',
+    headers = {
+      'Content-Type': 'application/json',
+      'Authorization': f'Bearer {token}'
+    }
+  )
+  try:
+    with urllib.request.urlopen(request) as response:
+      return json.load(response)
+  except urllib.error.HTTPError as error:
+    return json.load(error)
@@ -0,0 +1,171 @@
+from os import path, replace
+from yamlemxconvert.emxCache import hashFile
+import json
+import uuid
+
+# kinds of references between files
+__emx__reference__kinds__ = ('include', 'parent', 'extends', 'refEntity')
+
+class emxDependencyGraph:
+  def __init__(self, file: str = None):
+    """EMX Dependency Graph
+    Keep track of the references between the files of a model. For each
+    file, the graph stores the content hash, the package and entities that
+    the file defines, and the files, packages, and entities it refers to
+    (`include`, package `parent`, entity `extends`, and attribute
+    `refEntity`). The graph is used to find the files that have to be
+    converted again when a file changes (see `Convert.update` and
+    `Convert2.update`), and can be saved as JSON.
+
+    @param file (str): a JSON file to load the graph from (if it exists)
+
+    @examples
+    ```
+    from yamlemxconvert.emxGraph import emxDependencyGraph
+    graph = emxDependencyGraph(file = 'model/.emxgraph.json')
+    changed = graph.changed()
+    affected = graph.dependents(changed)
+    ```
+    """
+    self.file = file
+    self.files = {}
+    self.hashes = {}
+    if file and path.exists(file):
+      with open(file, 'r', encoding = 'utf-8') as stream:
+        contents = json.load(stream)
+      self.files = contents.get('files', {})
+      self.hashes = contents.get('hashes', {})
+
+  def addFile(
+    self,
+    file: str = None,
+    package: str = None,
+    entities: list = None,
+    include: str = None,
+    parent: str = None,
+    extends: list = None,
+    refEntity: list = None
+  ):
+    """Add file
+    @param file (str): path to a yaml file
+    @param package (str): name of the package defined in the file
+    @param entities (list): `<package>_<entity>` names of the entities
+    @param include (str): path of the `include` file
+    @param parent (str): parent of the package
+    @param extends (list): entities that are extended
+    @param refEntity (list): entities that are referenced by attributes
+    """
+    self.files[file] = {
+      'package': package,
+      'entities': sorted(set(entities or [])),
+      'include': [include] if include else [],
+      'parent': [parent] if parent else [],
+      'extends': sorted(set(extends or [])),
+      'refEntity': sorted(set(refEntity or []))
+    }
+    for name in [file] + self.files[file]['include']:
+      if path.exists(name):
+        self.hashes[name] = hashFile(name)
+
+  def removeFile(self, file: str = None):
+    """Remove file
+    @param file (str): path to a yaml file
+    """
+    self.files.pop(file, None)
+    includes = {name for node in self.files.values() for name in node['include']}
+    for name in list(self.hashes):
+      if name not in self.files and name not in includes:
+        del self.hashes[name]
+
+  def providers(self):
+    """Providers
+    @return dictionaries of files by package and by entity name
+    """
+    packages = {}
+    entities = {}
+    for file, node in self.files.items():
+      packages.setdefault(node['package'], set()).add(file)
+      for entity in node['entities']:
+        entities.setdefault(entity, set()).add(file)
+    return packages, entities
+
+  def edges(self, kinds: list = __emx__reference__kinds__):
+    """Edges
+    Resolve the references of each file to the files that define them.
+    References to packages and entities outside the graph are ignored.
+
+    @param kinds (list): kinds of references to include (default: all)
+
+    @return dictionary of the files (and `include` files) each file depends on
+    """
+    packages, entities = self.providers()
+    edges = {}
+    for file, node in self.files.items():
+      targets = set()
+      if 'include' in kinds:
+        targets.update(node['include'])
+      if 'parent' in kinds:
+        for name in node['parent']:
+          targets.update(packages.get(name, ()))
+      for kind in ('extends', 'refEntity'):
+        if kind in kinds:
+          for name in node[kind]:
+            targets.update(entities.get(name, ()))
+      targets.discard(file)
+      edges[file] = targets
+    return edges
+
+  def dependents(self, files: list = None, kinds: list = __emx__reference__kinds__):
+    """Dependents
+    Find all files that (directly or indirectly) depend on one of `files`
+
+    @param files (list): changed files (model or `include` files)
+    @param kinds (list): kinds of references to follow (default: all)
+
+    @return set of files (not including `files`)
+    """
+    reverse = {}
+    for file, targets in self.edges(kinds).items():
+      for target in targets:
+        reverse.setdefault(target, set()).add(file)
+    found = set()
+    queue = list(files or [])
+    while queue:
+      for dependent in reverse.get(queue.pop(), ()):
+        if dependent not in found:
+          found.add(dependent)
+          queue.append(dependent)
+    return found - set(files or [])
+
+  def changed(self):
+    """Changed files
+    Compare the content hashes of all model and `include` files with the
+    files on disk
+
+    @return list of files that were modified or removed
+    """
+    changed = []
+    for name, digest in self.hashes.items():
+      if not path.exists(name) or hashFile(name) != digest:
+        changed.append(name)
+    for file in self.files:
+      if file not in self.hashes and file not in changed:
+        changed.append(file)
+    return changed
+
+  def toDict(self):
+    return {'files': self.files, 'hashes': self.hashes}
+
+  def save(self, file: str = None):
+    """Save graph
+    @param file (str): path to a JSON file (default: the file the graph was
+      loaded from)
+    """
+    file = file or self.file
+    if not file:
+      raise ValueError('Error in save: file is not defined')
+    tmp = f'{file}.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'w', encoding = 'utf-8') as stream:
+      json.dump(self.toDict(), stream, indent = 2, sort_keys = True)
+    replace(tmp, file)
+
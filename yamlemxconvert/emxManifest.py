@@ -0,0 +1,80 @@
+from os import path, remove, replace
+from yamlemxconvert.emxCache import hashFile
+import json
+import uuid
+
+class emxManifest:
+  def __init__(self, dir: str = None, file: str = '.emxmanifest.json'):
+    """EMX Manifest
+    Keep track of the content hashes of the files written into an output
+    directory. Files are only replaced when their contents change, and
+    files that were written in a previous run but not in the current run
+    can be removed.
+
+    @param dir (str): output directory
+    @param file (str): name of the manifest file (stored in `dir`)
+    """
+    self.dir = dir
+    self.file = path.join(dir, file)
+    self.files = {}
+    self.written = []
+    self.changed = []
+    self.removed = []
+    if path.exists(self.file):
+      with open(self.file, 'r', encoding = 'utf-8') as stream:
+        self.files = json.load(stream)
+
+  def write(self, name: str = None, write = None):
+    """Write file
+    Write a file into a temporary location and only move it into place if
+    its contents differ from the existing file.
+
+    @param name (str): name of the file (relative to `dir`)
+    @param write: a function that takes a path and writes the file contents
+
+    @return True if the file was (re)written
+    """
+    target = path.join(self.dir, name)
+    tmp = f'{target}.{uuid.uuid4().hex}.tmp'
+    try:
+      write(tmp)
+      digest = hashFile(tmp)
+    except BaseException:
+      if path.exists(tmp):
+        remove(tmp)
+      raise
+    self.written.append(name)
+
+    # compare with the file on disk (it may have been edited since the last run)
+    previous = hashFile(target) if path.exists(target) else None
+    if previous == digest:
+      remove(tmp)
+      self.files[name] = digest
+      return False
+
+    replace(tmp, target)
+    self.files[name] = digest
+    self.changed.append(name)
+    return True
+
+  def prune(self, keep = None):
+    """Remove stale files
+    Remove files that are listed in the manifest, but were not written in
+    the current run (e.g., datasets of entities that no longer exist).
+
+    @param keep: function that takes the name of a file and returns True if
+      the file should be kept, even though it was not written (e.g.,
+      datasets in a run without data)
+    """
+    for name in list(self.files):
+      if name not in self.written and not (keep and keep(name)):
+        file = path.join(self.dir, name)
+        if path.exists(file):
+          remove(file)
+        del self.files[name]
+        self.removed.append(name)
+
+  def save(self):
+    """Save manifest"""
+    with open(self.file, 'w', encoding = 'utf-8') as stream:
+      json.dump(self.files, stream, indent = 2, sort_keys = True)
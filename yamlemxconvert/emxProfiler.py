@@ -0,0 +1,191 @@
+from contextlib import contextmanager
+from functools import wraps
+from os import path, replace
+import json
+import logging
+import sys
+import time
+import uuid
+
+try:
+  import resource
+except ImportError:
+  resource = None
+
+log = logging.getLogger(__name__)
+
+def peakMemory():
+  """Peak memory
+  Get the maximum resident set size of the current process. This is the
+  peak over the lifetime of the process, not of a stage or conversion: in
+  long running processes (e.g., the daemon or `--watch` mode), it does not
+  go down after a large conversion.
+
+  @return size in bytes or None (if not available, e.g., on Windows)
+  """
+  if resource is None:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+  return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class emxProfiler:
+  def __init__(self, callback = None, level: int = logging.DEBUG):
+    """EMX Profiler
+    Collect timings and counters of a conversion. Stages (e.g., 'convert',
+    'compileSemanticTags', 'write') and files are timed separately, and
+    counters keep track of the number of files, entities, attributes, rows,
+    and bytes written. Every event is logged (logger 'yamlemxconvert') and
+    passed to `callback`. The peak memory is the peak of the whole process
+    (see `peakMemory`).
+
+    @param callback: a function that is called with a dictionary for every
+      event (`{'event': 'stage', 'stage': 'write', 'elapsed': 0.12, ...}`)
+    @param level (int): logging level of events (default: DEBUG)
+
+    @examples
+    ```
+    from yamlemxconvert.convert import Convert
+    from yamlemxconvert.emxProfiler import emxProfiler
+
+    profiler = emxProfiler()
+    emx = Convert(files = ['path/to/my_model.yml'], profiler = profiler)
+    emx.convert()
+    emx.write(name = 'my_model', format = 'csv', outDir = 'emx')
+    profiler.save('profile.json')
+    ```
+    """
+    self.callback = callback
+    self.level = level
+    self.stages = {}
+    self.files = {}
+    self.counters = {}
+    self.start = time.perf_counter()
+
+  def __emit__(self, event: dict = None):
+    """Emit event
+    @param event (dict): event to log and pass to the callback
+    """
+    if log.isEnabledFor(self.level):
+      details = ', '.join([f'{key}={value}' for key, value in event.items() if key != 'event'])
+      log.log(self.level, f"{event['event']}: {details}")
+    if self.callback:
+      self.callback(event)
+
+  @contextmanager
+  def stage(self, name: str = None, **details):
+    """Time a stage
+    @param name (str): name of the stage
+    @param **details: additional information (e.g., format = 'csv')
+    """
+    start = time.perf_counter()
+    try:
+      yield self
+    finally:
+      elapsed = time.perf_counter() - start
+      stage = self.stages.setdefault(name, {'calls': 0, 'elapsed': 0.0})
+      stage['calls'] += 1
+      stage['elapsed'] += elapsed
+      self.__emit__({'event': 'stage', 'stage': name, 'elapsed': round(elapsed, 6), **details})
+
+  def file(self, file: str = None, stage: str = None, elapsed: float = 0.0, **details):
+    """Record the time spent on a file
+    @param file (str): path or name of the file
+    @param stage (str): name of the stage (e.g., 'extract' or 'write')
+    @param elapsed (float): seconds
+    @param **details: additional information (e.g., rows = 10)
+    """
+    entry = self.files.setdefault(file, {})
+    entry[stage] = entry.get(stage, 0.0) + elapsed
+    self.__emit__({'event': 'file', 'file': file, 'stage': stage, 'elapsed': round(elapsed, 6), **details})
+
+  def count(self, name: str = None, value: int = 1):
+    """Increase a counter
+    @param name (str): name of the counter (e.g., 'rows')
+    @param value (int): amount to add (None is ignored)
+    """
+    if value is None:
+      return
+    self.counters[name] = self.counters.get(name, 0) + value
+
+  def written(self, file: str = None, summary: list = None):
+    """Record written files
+    @param file (str): path of a written xlsx or zip file
+    @param summary (list): summary of written csv files (see
+      `emxStreamWriter.writeFiles`). The number of rows of csv files that
+      are copied as is (`dataFile`) is unknown (None) and not counted.
+    """
+    if file:
+      self.count('filesWritten')
+      self.count('bytes', path.getsize(file))
+    for entry in summary or []:
+      self.file(entry['file'], 'write', entry['elapsed'], rows = entry['rows'], bytes = entry['bytes'])
+      self.count('filesWritten')
+      self.count('rows', entry['rows'])
+      self.count('bytes', entry['bytes'])
+
+  def toDict(self):
+    """Profile as dictionary
+    @return dictionary with the total time, stages, files, counters, and
+      peak memory of the process (bytes, see `peakMemory`)
+    """
+    return {
+      'elapsed': round(time.perf_counter() - self.start, 6),
+      'stages': {name: {'calls': stage['calls'], 'elapsed': round(stage['elapsed'], 6)} for name, stage in self.stages.items()},
+      'files': {file: {stage: round(elapsed, 6) for stage, elapsed in stages.items()} for file, stages in self.files.items()},
+      'counters': dict(self.counters),
+      'peakMemory': peakMemory()
+    }
+
+  def __str__(self):
+    profile = self.toDict()
+    lines = [f"Total: {profile['elapsed']:.3f}s"]
+    for name, stage in profile['stages'].items():
+      lines.append(f"  {name}: {stage['elapsed']:.3f}s ({stage['calls']} call(s))")
+    if profile['counters']:
+      lines.append('Counters: ' + ', '.join([f'{name}={value}' for name, value in profile['counters'].items()]))
+    if profile['peakMemory'] is not None:
+      lines.append(f"Peak memory (process lifetime): {profile['peakMemory'] / 1024 / 1024:.1f} MB")
+    return '\n'.join(lines)
+
+  def save(self, file: str = None):
+    """Save profile
+    @param file (str): path to a JSON file
+    """
+    tmp = f'{file}.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'w', encoding = 'utf-8') as stream:
+      json.dump(self.toDict(), stream, indent = 2)
+    replace(tmp, file)
+
+
+@contextmanager
+def profileStage(profiler: emxProfiler = None, name: str = None, **details):
+  """Profile stage
+  Time a stage if a profiler is defined
+
+  @param profiler (emxProfiler): a profiler or None
+  @param name (str): name of the stage
+  """
+  if profiler is None:
+    yield None
+    return
+  with profiler.stage(name, **details):
+    yield profiler
+
+def profiled(name: str = None):
+  """Profiled method
+  Decorator that times a method as a stage if the instance has a
+  `profiler`
+
+  @param name (str): name of the stage
+  """
+  def decorator(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+      if self.profiler is None:
+        return method(self, *args, **kwargs)
+      with self.profiler.stage(name):
+        return method(self, *args, **kwargs)
+    return wrapper
+  return decorator
@@ -0,0 +1,152 @@
+from collections.abc import MutableMapping
+import sys
+
+# key orders shared by all records (`(key, ...)` -> `{key: position}`)
+__record__keys__ = {}
+
+# strings longer than this (e.g., descriptions) are rarely repeated
+__intern__max__length__ = 64
+
+def __shared__keys__(keys: tuple = ()):
+  """Shared keys
+  Get the shared position index of a key order. Records with the same keys
+  (in the same order) use the same dictionary.
+
+  @param keys (tuple): record keys
+  
+  @return dictionary of positions by key
+  """
+  index = __record__keys__.get(keys)
+  if index is None:
+    index = {sys.intern(key) if isinstance(key, str) else key: position for position, key in enumerate(keys)}
+    __record__keys__[keys] = index
+  return index
+
+def internValue(value = None):
+  """Intern value
+  Intern short strings, so that repeated values (e.g., dataTypes and
+  entity names) are stored once
+
+  @param value: any value
+  
+  @return value
+  """
+  if type(value) is str and len(value) <= __intern__max__length__:
+    return sys.intern(value)
+  return value
+
+
+class emxRecord(MutableMapping):
+  __slots__ = ('__keys__', '__values__', '__defaults__')
+
+  def __init__(self, values: dict = None, defaults: dict = None):
+    """EMX Record
+    A compact row of the EMX model (a package, entity, attribute, or tag).
+    Records behave like dictionaries, but store the values in a list. The
+    keys are shared with all records that have the same keys, and short
+    strings are interned. Defaults (e.g., `defaults` in a yaml file) are
+    not copied into the record: keys that are not set are looked up in the
+    shared `defaults`.
+
+    @param values (dict): values of the record
+    @param defaults (dict): values of keys that are not set in the record
+      (shared between records; do not modify)
+
+    @examples
+    ```
+    defaults = {'nillable': True}
+    attr = emxRecord({'name': 'id', 'idAttribute': True}, defaults)
+    attr['nillable']  # True
+    attr.toDict()     # {'name': 'id', 'idAttribute': True, 'nillable': True}
+    ```
+    """
+    values = values or {}
+    self.__keys__ = __shared__keys__(tuple(values))
+    self.__values__ = [internValue(value) for value in values.values()]
+    self.__defaults__ = defaults
+
+  def __getitem__(self, key):
+    position = self.__keys__.get(key)
+    if position is not None:
+      return self.__values__[position]
+    if self.__defaults__ is not None and key in self.__defaults__:
+      return self.__defaults__[key]
+    raise KeyError(key)
+
+  def __setitem__(self, key, value):
+    position = self.__keys__.get(key)
+    if position is None:
+      self.__keys__ = __shared__keys__(tuple(self.__keys__) + (key,))
+      self.__values__.append(internValue(value))
+    else:
+      self.__values__[position] = internValue(value)
+
+  def __delitem__(self, key):
+    if key not in self:
+      raise KeyError(key)
+    # removing a default: copy the remaining defaults into the record
+    values = {name: value for name, value in self.items() if name != key}
+    self.__keys__ = __shared__keys__(tuple(values))
+    self.__values__ = list(values.values())
+    self.__defaults__ = None
+
+  def __iter__(self):
+    yield from self.__keys__
+    if self.__defaults__:
+      for key in self.__defaults__:
+        if key not in self.__keys__:
+          yield key
+
+  def __len__(self):
+    if not self.__defaults__:
+      return len(self.__keys__)
+    return len(self.__keys__) + sum([1 for key in self.__defaults__ if key not in self.__keys__])
+
+  def __contains__(self, key):
+    return key in self.__keys__ or (self.__defaults__ is not None and key in self.__defaults__)
+
+  def __repr__(self):
+    return f'emxRecord({self.toDict()!r})'
+
+  def __getstate__(self):
+    return (tuple(self.__keys__), self.__values__, self.__defaults__)
+
+  def __setstate__(self, state):
+    keys, values, defaults = state
+    self.__keys__ = __shared__keys__(keys)
+    self.__values__ = values
+    self.__defaults__ = defaults
+
+  def get(self, key, default = None):
+    position = self.__keys__.get(key)
+    if position is not None:
+      return self.__values__[position]
+    if self.__defaults__ is not None:
+      return self.__defaults__.get(key, default)
+    return default
+
+  def copy(self):
+    return emxRecord(self.toDict())
+
+  def toDict(self):
+    """Record as dictionary
+    @return dictionary with the values of the record and the defaults
+    """
+    values = dict(zip(self.__keys__, self.__values__))
+    if self.__defaults__:
+      for key, value in self.__defaults__.items():
+        if key not in values:
+          values[key] = value
+    return values
+
+
+def toDicts(rows: list = None):
+  """Records to dictionaries
+  Convert the records in a list to dictionaries (e.g., for writers that
+  require dictionaries). Dictionaries are returned as is.
+
+  @param rows (list): a list of records and/or dictionaries
+  
+  @return list of dictionaries
+  """
+  return [row.toDict() if isinstance(row, emxRecord) else row for row in rows]
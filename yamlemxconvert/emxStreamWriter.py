@@ -0,0 +1,603 @@
+from concurrent.futures import ThreadPoolExecutor
+from yamlemxconvert.utils import openFile
+import csv
+import datetime
+import io
+import os
+import shutil
+import time
+import uuid
+import zipfile
+
+# output formats for datasets: file extension and compression (csv only)
+__output__formats__ = {
+  'csv': ('.csv', None),
+  'csv.gz': ('.csv.gz', 'gzip'),
+  'csv.zst': ('.csv.zst', 'zstd'),
+  'parquet': ('.parquet', None),
+  'arrow': ('.arrow', None)
+}
+
+def unionColumns(rows: list = None):
+  """Union Columns
+  Find all keys used in a list of dictionaries in one pass. Keys are returned
+  in the order they are first seen, which is the same column order pandas
+  uses when building a DataFrame from a list of dictionaries. Lazy datasets
+  (e.g., `yamlDataset`) provide their own `columns` method.
+
+  @param rows (list): a list of dictionaries
+
+  @return list of column names
+  """
+  if hasattr(rows, 'columns'):
+    return rows.columns()
+  columns = {}
+  for row in rows:
+    for key in row:
+      if key not in columns:
+        columns[key] = None
+  return list(columns)
+
+def writeCsvStream(stream, rows: list = None, quoting: int = csv.QUOTE_MINIMAL):
+  """Write CSV Stream
+  Write a list of dictionaries into an open text stream. Missing values
+  are written as empty strings.
+
+  @param stream: a text stream (opened with `newline = ''`)
+  @param rows (list): a list of dictionaries
+  @param quoting (int): a csv quoting constant (default: `csv.QUOTE_MINIMAL`)
+
+  @return number of rows written
+  """
+  writer = csv.DictWriter(
+    stream,
+    fieldnames = unionColumns(rows),
+    quoting = quoting,
+    lineterminator = os.linesep
+  )
+  writer.writeheader()
+  if isinstance(rows, list):
+    writer.writerows(rows)
+    return len(rows)
+  count = 0
+  for row in rows:
+    writer.writerow(row)
+    count += 1
+  return count
+
+def writeCsvRows(file: str = None, rows: list = None, quoting: int = csv.QUOTE_MINIMAL, compression: str = None):
+  """Write CSV Rows
+  Stream a list of dictionaries into a csv file. Missing values are written
+  as empty strings. External csv datasets (`fileDataset`) are copied as is.
+
+  @param file (str): path to the output file
+  @param rows (list): a list of dictionaries
+  @param quoting (int): a csv quoting constant (default: `csv.QUOTE_MINIMAL`)
+  @param compression (str): None (default), 'gzip', or 'zstd'
+  
+  @return number of rows written (None if the file was copied)
+  """
+  if quoting == csv.QUOTE_MINIMAL and compression is None and getattr(rows, 'format', None) == 'csv':
+    rows.copyCsv(file)
+    return None
+  with openFile(file, 'w', compression) as stream:
+    return writeCsvStream(stream, rows, quoting)
+
+def writeZip(file: str = None, files: dict = None):
+  """Write Zip
+  Write csv files into a zip archive. Each file is streamed directly into
+  its zip entry; external csv datasets (`fileDataset`) are copied as is.
+
+  @param file (str): path to the zip file
+  @param files (dict): tuples of rows and quoting constant by file name
+  """
+  with zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED) as archive:
+    for name, (rows, quoting) in files.items():
+      with archive.open(name, 'w', force_zip64 = True) as entry:
+        if quoting == csv.QUOTE_MINIMAL and getattr(rows, 'format', None) == 'csv':
+          with open(rows.file, 'rb') as source:
+            shutil.copyfileobj(source, entry, length = 1024 * 1024)
+          continue
+        stream = io.TextIOWrapper(entry, encoding = 'utf-8', newline = '')
+        writeCsvStream(stream, rows, quoting)
+        stream.flush()
+        stream.detach()
+
+def rowChunks(rows: list = None, chunksize: int = 10000):
+  """Row Chunks
+  Split a dataset into lists of rows. Lists are returned as is; lazy
+  datasets are read in chunks of (at most) `chunksize` rows.
+
+  @param rows (list): a list of dictionaries or a dataset
+  @param chunksize (int): number of rows per chunk
+
+  @return generator of lists of dictionaries
+  """
+  if isinstance(rows, list):
+    yield rows
+    return
+  if hasattr(rows, 'chunks'):
+    yield from rows.chunks()
+    return
+  chunk = []
+  for row in rows:
+    chunk.append(row)
+    if len(chunk) >= chunksize:
+      yield chunk
+      chunk = []
+  if chunk:
+    yield chunk
+
+def arrowColumn(values: list = None, type = None):
+  """Arrow Column
+  Convert the values of a column to an Arrow array. Columns with values
+  that have no common type (e.g., numbers and strings) are converted to
+  strings.
+
+  @param values (list): values of the column
+  @param type: a pyarrow data type (default: inferred from the values)
+
+  @return pyarrow.Array
+  """
+  import pyarrow as pa
+  if type is None or not pa.types.is_string(type):
+    try:
+      return pa.array(values, type = type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+      pass
+  return pa.array([None if value is None else str(value) for value in values], type = pa.string())
+
+def arrowSchema(columns: list = None, chunks = None):
+  """Arrow Schema
+  Find the types of the columns of a dataset. The types of all chunks are
+  merged: null columns take the type of later chunks, numbers are promoted
+  (e.g., int and float to double), and columns with types that cannot be
+  merged are written as strings.
+
+  @param columns (list): column names
+  @param chunks: lists of dictionaries (see `rowChunks`)
+
+  @return pyarrow.Schema
+  """
+  import pyarrow as pa
+  types = {column: pa.null() for column in columns}
+  for chunk in chunks:
+    for column in columns:
+      type = arrowColumn([row.get(column) for row in chunk]).type
+      if type == types[column] or pa.types.is_null(type):
+        continue
+      try:
+        types[column] = pa.unify_schemas(
+          [pa.schema([(column, types[column])]), pa.schema([(column, type)])],
+          promote_options = 'permissive'
+        ).field(column).type
+      except (pa.ArrowInvalid, pa.ArrowTypeError):
+        types[column] = pa.string()
+  return pa.schema([(column, types[column]) for column in columns])
+
+def writeArrowRows(file: str = None, rows: list = None, format: str = 'parquet'):
+  """Write Arrow Rows
+  Write a dataset as a parquet or Arrow IPC file (requires pyarrow). Column
+  types are inferred from the values (see `arrowSchema`). Lazy datasets are
+  read twice: once to find the types of all chunks and once to write them.
+
+  @param file (str): path to the output file
+  @param rows (list): a list of dictionaries or a dataset
+  @param format (str): 'parquet' (default) or 'arrow'
+
+  @return number of rows written
+  """
+  try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+  except ImportError:
+    raise ImportError('Error in writeArrowRows: pyarrow is required to write parquet and arrow files')
+  columns = unionColumns(rows)
+  if isinstance(rows, list):
+    arrays = [arrowColumn([row.get(column) for row in rows]) for column in columns]
+    schema = pa.schema([(column, array.type) for column, array in zip(columns, arrays)])
+    tables = [pa.Table.from_arrays(arrays, schema = schema)]
+  else:
+    schema = arrowSchema(columns, rowChunks(rows))
+    tables = (
+      pa.Table.from_arrays(
+        [arrowColumn([row.get(field.name) for row in chunk], field.type) for field in schema],
+        schema = schema
+      )
+      for chunk in rowChunks(rows)
+    )
+  count = 0
+  writer = pq.ParquetWriter(file, schema) if format == 'parquet' else pa.ipc.new_file(file, schema)
+  try:
+    for table in tables:
+      writer.write_table(table)
+      count += table.num_rows
+  finally:
+    writer.close()
+  return count
+
+def datasetFile(rows: list = None, format: str = 'csv', quoting: int = csv.QUOTE_MINIMAL):
+  """Dataset File
+  Create a function that writes a dataset in one of the dataset formats
+  (see `__output__formats__`)
+
+  @param rows (list): a list of dictionaries or a dataset
+  @param format (str): 'csv', 'csv.gz', 'csv.zst', 'parquet', or 'arrow'
+  @param quoting (int): a csv quoting constant (csv formats only)
+
+  @return function that takes a path and returns the number of rows
+  """
+  if format in ['parquet', 'arrow']:
+    return lambda file: writeArrowRows(file, rows, format)
+  return lambda file: writeCsvRows(file, rows, quoting, __output__formats__[format][1])
+
+def atomicWrite(file: str = None, write = None):
+  """Atomic Write
+  Write a file into a temporary file in the same directory and move it into
+  place once it is complete, so that an interrupted write never leaves a
+  partial file behind.
+  
+  @param file (str): path to the output file
+  @param write: a function that takes a path and writes the file contents
+  
+  @return the value returned by `write`
+  """
+  # the temporary file is created by `write`, so it gets the default permissions
+  tmp = f'{file}.{uuid.uuid4().hex}.tmp'
+  try:
+    result = write(tmp)
+    os.replace(tmp, file)
+  except BaseException:
+    if os.path.exists(tmp):
+      os.remove(tmp)
+    raise
+  return result
+
+def writeFiles(dir: str = None, files: dict = None, workers: int = None, manifest = None):
+  """Write Files
+  Write several files into a directory. Each file is written atomically
+  (see `atomicWrite`). If `workers` is greater than 1, files are written
+  concurrently in a thread pool, which helps when writing to slow (e.g.,
+  network) storage.
+  
+  @param dir (str): output directory
+  @param files (dict): functions that write the file (they take a path and
+    return the number of rows) by file name
+  @param workers (int): number of threads
+  @param manifest (emxManifest): if defined, files are only replaced if
+    their contents have changed
+  
+  @return list of dictionaries with the file name, number of rows, size in
+    bytes, elapsed time in seconds, and whether the file was changed
+  """
+  def writeFile(name):
+    start = time.perf_counter()
+    rows = []
+    write = lambda file: rows.append(files[name](file))
+    if manifest is None:
+      atomicWrite(os.path.join(dir, name), write)
+      changed = True
+    else:
+      changed = manifest.write(name, write)
+    return {
+      'file': name,
+      'rows': rows[0],
+      'bytes': os.path.getsize(os.path.join(dir, name)),
+      'elapsed': time.perf_counter() - start,
+      'changed': changed
+    }
+  
+  if workers and workers > 1 and len(files) > 1:
+    with ThreadPoolExecutor(max_workers = workers) as pool:
+      return list(pool.map(writeFile, files))
+  return [writeFile(name) for name in files]
+
+
+# Excel limits (the header is one of the rows)
+__xlsx__max__rows__ = 1048576
+__xlsx__max__sheetname__ = 31
+
+def knownRows(rows: list = None):
+  """Known Rows
+  Get the number of rows of a dataset if it is known without reading the
+  dataset: the length of a list, or the `rows` of a lazy dataset that
+  counted its rows when it was loaded (e.g., `yamlDataset`). The length of
+  a `fileDataset` is only known after the file was read.
+
+  @param rows (list): a list of dictionaries or a dataset
+
+  @return number of rows or None
+  """
+  if isinstance(rows, list):
+    return len(rows)
+  count = getattr(rows, 'rows', None)
+  return count if isinstance(count, int) else None
+
+def xlsxSheetNames(sheets: dict = None, splitSheets: bool = False, maxRows: int = __xlsx__max__rows__):
+  """XLSX Sheet Names
+  Check datasets against the limits of the xlsx format before anything is
+  written: sheet names may not be longer than 31 characters or be used
+  twice, and sheets may not have more than 1,048,576 rows (including the
+  header). If `splitSheets` is True, datasets with more rows are split
+  into several sheets (`<name>`, `<name>_2`, `<name>_3`, ...).
+
+  Datasets are not read to count their rows (see `knownRows`). The size of
+  datasets with an unknown number of rows is checked while they are
+  written (see `xlsxSheetWriter`).
+
+  @param sheets (dict): datasets by sheet name
+  @param splitSheets (bool): if True, split datasets that have too many rows
+  @param maxRows (int): maximum number of rows per sheet
+
+  @return dictionary of sheet names by dataset
+  """
+  names = {}
+  errors = []
+  used = set()
+  for name, rows in sheets.items():
+    length = knownRows(rows) or 0
+    count = max(1, -(-length // (maxRows - 1)))
+    if count > 1 and not splitSheets:
+      errors.append(f'sheet {name} has {length} rows (maximum: {maxRows - 1})')
+      count = 1
+    names[name] = [name] + [f'{name}_{index}' for index in range(2, count + 1)]
+    for sheetName in names[name]:
+      if len(sheetName) > __xlsx__max__sheetname__:
+        errors.append(f'sheet name {sheetName} is longer than {__xlsx__max__sheetname__} characters')
+      if sheetName.lower() in used:
+        errors.append(f'sheet name {sheetName} is used more than once')
+      used.add(sheetName.lower())
+  if errors:
+    raise ValueError('Error in xlsx: ' + '; '.join(errors) + '. Use the csv format or shorter names, or split large datasets.')
+  return names
+
+
+class xlsxSheetWriter:
+  def __init__(self, workbook, splitSheets: bool = False, maxRows: int = __xlsx__max__rows__):
+    """XLSX Sheet Writer
+    Write lists of dictionaries into the worksheets of an xlsxwriter
+    workbook. Cell values are written the same way `DataFrame.to_excel`
+    writes them: missing values are left blank and dates use the ISO format.
+    Rows are written in order, so the workbook can be opened in
+    `constant_memory` mode. To validate all sheets before the first one is
+    written, set `names` to the output of `xlsxSheetNames`. Datasets whose
+    number of rows was not known in advance are split (or rejected) when
+    the limit is reached.
+
+    @param workbook: a `xlsxwriter.Workbook`
+    @param splitSheets (bool): see `xlsxSheetNames`
+    @param maxRows (int): maximum number of rows per sheet
+    """
+    self.workbook = workbook
+    self.splitSheets = splitSheets
+    self.maxRows = maxRows
+    self.names = {}
+    self.headerFormat = workbook.add_format({'bold': False, 'border': False})
+    self.dateFormat = workbook.add_format({'num_format': 'YYYY-MM-DD'})
+    self.datetimeFormat = workbook.add_format({'num_format': 'YYYY-MM-DD HH:MM:SS'})
+
+  def __write__cell__(self, sheet, row: int, col: int, value):
+    """Write Cell
+    Lists (e.g., mref ids or tags) are joined with ','
+
+    @param sheet: worksheet object
+    @param row (int): row index
+    @param col (int): column index
+    @param value: cell value
+    """
+    if value is None:
+      return
+    if isinstance(value, (list, tuple)):
+      sheet.write_string(row, col, ','.join(str(item) for item in value))
+    elif isinstance(value, datetime.datetime):
+      sheet.write_datetime(row, col, value, self.datetimeFormat)
+    elif isinstance(value, datetime.date):
+      sheet.write_datetime(row, col, value, self.dateFormat)
+    else:
+      sheet.write(row, col, value)
+
+  def __add__sheet__(self, name: str = None, columns: list = None):
+    """Add a sheet and write the header
+    @param name (str): name of the sheet
+    @param columns (list): column names
+    """
+    sheet = self.workbook.add_worksheet(name)
+    sheet.write_row(0, 0, columns, self.headerFormat)
+    return sheet
+
+  def __sheet__name__(self, name: str = None, number: int = 1):
+    """Name of the next sheet of a dataset
+    @param name (str): name of the dataset
+    @param number (int): number of the sheet (1 is the first sheet)
+
+    @return sheet name
+    """
+    names = self.names[name]
+    if number <= len(names):
+      return names[number - 1]
+    if not self.splitSheets:
+      raise ValueError(
+        f'Error in xlsx: sheet {name} has more than {self.maxRows - 1} rows. '
+        'Use the csv format or split large datasets.'
+      )
+    sheetName = f'{name}_{number}'
+    used = {other.lower() for sheetNames in self.names.values() for other in sheetNames}
+    if len(sheetName) > __xlsx__max__sheetname__:
+      raise ValueError(f'Error in xlsx: sheet name {sheetName} is longer than {__xlsx__max__sheetname__} characters')
+    if sheetName.lower() in used:
+      raise ValueError(f'Error in xlsx: sheet name {sheetName} is used more than once')
+    names.append(sheetName)
+    return sheetName
+
+  def write(self, name: str = None, rows: list = None):
+    """Write sheet
+    @param name (str): name of the sheet
+    @param rows (list): a list of dictionaries
+    """
+    if name not in self.names:
+      self.names.update(xlsxSheetNames({name: rows}, self.splitSheets, self.maxRows))
+    columns = unionColumns(rows)
+    number = 1
+    sheet = self.__add__sheet__(self.__sheet__name__(name, number), columns)
+    index = 0
+    for row in rows:
+      index += 1
+      if index == self.maxRows:
+        number += 1
+        sheet = self.__add__sheet__(self.__sheet__name__(name, number), columns)
+        index = 1
+      for col, key in enumerate(columns):
+        self.__write__cell__(sheet, index, col, row.get(key))
+
+
+class emxStreamWriter:
+  def __init__(self, packages, entities, attributes, data, tags):
+    """EMX Stream Writer
+    Write an EMX model without building pandas DataFrames. Rows are streamed
+    directly into `csv.DictWriter` or xlsxwriter worksheets. The output uses
+    the same column order and quoting as `emxWriter`.
+
+    @param packages (list): EMX packages
+    @param entities (list): EMX entities
+    @param attributes (list): EMX attributes
+    @param data (dict): EMX datasets
+    @param tags (list) : EMX tags
+    """
+    self.packages = packages
+    self.entities = entities
+    self.attributes = attributes
+    self.data = data
+    self.tags = tags
+
+  def writeXlsx(self, path, includeData: bool = True, splitSheets: bool = False):
+    """Write XLSX
+    Write EMX model as XLSX file. The workbook is written in xlsxwriter's
+    `constant_memory` mode, and all sheets are checked against the limits
+    of the xlsx format before the file is created (see `xlsxSheetNames`).
+
+    @param path (string): path to write file
+    @param includeData: If True (default), any data objects defined in the
+      model will be written to file.
+    @param splitSheets (bool): if True, datasets with more rows than a
+      sheet can hold are split into several sheets
+    """
+    sheets = {
+      'packages': self.packages,
+      'entities': self.entities,
+      'attributes': self.attributes
+    }
+
+    # write tags if defined
+    if self.tags:
+      sheets['tags'] = self.tags
+
+    # write data to file if present and user has indicated so
+    if self.data and includeData:
+      sheets.update(self.data)
+
+    from xlsxwriter import Workbook
+    names = xlsxSheetNames(sheets, splitSheets)
+    wb = Workbook(path, {'constant_memory': True})
+    writer = xlsxSheetWriter(wb, splitSheets)
+    writer.names = names
+    for name in sheets:
+      writer.write(name, sheets[name])
+    wb.close()
+
+  def writeZip(self, path, includeData: bool = True):
+    """Write Zip
+    Write EMX model as a zip archive of csv files
+
+    @param path (str): path to the zip file
+    @param includeData (bool): if True (default), any data objects present
+      in the EMX will be written to file.
+    """
+    files = {
+      'packages.csv': (self.packages, csv.QUOTE_MINIMAL),
+      'entities.csv': (self.entities, csv.QUOTE_MINIMAL),
+      'attributes.csv': (self.attributes, csv.QUOTE_MINIMAL)
+    }
+
+    # write data to file if present and user has indicated so
+    if self.data and includeData:
+      for dataset in self.data:
+        files[dataset + '.csv'] = (self.data[dataset], csv.QUOTE_MINIMAL)
+
+    # write tags if defined
+    if self.tags:
+      files['tags.csv'] = (self.tags, csv.QUOTE_ALL)
+    writeZip(path, files)
+
+  def writeCsv(self, dir, includeData: bool = True, manifest = None, workers: int = None, dataFormat: str = 'csv'):
+    """Write CSV
+    Write EMX model as csv files
+
+    @param dir (str): directory to write files into
+    @param includeData (bool): if True (default), any data objects present
+      in the EMX will be written to file.
+    @param manifest (emxManifest): if defined, files are only replaced if
+      their contents have changed
+    @param workers (int): number of threads (see `writeFiles`)
+    @param dataFormat (str): format of the datasets (see `datasetFile`).
+      Packages, entities, attributes, and tags are always written as csv.
+
+    @return summary of the written files (see `writeFiles`)
+    """
+    files = {
+      'packages.csv': datasetFile(self.packages),
+      'entities.csv': datasetFile(self.entities),
+      'attributes.csv': datasetFile(self.attributes)
+    }
+
+    # write data to file if present and user has indicated so
+    if self.data and includeData:
+      for dataset in self.data:
+        files[dataset + __output__formats__[dataFormat][0]] = datasetFile(self.data[dataset], dataFormat)
+
+    # write tags if defined
+    if self.tags:
+      files['tags.csv'] = datasetFile(self.tags, quoting = csv.QUOTE_ALL)
+    return writeFiles(dir, files, workers, manifest)
+
+
+class emxStreamWriter2:
+  """CSV and XLSX Stream Writer for EMX2"""
+
+  def writeXlsx(self, model, path, splitSheets: bool = False):
+    """Write EMX as XLSX
+    Attributes:
+        model (obj) : converted EMX model
+        path (str) : output file path
+        splitSheets (bool) : see `emxStreamWriter.writeXlsx`
+    """
+    from xlsxwriter import Workbook
+    names = xlsxSheetNames(model, splitSheets)
+    wb = Workbook(path, {'constant_memory': True})
+    writer = xlsxSheetWriter(wb, splitSheets)
+    writer.names = names
+    for entity in model:
+      writer.write(entity, model[entity])
+    wb.close()
+
+  def writeZip(self, model, path):
+    """Write EMX2 as a zip archive of csv files
+    @param model converted EMX model
+    @param path path to the zip file
+    """
+    writeZip(path, {entity + '.csv': (model[entity], csv.QUOTE_ALL) for entity in model})
+
+  def writeCsv(self, model: list = None, dir: str = None, workers: int = None, dataFormat: str = 'csv'):
+    """Write EMX2 to CSV
+    @param model list of dictionaries
+    @param dir output directory
+    @param workers number of threads (see `writeFiles`)
+    @param dataFormat format of the tables (see `datasetFile`). The
+      `molgenis` table is always written as csv.
+
+    @return summary of the written files (see `writeFiles`)
+    """
+    files = {}
+    for entity in model:
+      format = 'csv' if entity == 'molgenis' else dataFormat
+      files[entity + __output__formats__[format][0]] = datasetFile(model[entity], format, csv.QUOTE_ALL)
+    return writeFiles(dir, files, workers)
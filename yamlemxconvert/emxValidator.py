@@ -0,0 +1,424 @@
+from yamlemxconvert.mappings import __emx__keys__datatype__set__
+import datetime
+import math
+import re
+
+# dataTypes that require a `refEntity`
+__emx__ref__datatypes__ = frozenset([
+  'categorical',
+  'categorical_mref',
+  'mref',
+  'one_to_many',
+  'xref'
+])
+
+# dataTypes that hold one or more ids of another entity
+__emx__xref__datatypes__ = frozenset(['categorical', 'xref'])
+__emx__mref__datatypes__ = frozenset(['categorical_mref', 'mref'])
+
+__int__pattern__ = re.compile(r'^\s*[+-]?\d+\s*$')
+__email__pattern__ = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+__mref__separator__ = re.compile(r'\s*,\s*')
+
+def __integer__check__(bits: int = 32):
+  """Integer check
+  @param bits (int): size of the integer (int: 32, long: 64)
+  
+  @return function that returns True if a value is a valid integer
+  """
+  limit = 2 ** (bits - 1)
+  def check(value):
+    if isinstance(value, bool):
+      return False
+    if isinstance(value, float):
+      if not value.is_integer():
+        return False
+    elif isinstance(value, str):
+      if not __int__pattern__.match(value):
+        return False
+    elif not isinstance(value, int):
+      return False
+    return -limit <= int(value) < limit
+  return check
+
+def __decimal__check__(value):
+  if isinstance(value, bool):
+    return False
+  try:
+    return math.isfinite(float(value))
+  except (TypeError, ValueError):
+    return False
+
+def __date__check__(value):
+  if isinstance(value, datetime.date):
+    return True
+  try:
+    datetime.date.fromisoformat(str(value))
+    return True
+  except ValueError:
+    return False
+
+def __datetime__check__(value):
+  if isinstance(value, datetime.date):
+    return True
+  try:
+    datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return True
+  except ValueError:
+    return False
+
+def __bool__check__(value):
+  return isinstance(value, bool) or (isinstance(value, str) and value.lower() in ('true', 'false'))
+
+def __email__check__(value):
+  return isinstance(value, str) and __email__pattern__.match(value) is not None
+
+# value checks by dataType
+__emx__value__checks__ = {
+  'bool': __bool__check__,
+  'date': __date__check__,
+  'datetime': __datetime__check__,
+  'decimal': __decimal__check__,
+  'email': __email__check__,
+  'int': __integer__check__(32),
+  'long': __integer__check__(64)
+}
+
+def splitValues(value = None):
+  """Split values
+  Split the value of an mref attribute into a list of ids
+  
+  @param value: a list or a comma separated string
+  
+  @return list of strings
+  """
+  if isinstance(value, (list, tuple)):
+    return [str(item) for item in value]
+  return [item for item in __mref__separator__.split(str(value).strip()) if item]
+
+def isTrue(value = None):
+  """Is True
+  Determine if an EMX boolean (e.g., `idAttribute`) is set. Values can be
+  booleans or strings ('TRUE', 'true', 'AUTO').
+  
+  @param value: value of the attribute
+  
+  @return bool
+  """
+  if isinstance(value, str):
+    return value.lower() in ('true', 'auto')
+  return bool(value)
+
+
+class validationReport:
+  def __init__(self):
+    """Validation Report
+    Collects the errors and warnings found by `emxValidator`. Each issue is
+    a dictionary with the name of the check, a message, and where the issue
+    was found (package, entity, attribute, value, and for datasets, row).
+    """
+    self.errors = []
+    self.warnings = []
+
+  def add(self, level: str = 'error', check: str = None, message: str = None, **location):
+    """Add issue
+    @param level (str): 'error' or 'warning'
+    @param check (str): name of the check (e.g., 'refEntity')
+    @param message (str): description of the issue
+    @param **location: package, entity, attribute, value, and for
+      datasets, row (the first row of a dataset is row 1)
+    """
+    issue = {'check': check, 'message': message}
+    issue.update(location)
+    (self.errors if level == 'error' else self.warnings).append(issue)
+
+  @property
+  def valid(self):
+    return not self.errors
+
+  def __len__(self):
+    return len(self.errors) + len(self.warnings)
+
+  def __str__(self):
+    lines = [f'{len(self.errors)} error(s), {len(self.warnings)} warning(s)']
+    for level, issues in (('Error', self.errors), ('Warning', self.warnings)):
+      for issue in issues:
+        lines.append(f"{level} ({issue['check']}): {issue['message']}")
+    return '\n'.join(lines)
+
+  def toDict(self):
+    """Report as dictionary
+    @return dictionary with `valid`, `errors`, and `warnings`
+    """
+    return {'valid': self.valid, 'errors': self.errors, 'warnings': self.warnings}
+
+
+class emxValidator:
+  def __init__(
+    self,
+    packages: list = None,
+    entities: list = None,
+    attributes: list = None,
+    known: list = None,
+    data: dict = None
+  ):
+    """EMX Validator
+    Check the references in an EMX model before it is imported. Packages,
+    entities, and attributes are indexed once, so each reference is checked
+    with a single lookup. All issues are collected in a `validationReport`.
+
+    @param packages (list): EMX packages
+    @param entities (list): EMX entities
+    @param attributes (list): EMX attributes
+    @param known (list): names of packages and entities that are not part
+      of the model, but exist in the target database (e.g., 'sys_md_Package')
+    @param data (dict): datasets by entity (see `validate(includeData)`)
+    """
+    self.packages = packages or []
+    self.entities = entities or []
+    self.attributes = attributes or []
+    self.known = set(known or [])
+    self.data = data or {}
+
+  def __index__(self, report):
+    """Index model
+    Build indexes of packages, entities (by `<package>_<name>`), and
+    attributes (by entity and name)
+
+    @param report (validationReport): duplicates are reported here
+    """
+    self.packageIndex = {}
+    for pkg in self.packages:
+      name = pkg.get('name')
+      if name in self.packageIndex:
+        report.add('error', 'package', f'package {name} is defined more than once', package = name)
+      self.packageIndex[name] = pkg
+
+    self.entityIndex = {}
+    for entity in self.entities:
+      name = f"{entity.get('package')}_{entity.get('name')}"
+      if name in self.entityIndex:
+        report.add('error', 'entity', f'entity {name} is defined more than once', entity = name)
+      self.entityIndex[name] = entity
+
+    self.attributeIndex = {}
+    for attr in self.attributes:
+      attributes = self.attributeIndex.setdefault(attr.get('entity'), {})
+      name = attr.get('name')
+      if name in attributes:
+        report.add('error', 'attribute', f"attribute {name} is defined more than once in entity {attr.get('entity')}", entity = attr.get('entity'), attribute = name)
+      attributes[name] = attr
+
+  def __inherited__(self, entity: str = None, inherited: dict = None):
+    """Inherited attributes
+    Find all attributes of an entity, including attributes of the entities
+    it extends
+
+    @param entity (str): `<package>_<name>`
+    @param inherited (dict): results by entity (shared between calls)
+
+    @return dictionary of attributes by name
+    """
+    if entity in inherited:
+      return inherited[entity]
+    inherited[entity] = {}
+    attributes = {}
+    parent = self.entityIndex.get(entity, {}).get('extends')
+    if parent in self.entityIndex:
+      attributes.update(self.__inherited__(parent, inherited))
+    attributes.update(self.attributeIndex.get(entity, {}))
+    inherited[entity] = attributes
+    return attributes
+
+  def validate(self, includeData: bool = False):
+    """Validate model
+    Check that
+      - package `parent`, entity `package`, entity `extends`, and attribute
+        `refEntity` refer to packages and entities in the model (or `known`)
+      - attributes belong to an entity in the model and have a valid
+        `dataType`; reference types have a `refEntity`
+      - `partOfAttribute` refers to a compound attribute of the same entity
+      - entities (that are not abstract) have one `idAttribute` and at most
+        one `labelAttribute`
+
+    @param includeData (bool): if True, validate the datasets as well (see
+      `validateData`)
+
+    @return validationReport
+    """
+    report = validationReport()
+    self.__index__(report)
+    packages = self.packageIndex.keys() | self.known
+    entities = self.entityIndex.keys() | self.known
+
+    for pkg in self.packages:
+      parent = pkg.get('parent')
+      if parent and parent not in packages:
+        report.add('error', 'parent', f"parent {parent} of package {pkg.get('name')} does not exist", package = pkg.get('name'), value = parent)
+
+    for name, entity in self.entityIndex.items():
+      if entity.get('package') not in packages:
+        report.add('error', 'package', f"package {entity.get('package')} of entity {name} does not exist", entity = name, value = entity.get('package'))
+      extends = entity.get('extends')
+      if extends and extends not in entities:
+        report.add('error', 'extends', f'entity {name} extends {extends}, which does not exist', entity = name, value = extends)
+
+    for attr in self.attributes:
+      entity = attr.get('entity')
+      name = attr.get('name')
+      location = {'entity': entity, 'attribute': name}
+      if entity not in self.entityIndex:
+        report.add('error', 'entity', f'entity {entity} of attribute {name} does not exist', value = entity, **location)
+      dataType = attr.get('dataType')
+      if dataType and dataType not in __emx__keys__datatype__set__:
+        report.add('error', 'dataType', f'dataType {dataType} of attribute {entity}.{name} is invalid', value = dataType, **location)
+      refEntity = attr.get('refEntity')
+      if dataType in __emx__ref__datatypes__ and not refEntity:
+        report.add('error', 'refEntity', f'attribute {entity}.{name} ({dataType}) requires a refEntity', **location)
+      if refEntity and refEntity not in entities:
+        report.add('error', 'refEntity', f'refEntity {refEntity} of attribute {entity}.{name} does not exist', value = refEntity, **location)
+      if refEntity and dataType not in __emx__ref__datatypes__:
+        report.add('warning', 'refEntity', f'attribute {entity}.{name} has a refEntity, but dataType {dataType} is not a reference type', value = refEntity, **location)
+
+    inherited = {}
+    for name, entity in self.entityIndex.items():
+      attributes = self.__inherited__(name, inherited)
+      for attr in self.attributeIndex.get(name, {}).values():
+        partOf = attr.get('partOfAttribute')
+        if partOf and attributes.get(partOf, {}).get('dataType') != 'compound':
+          report.add('error', 'partOfAttribute', f"partOfAttribute {partOf} of attribute {name}.{attr.get('name')} is not a compound attribute of {name}", entity = name, attribute = attr.get('name'), value = partOf)
+      if isTrue(entity.get('abstract')) or not attributes:
+        continue
+      ids = [attr for attr in attributes.values() if isTrue(attr.get('idAttribute'))]
+      if not ids:
+        report.add('error', 'idAttribute', f'entity {name} does not have an idAttribute', entity = name)
+      elif len(ids) > 1:
+        report.add('error', 'idAttribute', f"entity {name} has more than one idAttribute ({', '.join([attr.get('name') for attr in ids])})", entity = name)
+      elif isTrue(ids[0].get('nillable', False)):
+        report.add('warning', 'idAttribute', f"idAttribute {name}.{ids[0].get('name')} should not be nillable", entity = name, attribute = ids[0].get('name'))
+      labels = [attr.get('name') for attr in attributes.values() if isTrue(attr.get('labelAttribute'))]
+      if len(labels) > 1:
+        report.add('error', 'labelAttribute', f"entity {name} has more than one labelAttribute ({', '.join(labels)})", entity = name)
+
+    if includeData:
+      self.validateData(report, inherited)
+    return report
+
+  def __column__check__(self, attr: dict = None, ids: dict = None):
+    """Column check
+    Build the check of a column from the attribute metadata
+
+    @param attr (dict): an attribute
+    @param ids (dict): sets of ids by entity
+
+    @return function that returns an error message or None
+    """
+    dataType = attr.get('dataType', 'string')
+    if dataType in __emx__value__checks__:
+      isValid = __emx__value__checks__[dataType]
+      return lambda value: None if isValid(value) else f'"{value}" is not a valid {dataType}'
+    if dataType == 'enum' and attr.get('enumOptions'):
+      options = set(splitValues(attr.get('enumOptions')))
+      return lambda value: None if str(value) in options else f'"{value}" is not one of the enumOptions'
+    refEntity = attr.get('refEntity')
+    refIds = ids.get(refEntity)
+    if refIds is None:
+      return None
+    if dataType in __emx__xref__datatypes__:
+      return lambda value: None if str(value) in refIds else f'"{value}" is not an id of {refEntity}'
+    if dataType in __emx__mref__datatypes__:
+      def check(value):
+        missing = [item for item in splitValues(value) if item not in refIds]
+        return f"{', '.join(missing)} not an id of {refEntity}" if missing else None
+      return check
+    return None
+
+  def validateData(self, report: validationReport = None, inherited: dict = None):
+    """Validate datasets
+    Check the values of each dataset, one column at a time, against the
+    attributes of the entity:
+      - values of int, long, decimal, bool, date, datetime, email, and enum
+        attributes must be valid for the dataType
+      - values of attributes that are not nillable must not be empty
+      - ids must be unique
+      - xref and mref values must be ids of the refEntity. Ids are read
+        from the datasets of the model (in any file) and kept in a set per
+        entity. References to entities without a dataset are not checked.
+
+    Datasets are read in chunks, so files (`dataFile`) and streamed datasets
+    are validated without loading them into memory. They are read twice:
+    once to collect the ids, and once to check the values.
+
+    @param report (validationReport): report to add issues to (optional)
+    @param inherited (dict): attributes by entity (optional)
+
+    @return validationReport
+    """
+    # imported here to keep `import yamlemxconvert.convert` fast
+    from yamlemxconvert.emxStreamWriter import rowChunks
+
+    report = report if report is not None else validationReport()
+    if not hasattr(self, 'entityIndex'):
+      self.__index__(validationReport())
+    inherited = inherited if inherited is not None else {}
+    attributesByEntity = {name: self.__inherited__(name, inherited) for name in self.data}
+
+    # first pass: collect ids
+    ids = {}
+    for entity, rows in self.data.items():
+      idAttribute = next(
+        (name for name, attr in attributesByEntity[entity].items() if isTrue(attr.get('idAttribute'))),
+        None
+      )
+      if idAttribute is None:
+        continue
+      values = set()
+      offset = 0
+      for chunk in rowChunks(rows):
+        column = [row.get(idAttribute) for row in chunk]
+        for row, value in enumerate(column, offset + 1):
+          if value is None or value == '':
+            continue
+          value = str(value)
+          if value in values:
+            report.add('error', 'idAttribute', f'{entity} row {row}: duplicate id "{value}" in column {idAttribute}', entity = entity, attribute = idAttribute, row = row, value = value)
+          values.add(value)
+        offset += len(chunk)
+      ids[entity] = values
+
+    # second pass: check values column by column
+    for entity, rows in self.data.items():
+      attributes = attributesByEntity[entity]
+      checks = {}
+      for name, attr in attributes.items():
+        required = (
+          not isTrue(attr.get('nillable', True))
+          and str(attr.get('idAttribute')).lower() != 'auto'
+          and not attr.get('expression')
+          and not isTrue(attr.get('auto'))
+        )
+        check = self.__column__check__(attr, ids)
+        if check or required:
+          checks[name] = (check, required)
+
+      unknown = set()
+      offset = 0
+      for chunk in rowChunks(rows):
+        for row in chunk:
+          for key in row:
+            if key not in attributes and key not in unknown:
+              unknown.add(key)
+              report.add('warning', 'column', f'{entity}: column {key} is not an attribute of {entity}', entity = entity, attribute = key)
+        for name, (check, required) in checks.items():
+          column = [row.get(name) for row in chunk]
+          for row, value in enumerate(column, offset + 1):
+            if value is None or value == '':
+              if required:
+                report.add('error', 'nillable', f'{entity} row {row}: column {name} is required', entity = entity, attribute = name, row = row)
+              continue
+            if check:
+              message = check(value)
+              if message:
+                report.add('error', attributes[name].get('dataType'), f'{entity} row {row}, column {name}: {message}', entity = entity, attribute = name, row = row, value = value)
+        offset += len(chunk)
+    return report
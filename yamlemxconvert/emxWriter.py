@@ -1,6 +1,84 @@
+from yamlemxconvert.emxStreamWriter import (
+  xlsxSheetNames,
+  writeFiles,
+  writeArrowRows,
+  __output__formats__
+)
+from yamlemxconvert.utils import openFile
 import pandas as pd
 import csv
 
+def datasetFrames(rows: list = None):
+  """Dataset Frames
+  Convert a dataset into DataFrames. Datasets that can be read in chunks
+  (e.g., `fileDataset`) are converted one chunk at a time; all other
+  datasets are converted into a single DataFrame.
+  
+  @param rows (list): a list of dictionaries or a chunked dataset
+  
+  @return generator of DataFrames
+  """
+  if hasattr(rows, 'chunks'):
+    columns = rows.columns()
+    empty = True
+    for chunk in rows.chunks():
+      empty = False
+      yield pd.DataFrame(chunk, columns = columns)
+    if empty:
+      yield pd.DataFrame([], columns = columns)
+  else:
+    yield pd.DataFrame(rows, index = range(0, len(rows)))
+
+def writeCsvFrames(file: str = None, frames: list = None, compression: str = None, **kwargs):
+  """Write CSV Frames
+  Write one or more DataFrames into the same csv file
+  
+  @param file (str): path to the output file
+  @param frames (list): DataFrames with the same columns
+  @param compression (str): None (default), 'gzip', or 'zstd'
+  @param **kwargs: arguments passed to `DataFrame.to_csv`
+  
+  @return number of rows written
+  """
+  rows = 0
+  with openFile(file, 'w', compression) as stream:
+    for index, df in enumerate(frames):
+      df.to_csv(stream, index = False, header = index == 0, **kwargs)
+      rows += len(df)
+  return rows
+
+def datasetFile(rows: list = None, format: str = 'csv', **kwargs):
+  """Dataset File
+  Create a function that writes a dataset. Parquet and arrow files are
+  written with `writeArrowRows`.
+  
+  @param rows (list): a list of dictionaries or a dataset
+  @param format (str): 'csv', 'csv.gz', 'csv.zst', 'parquet', or 'arrow'
+  @param **kwargs: arguments passed to `DataFrame.to_csv`
+  
+  @return function that takes a path and returns the number of rows
+  """
+  if format in ['parquet', 'arrow']:
+    return lambda file: writeArrowRows(file, rows, format)
+  compression = __output__formats__[format][1]
+  return lambda file: writeCsvFrames(file, datasetFrames(rows), compression, **kwargs)
+
+def writeXlsxFrames(wb, name: str = None, frames: list = None):
+  """Write XLSX Frames
+  Write one or more DataFrames into the same sheet (below the header row)
+  
+  @param wb: ExcelWriter object
+  @param name (str): name of the sheet
+  @param frames (list): DataFrames with the same columns
+  
+  @return column names
+  """
+  startrow = 1
+  for df in frames:
+    df.to_excel(wb, sheet_name = name, startrow = startrow, header = False, index = False)
+    startrow += len(df)
+  return df.columns.values
+
 class emxWriter:
   def __init__(self,packages, entities, attributes, data, tags):
     """EMX Writer
@@ -30,17 +108,15 @@ class emxWriter:
     self.data = data
     self.tags = tags
 
-  def ___xlsx__headers__(self, wb, columns, name):
+  def ___xlsx__headers__(self, wb, columns, name, format):
     """Write xlsx headers
     @param wb: workbook object
     @param columns: a list of column names
     @param name: name of the sheet
+    @param format: header format (shared by all sheets)
 
     """
-    sheet = wb.sheets[name]
-    format = wb.book.add_format({'bold': False, 'border': False})
-    for col, value in enumerate(columns):
-      sheet.write(0, col, value, format)
+    wb.sheets[name].write_row(0, 0, columns, format)
     
   def writeXlsx(self, path, includeData: bool = True):
     """Write XLSX
@@ -51,7 +127,15 @@ class emxWriter:
       model will be written to file.
 
     """
+    sheets = {'packages': self.packages, 'entities': self.entities, 'attributes': self.attributes}
+    if self.tags:
+      sheets['tags'] = self.tags
+    if self.data and includeData:
+      sheets.update(self.data)
+    xlsxSheetNames(sheets)
+    
     wb = pd.ExcelWriter(path, engine = 'xlsxwriter')
+    format = wb.book.add_format({'bold': False, 'border': False})
 
     pkgs = pd.DataFrame(self.packages, index=range(0, len(self.packages)))
     enty = pd.DataFrame(self.entities, index = range(0, len(self.entities)))
@@ -61,67 +145,66 @@ class emxWriter:
     enty.to_excel(wb, sheet_name = 'entities', startrow = 1, header = False, index = False)
     attr.to_excel(wb, sheet_name = 'attributes', startrow = 1, header = False, index = False)
     
-    self.___xlsx__headers__(wb, pkgs.columns.values, 'packages')
-    self.___xlsx__headers__(wb, enty.columns.values, 'entities')
-    self.___xlsx__headers__(wb, attr.columns.values, 'attributes')
+    self.___xlsx__headers__(wb, pkgs.columns.values, 'packages', format)
+    self.___xlsx__headers__(wb, enty.columns.values, 'entities', format)
+    self.___xlsx__headers__(wb, attr.columns.values, 'attributes', format)
     
     # write tags if defined
     if self.tags:
       tags = pd.DataFrame(self.tags, index = range(0, len(self.tags)))
       tags.to_excel(wb, sheet_name = 'tags', startrow = 1, header = False, index = False)
-      self.___xlsx__headers__(wb, tags.columns.values, 'tags')
+      self.___xlsx__headers__(wb, tags.columns.values, 'tags', format)
     
     # write data to file if present and user has indicated so
     if self.data and includeData:
       for dataset in self.data:
-        i = range(0, len(self.data[dataset]))
-        df = pd.DataFrame(self.data[dataset], index = i)
-        df.to_excel(wb, sheet_name = dataset, startrow = 1, header = False, index = False)
-        self.___xlsx__headers__(wb, df.columns.values, dataset)
-    wb.save()
+        columns = writeXlsxFrames(wb, dataset, datasetFrames(self.data[dataset]))
+        self.___xlsx__headers__(wb, columns, dataset, format)
+    wb.close()
   
-  def writeCsv(self, dir, includeData: bool = True):
+  def writeCsv(self, dir, includeData: bool = True, manifest = None, workers: int = None, dataFormat: str = 'csv'):
     """Write CSV
     Write EMX model as csv files
 
     @param dir (str): directory to write files into
     @param includeData (bool): if True (default), any data objects present
       in the EMX will be written to file. 
-    """
-    pkgs = pd.DataFrame(self.packages, index=[0])
-    enty = pd.DataFrame(self.entities, index = range(0, len(self.entities)))
-    attr = pd.DataFrame(self.attributes, index = range(0, len(self.attributes)))
+    @param manifest (emxManifest): if defined, files are only replaced if
+      their contents have changed
+    @param workers (int): number of threads (see `writeFiles`)
+    @param dataFormat (str): format of the datasets (see `datasetFile`).
+      Packages, entities, attributes, and tags are always written as csv.
 
-    pkgs.to_csv(dir + '/packages.csv', index = False)
-    enty.to_csv(dir + '/entities.csv', index = False)
-    attr.to_csv(dir + '/attributes.csv', index = False)
+    @return summary of the written files (see `writeFiles`)
+    """
+    files = {
+      'packages.csv': datasetFile(self.packages),
+      'entities.csv': datasetFile(self.entities),
+      'attributes.csv': datasetFile(self.attributes)
+    }
     
     # write data to file if present and user has indicated so
     if self.data and includeData:
       for dataset in self.data:
-        i = range(0, len(self.data[dataset]))
-        df = pd.DataFrame(self.data[dataset], index = i)
-        df.to_csv(dir + '/' + dataset + '.csv', index = False)
+        files[dataset + __output__formats__[dataFormat][0]] = datasetFile(self.data[dataset], dataFormat)
 
     # write tags if defined
     if self.tags:
-      tags = pd.DataFrame(self.tags, index = range(0, len(self.tags)))
-      tags.to_csv(dir + '/tags.csv', index = False, quoting=csv.QUOTE_ALL)
+      files['tags.csv'] = datasetFile(self.tags, quoting = csv.QUOTE_ALL)
+    return writeFiles(dir, files, workers, manifest)
 
 
 class emxWriter2:
   """CSV and XLSX Writer for EMX2"""
   
-  def ___xlsx__headers__(self, wb, columns, name):
+  def ___xlsx__headers__(self, wb, columns, name, format):
     """Write xlsx headers
     @param wb workbook object
     @param columns a list of column names
     @param name name of the sheet
+    @param format header format (shared by all sheets)
     """
-    sheet = wb.sheets[name]
-    format = wb.book.add_format({'bold': False, 'border': False})
-    for col, value in enumerate(columns):
-      sheet.write(0, col, value, format)
+    wb.sheets[name].write_row(0, 0, columns, format)
               
   def writeXlsx(self, model, path):
     """Write EMX as XLSX
@@ -129,18 +212,26 @@ class emxWriter2:
         model (obj) : converted EMX model
         path (str) : output file path
     """
+    xlsxSheetNames(model)
     wb = pd.ExcelWriter(path = path, engine = 'xlsxwriter')
+    format = wb.book.add_format({'bold': False, 'border': False})
     for entity in model:
-      df = pd.DataFrame(model[entity], index=range(0, len(model[entity])))
-      df.to_excel(wb, sheet_name = entity, startrow = 1, header = False, index = False)
-      self.___xlsx__headers__(wb, df.columns.values, entity)
-    wb.save()
+      columns = writeXlsxFrames(wb, entity, datasetFrames(model[entity]))
+      self.___xlsx__headers__(wb, columns, entity, format)
+    wb.close()
       
-  def writeCsv(self, model: list = None, dir: str = None):
+  def writeCsv(self, model: list = None, dir: str = None, workers: int = None, dataFormat: str = 'csv'):
     """Write EMX2 to CSV
     @param model list of dictionaries
     @param dir output directory
+    @param workers number of threads (see `writeFiles`)
+    @param dataFormat format of the tables (see `datasetFile`). The
+      `molgenis` table is always written as csv.
+
+    @return summary of the written files (see `writeFiles`)
     """
+    files = {}
     for entity in model:
-      df = pd.DataFrame(model[entity], index = range(0,len(model[entity])))
-      df.to_csv(dir + '/' + entity + '.csv', index = False, quoting=csv.QUOTE_ALL)
\ No newline at end of file
+      format = 'csv' if entity == 'molgenis' else dataFormat
+      files[entity + __output__formats__[format][0]] = datasetFile(model[entity], format, quoting=csv.QUOTE_ALL)
+    return writeFiles(dir, files, workers)
\ No newline at end of file
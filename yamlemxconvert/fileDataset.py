@@ -0,0 +1,171 @@
+from yamlemxconvert.utils import openFile
+import csv
+import json
+import shutil
+
+# file extensions of supported formats
+__dataset__formats__ = {
+  '.csv': 'csv',
+  '.csv.gz': 'csv.gz',
+  '.csv.zst': 'csv.zst',
+  '.tsv': 'tsv',
+  '.parquet': 'parquet',
+  '.arrow': 'arrow',
+  '.jsonl': 'jsonl',
+  '.ndjson': 'jsonl'
+}
+
+# compression of delimited formats
+__dataset__compression__ = {'csv.gz': 'gzip', 'csv.zst': 'zstd'}
+
+class fileDataset:
+  def __init__(self, file: str = None, format: str = None, chunksize: int = 10000):
+    """File Dataset
+    A lazy reference to a dataset stored in an external file. The file is
+    not read until the dataset is written, and rows are read in chunks so
+    that datasets larger than the available memory can be converted.
+
+    Supported formats are csv, tsv, jsonl, gzip or zstd compressed csv
+    (csv.gz, csv.zst; zstd requires zstandard), and parquet and Arrow IPC
+    (arrow) files (both require pyarrow).
+
+    @param file (str): path to the data file
+    @param format (str): format of the file. If not defined, the format is
+      determined by the file extension.
+    @param chunksize (int): number of rows per chunk (default: 10000)
+
+    @example
+    In the yaml file, use `dataFile` to reference the file.
+
+    ```
+    entities:
+      - name: observations
+        dataFile: data/observations.csv
+    ```
+    """
+    self.file = file
+    self.format = format or next(
+      (value for key, value in __dataset__formats__.items() if file.lower().endswith(key)),
+      None
+    )
+    if self.format not in __dataset__formats__.values():
+      raise ValueError(f'Error in fileDataset: unsupported format for file {file}')
+    self.chunksize = chunksize
+    self._columns = None
+    self._rows = None
+
+  def __repr__(self):
+    return f'fileDataset(file={self.file!r}, format={self.format!r})'
+
+  def __len__(self):
+    if self._rows is None:
+      self._rows = sum([len(chunk) for chunk in self.chunks()])
+    return self._rows
+
+  def __iter__(self):
+    for chunk in self.chunks():
+      yield from chunk
+
+  def __parquet__(self):
+    """Open parquet file
+    @return pyarrow.parquet.ParquetFile
+    """
+    try:
+      import pyarrow.parquet as pq
+    except ImportError:
+      raise ImportError('Error in fileDataset: pyarrow is required to read parquet files')
+    return pq.ParquetFile(self.file)
+
+  def __arrow__(self):
+    """Open Arrow IPC file
+    @return pyarrow.ipc.RecordBatchFileReader
+    """
+    try:
+      import pyarrow as pa
+    except ImportError:
+      raise ImportError('Error in fileDataset: pyarrow is required to read arrow files')
+    return pa.ipc.open_file(self.file)
+
+  def __read__delimited__(self, delimiter: str = ','):
+    """Read csv or tsv rows
+    @param delimiter (str): field delimiter
+    """
+    with openFile(self.file, 'r', __dataset__compression__.get(self.format)) as stream:
+      yield from csv.DictReader(stream, delimiter = delimiter)
+
+  def __read__jsonl__(self):
+    """Read JSON lines"""
+    with open(self.file, 'r', encoding = 'utf-8') as stream:
+      for line in stream:
+        if line.strip():
+          yield json.loads(line)
+
+  def chunks(self):
+    """Read chunks
+    Read the file in chunks of (at most) `chunksize` rows
+
+    @return generator of lists of dictionaries
+    """
+    if self.format == 'parquet':
+      for batch in self.__parquet__().iter_batches(batch_size = self.chunksize):
+        yield batch.to_pylist()
+      return
+
+    if self.format == 'arrow':
+      reader = self.__arrow__()
+      for index in range(reader.num_record_batches):
+        batch = reader.get_batch(index)
+        for start in range(0, batch.num_rows, self.chunksize):
+          yield batch.slice(start, self.chunksize).to_pylist()
+      return
+
+    if self.format == 'jsonl':
+      rows = self.__read__jsonl__()
+    else:
+      rows = self.__read__delimited__('\t' if self.format == 'tsv' else ',')
+
+    chunk = []
+    for row in rows:
+      chunk.append(row)
+      if len(chunk) >= self.chunksize:
+        yield chunk
+        chunk = []
+    if chunk:
+      yield chunk
+
+  def columns(self):
+    """Columns
+    Get the column names of the dataset. For csv, tsv, parquet, and arrow
+    files, the names are read from the header; jsonl files require one pass
+    over the rows.
+
+    @return list of column names
+    """
+    if self._columns is None:
+      if self.format in ['csv', 'csv.gz', 'csv.zst', 'tsv']:
+        with openFile(self.file, 'r', __dataset__compression__.get(self.format)) as stream:
+          reader = csv.reader(stream, delimiter = '\t' if self.format == 'tsv' else ',')
+          self._columns = next(reader, [])
+      elif self.format == 'parquet':
+        self._columns = self.__parquet__().schema_arrow.names
+      elif self.format == 'arrow':
+        self._columns = self.__arrow__().schema.names
+      else:
+        columns = {}
+        for row in self:
+          for key in row:
+            if key not in columns:
+              columns[key] = None
+        self._columns = list(columns)
+    return self._columns
+
+  def copyCsv(self, file: str = None):
+    """Copy CSV
+    Copy a csv dataset into another file, in chunks, without parsing it
+
+    @param file (str): destination file
+    """
+    if self.format != 'csv':
+      raise ValueError('Error in copyCsv: only csv files can be copied')
+    with open(self.file, 'rb') as source, open(file, 'wb') as destination:
+      shutil.copyfileobj(source, destination, length = 1024 * 1024)
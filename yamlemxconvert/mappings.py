@@ -74,6 +74,14 @@ __emx__keys__tags__ = [
   'codeSystem'
 ]
 
+# Frozen sets of the lists above. These are used for (constant time)
+# membership tests when extracting the contents of YAML files.
+__emx__keys__pkgs__set__ = frozenset(__emx__keys__pkgs__)
+__emx__keys__enty__set__ = frozenset(__emx__keys__enty__)
+__emx__keys__attr__set__ = frozenset(__emx__keys__attr__)
+__emx__keys__datatype__set__ = frozenset(__emx__keys__datatype__)
+__emx__keys__tags__set__ = frozenset(__emx__keys__tags__)
+
 # @name __emx__attribs__to__emx
 # @description mappings for attribute names
 # @reference https://github.com/molgenis/molgenis-emx2/blob/master/backend/molgenis-emx2/src/main/java/org/molgenis/emx2/Column.java
@@ -1,14 +1,66 @@
+import gzip
+import io
+import logging
 import yaml
 
-def loadYaml(file: str = None):
+log = logging.getLogger(__name__)
+
+# Use the libyaml bindings when PyYAML was built with them. The C loader
+# shares the constructors of the pure-Python SafeLoader, so the parsed output
+# (including `date` scalars) is identical; it is just much faster.
+try:
+  from yaml import CSafeLoader as SafeLoader
+except ImportError:
+  from yaml import SafeLoader
+
+def loadYaml(file: str = None, loader = SafeLoader):
   """Load YAML File    
   Read the contents for a YAML file
   @param file (str): a file path 
+  @param loader: a PyYAML loader class (default: `CSafeLoader` if libyaml is
+    available, otherwise `SafeLoader`)
   """
   with open(file, 'r') as stream:
     try:
-      contents = yaml.safe_load(stream)
+      contents = yaml.load(stream, Loader = loader)
     except yaml.YAMLError as err:
-      print("Unable to read yaml:\n" + repr(err))
+      log.error('Unable to read yaml %s:\n%r', file, err)
+      raise
     stream.close()
-  return contents
\ No newline at end of file
+  return contents
+
+def openFile(file: str = None, mode: str = 'r', compression: str = None):
+  """Open File
+  Open a text file for reading or writing (utf-8, without newline
+  translation so it can be used with the csv module). Files can be
+  compressed with gzip or zstd (requires the `zstandard` package).
+  
+  @param file (str): a file path
+  @param mode (str): 'r' (default) or 'w'
+  @param compression (str): None (default), 'gzip', or 'zstd'
+  
+  @return text stream
+  """
+  if compression is None:
+    return open(file, mode, newline = '', encoding = 'utf-8')
+  if compression == 'gzip':
+    if mode == 'w':
+      # no file name or timestamp in the header, so the same contents
+      # always give the same file
+      raw = open(file, 'wb')
+      stream = gzip.GzipFile(filename = '', mode = 'wb', fileobj = raw, mtime = 0)
+      stream.myfileobj = raw
+    else:
+      stream = gzip.GzipFile(file, 'rb')
+  elif compression == 'zstd':
+    try:
+      import zstandard
+    except ImportError:
+      raise ImportError('Error in openFile: zstandard is required for zstd compressed files')
+    if mode == 'w':
+      stream = zstandard.ZstdCompressor().stream_writer(open(file, 'wb'))
+    else:
+      stream = zstandard.ZstdDecompressor().stream_reader(open(file, 'rb'))
+  else:
+    raise ValueError(f'Error in openFile: unsupported compression {compression}')
+  return io.TextIOWrapper(stream, encoding = 'utf-8', newline = '')
@@ -0,0 +1,411 @@
+from yamlemxconvert.utils import SafeLoader, loadYaml
+from yaml.composer import ComposerError
+from yaml.nodes import ScalarNode, SequenceNode, MappingNode
+from yaml.events import (
+  AliasEvent,
+  ScalarEvent,
+  SequenceStartEvent,
+  SequenceEndEvent,
+  MappingStartEvent,
+  MappingEndEvent,
+  CollectionStartEvent,
+  CollectionEndEvent
+)
+import logging
+
+log = logging.getLogger(__name__)
+
+class yamlEventReader:
+  def __init__(self, stream, loader = SafeLoader):
+    """YAML Event Reader
+    Read a YAML document one node at a time using PyYAML's event API. Nodes
+    are composed and constructed individually, or skipped without building
+    them at all. This makes it possible to process YAML files that are much
+    larger than the available memory.
+
+    @param stream: an open file
+    @param loader: a PyYAML loader class (default: `CSafeLoader` if libyaml
+      is available, otherwise `SafeLoader`)
+    """
+    self.loader = loader(stream)
+    self.anchors = {}
+    # anchors defined in the current block (see `event`)
+    self.block = None
+
+  def event(self):
+    """Consume the next event
+    If `block` is a set, anchors of the events are added to it, and aliases
+    to anchors outside the block raise a ComposerError (the block could not
+    be read on its own).
+
+    @return event
+    """
+    event = self.loader.get_event()
+    if self.block is not None and getattr(event, 'anchor', None) is not None:
+      if not isinstance(event, AliasEvent):
+        self.block.add(event.anchor)
+      elif event.anchor not in self.block:
+        raise ComposerError(None, None, f'found alias {event.anchor} to an anchor outside the block', event.start_mark)
+    return event
+
+  def __resolve__tag__(self, kind, event, value = None):
+    """Resolve tag of a node
+    @param kind: node class
+    @param event: event that starts the node
+    @param value: value of a scalar
+    """
+    if event.tag is None or event.tag == '!':
+      return self.loader.resolve(kind, value, event.implicit)
+    return event.tag
+
+  def expect(self, kind):
+    """Consume the next event and check its type
+    @param kind: expected event class
+    """
+    event = self.event()
+    if not isinstance(event, kind):
+      raise ComposerError(None, None, f'expected {kind.__name__}, but found {type(event).__name__}', event.start_mark)
+    return event
+
+  def check(self, kind):
+    """Check the type of the next event
+    @param kind: event class
+    """
+    return self.loader.check_event(kind)
+
+  def compose(self):
+    """Compose the next node
+    @return yaml node
+    """
+    event = self.event()
+    if isinstance(event, AliasEvent):
+      if event.anchor not in self.anchors:
+        raise ComposerError(None, None, f'found undefined alias {event.anchor}', event.start_mark)
+      return self.anchors[event.anchor]
+
+    if isinstance(event, ScalarEvent):
+      tag = self.__resolve__tag__(ScalarNode, event, event.value)
+      node = ScalarNode(tag, event.value, event.start_mark, event.end_mark, style = event.style)
+      if event.anchor is not None:
+        self.anchors[event.anchor] = node
+    elif isinstance(event, SequenceStartEvent):
+      tag = self.__resolve__tag__(SequenceNode, event)
+      node = SequenceNode(tag, [], event.start_mark, None, flow_style = event.flow_style)
+      if event.anchor is not None:
+        self.anchors[event.anchor] = node
+      while not self.check(SequenceEndEvent):
+        node.value.append(self.compose())
+      node.end_mark = self.event().end_mark
+    else:
+      tag = self.__resolve__tag__(MappingNode, event)
+      node = MappingNode(tag, [], event.start_mark, None, flow_style = event.flow_style)
+      if event.anchor is not None:
+        self.anchors[event.anchor] = node
+      while not self.check(MappingEndEvent):
+        key = self.compose()
+        node.value.append((key, self.compose()))
+      node.end_mark = self.event().end_mark
+    return node
+
+  def construct(self):
+    """Compose and construct the next node
+    @return python object
+    """
+    return self.loader.construct_document(self.compose())
+
+  def skip(self):
+    """Skip the next node
+    Consume all events of the next node without composing it
+
+    @return None
+    """
+    depth = 0
+    while True:
+      event = self.event()
+      if isinstance(event, CollectionStartEvent):
+        depth += 1
+      elif isinstance(event, CollectionEndEvent):
+        depth -= 1
+      if depth == 0:
+        return
+
+  def keys(self):
+    """Keys of the next node
+    Consume the next node and construct only the keys of a mapping (values
+    are skipped)
+
+    @return list of keys, or None if the node is not a plain mapping (e.g.,
+      an alias or a mapping with merge keys)
+    """
+    if not self.check(MappingStartEvent):
+      self.skip()
+      return None
+    self.expect(MappingStartEvent)
+    keys = []
+    while not self.check(MappingEndEvent):
+      node = self.compose()
+      if keys is not None and node.tag == 'tag:yaml.org,2002:merge':
+        keys = None
+      elif keys is not None:
+        keys.append(self.loader.construct_document(node))
+      self.skip()
+    self.expect(MappingEndEvent)
+    return keys
+
+  def start(self, kind = MappingStartEvent):
+    """Start reading a document
+    Consume the stream and document start events and the start of the
+    top-level node
+
+    @param kind: event class of the top-level node (default: mapping)
+    """
+    self.loader.get_event()
+    self.loader.get_event()
+    self.expect(kind)
+
+  def close(self):
+    self.loader.dispose()
+
+
+class yamlBlockStream:
+  def __init__(self, file: str = None, position: int = None, column: int = 0):
+    """YAML Block Stream
+    Read a yaml file from the start of a block (e.g., a `data` sequence).
+    The text before the block on its first line is replaced by spaces, so
+    the block is read as a document with the same indentation.
+
+    @param file (str): path to the yaml file
+    @param position (int): position of the first line of the block (from
+      `tell`)
+    @param column (int): column where the block starts
+    """
+    self.stream = open(file, 'r')
+    self.stream.seek(position)
+    line = self.stream.readline()
+    self.valid = line[column:column + 1] in ['-', '[']
+    self.buffer = ' ' * column + line[column:]
+
+  def read(self, size: int = -1):
+    if self.buffer:
+      if size is None or size < 0:
+        chunk, self.buffer = self.buffer + self.stream.read(), ''
+      else:
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+      return chunk
+    return self.stream.read(size)
+
+  def close(self):
+    self.stream.close()
+
+
+class yamlDataset:
+  def __init__(
+    self,
+    file: str = None,
+    entity: int = None,
+    rows: int = 0,
+    loader = SafeLoader,
+    columns: list = None,
+    position: int = None,
+    column: int = 0
+  ):
+    """YAML Dataset
+    A lazy reference to the `data` rows of an entity in a YAML file. The
+    rows are parsed one at a time each time the dataset is iterated, so
+    only one row is held in memory.
+
+    If the position of the block is known (see `loadYamlStream`), the file
+    is read from the start of the block. Otherwise, the file is parsed from
+    the start until the block is found.
+
+    @param file (str): path to the yaml file
+    @param entity (int): position of the entity in `entities`
+    @param rows (int): number of rows
+    @param loader: a PyYAML loader class
+    @param columns (list): keys used in the rows (optional, see `columns`)
+    @param position (int): position of the first line of the block in the
+      file (optional, from `tell`)
+    @param column (int): column where the block starts
+    """
+    self.file = file
+    self.entity = entity
+    self.rows = rows
+    self.loader = loader
+    self.position = position
+    self.column = column
+    self._columns = columns
+
+  def __len__(self):
+    return self.rows
+
+  def __repr__(self):
+    return f'yamlDataset(file={self.file!r}, entity={self.entity}, rows={self.rows})'
+
+  def __iter__(self):
+    if self.position is not None:
+      stream = yamlBlockStream(self.file, self.position, self.column)
+      if stream.valid:
+        reader = yamlEventReader(stream, self.loader)
+        try:
+          reader.start(SequenceStartEvent)
+          for _ in range(self.rows):
+            yield reader.construct()
+        finally:
+          reader.close()
+          stream.close()
+        return
+      stream.close()
+    yield from self.__scan__()
+
+  def __scan__(self):
+    """Find the block by parsing the file from the start and read the rows"""
+    with open(self.file, 'r') as stream:
+      reader = yamlEventReader(stream, self.loader)
+      try:
+        reader.start()
+        while not reader.check(MappingEndEvent):
+          if reader.construct() != 'entities':
+            reader.skip()
+            continue
+          reader.expect(SequenceStartEvent)
+          for _ in range(self.entity):
+            reader.skip()
+          reader.expect(MappingStartEvent)
+          while not reader.check(MappingEndEvent):
+            if reader.construct() != 'data':
+              reader.skip()
+              continue
+            reader.expect(SequenceStartEvent)
+            while not reader.check(SequenceEndEvent):
+              yield reader.construct()
+            return
+      finally:
+        reader.close()
+
+  def columns(self):
+    """Columns
+    Find all keys used in the dataset (in the order they are first seen).
+    The keys are usually collected when the file is loaded (see
+    `loadYamlStream`). Otherwise, this requires one pass over the rows; the
+    result is cached.
+
+    @return list of column names
+    """
+    if self._columns is None:
+      columns = {}
+      for row in self:
+        for key in row:
+          if key not in columns:
+            columns[key] = None
+      self._columns = list(columns)
+    return self._columns
+
+
+def loadYamlStream(file: str = None, loader = SafeLoader):
+  """Load YAML File (streaming)
+  Read the contents of a yaml-emx file without loading the inline datasets.
+  The `data` of each entity is replaced by a `yamlDataset` that reads the
+  rows from the file when it is iterated.
+
+  The rows are counted and their keys are collected while the file is read,
+  and the position of each block is recorded, so a dataset can be read
+  without parsing the rest of the file again.
+
+  Anchors that are defined in a `data` block cannot be referenced from
+  outside the block, and vice versa, because the block is read on its own.
+  Files that do so are loaded with `loadYaml` instead (the datasets are
+  loaded into memory).
+
+  @param file (str): a file path
+  @param loader: a PyYAML loader class
+  """
+  try:
+    return __load__yaml__stream__(file, loader)
+  except ComposerError as error:
+    log.info('Cannot stream the datasets of %s (%s); loading the file', file, error.problem)
+    return loadYaml(file, loader)
+
+def __load__yaml__stream__(file: str = None, loader = SafeLoader):
+  """Load YAML File (streaming)
+  See `loadYamlStream`; raises a ComposerError if an alias refers to an
+  anchor on the other side of a `data` block
+  """
+  contents = {}
+  datasets = []
+  with open(file, 'r') as stream:
+    reader = yamlEventReader(stream, loader)
+    try:
+      reader.start()
+      while not reader.check(MappingEndEvent):
+        key = reader.construct()
+        if key != 'entities' or not reader.check(SequenceStartEvent):
+          contents[key] = reader.construct()
+          continue
+
+        # read entities one key at a time and skip data rows
+        contents[key] = []
+        reader.expect(SequenceStartEvent)
+        while not reader.check(SequenceEndEvent):
+          if not reader.check(MappingStartEvent):
+            contents[key].append(reader.construct())
+            continue
+          entity = {}
+          reader.expect(MappingStartEvent)
+          while not reader.check(MappingEndEvent):
+            entityKey = reader.construct()
+            if entityKey == 'data' and reader.check(SequenceStartEvent):
+              mark = reader.expect(SequenceStartEvent).start_mark
+              rows = 0
+              columns = {}
+              reader.block = set()
+              while not reader.check(SequenceEndEvent):
+                keys = reader.keys()
+                if keys is None:
+                  columns = None
+                elif columns is not None:
+                  columns.update(dict.fromkeys(keys))
+                rows += 1
+              reader.block = None
+              reader.expect(SequenceEndEvent)
+              entity['data'] = yamlDataset(
+                file,
+                len(contents[key]),
+                rows,
+                loader,
+                columns = list(columns) if columns is not None else None,
+                column = mark.column
+              )
+              datasets.append((mark.line, entity['data']))
+            else:
+              entity[entityKey] = reader.construct()
+          reader.expect(MappingEndEvent)
+          contents[key].append(entity)
+        reader.expect(SequenceEndEvent)
+    finally:
+      reader.close()
+  if datasets:
+    __locate__datasets__(file, datasets)
+  return contents
+
+def __locate__datasets__(file: str = None, datasets: list = None):
+  """Locate datasets
+  Find the position of the first line of each dataset in the file (one
+  pass over the lines, without parsing them)
+
+  @param file (str): path to the yaml file
+  @param datasets (list): tuples of the line number and `yamlDataset`
+  """
+  lines = {}
+  for line, dataset in datasets:
+    lines.setdefault(line, []).append(dataset)
+  last = max(lines)
+  with open(file, 'r') as stream:
+    number = 0
+    while number <= last:
+      if number in lines:
+        position = stream.tell()
+        for dataset in lines[number]:
+          dataset.position = position
+      if not stream.readline():
+        break
+      number += 1